@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import './App.css';
+import { fetchStructure } from './structures';
 
 function App() {
   const [sequence, setSequence] = useState('');
@@ -17,7 +18,7 @@ function App() {
     }
 
     try {
-      const res = await fetch("http://localhost:8000/fetch_pdb", {
+      const res = await fetch("http://localhost:8000/fetch_pdb?structures=ref", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ fold_seq: sequence })
@@ -30,19 +31,26 @@ function App() {
         // Create iframe elements
         const newIframes = pdbArray.map((item, idx) => {
           const iframeId = `protein-iframe-${idx}`;
+          // Structures come by reference; fetch them while the iframe loads
+          const pdb = item.structure ? fetchStructure(item.structure) : Promise.resolve(item.pdb_data);
           
           // Create iframe and set up message handler after it loads
           setTimeout(() => {
             const iframe = document.getElementById(iframeId);
             if (iframe) {
               iframe.onload = () => {
-                iframe.contentWindow.postMessage({
-                  pdb: item.pdb_data,
-                  sequence: item.sequence,
-                  name: `Protein ${idx + 1}`,
-                  tm_score: data.tm_scores[idx],
-                  description: data.description[idx]
-                }, "*");
+                pdb.then(pdbText => {
+                  iframe.contentWindow.postMessage({
+                    pdb: pdbText,
+                    sequence: item.sequence,
+                    name: `Protein ${idx + 1}`,
+                    tm_score: data.tm_scores[idx],
+                    description: data.description[idx]
+                  }, "*");
+                }).catch(err => {
+                  console.error(err);
+                  setError('Error fetching PDB.');
+                });
               };
             }
           }, 100);
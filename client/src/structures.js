@@ -0,0 +1,20 @@
+const API_BASE = "http://localhost:8000";
+
+// Structures are content-addressed and immutable: one request per hash per page,
+// and the browser's HTTP cache (ETag, Cache-Control: immutable) covers reloads.
+const structures = new Map();
+
+export function fetchStructure(ref) {
+  if (!structures.has(ref.hash)) {
+    const request = fetch(`${API_BASE}${ref.url}`).then(res => {
+      if (!res.ok) {
+        throw new Error(`Failed to fetch structure ${ref.hash}`);
+      }
+      return res.text();
+    });
+    // Let a failed fetch be retried
+    request.catch(() => structures.delete(ref.hash));
+    structures.set(ref.hash, request);
+  }
+  return structures.get(ref.hash);
+}
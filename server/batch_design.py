@@ -0,0 +1,197 @@
+"""
+Multi-reference design runs from a FASTA upload.
+
+The upload is parsed as it arrives (`iter_fasta` over the body chunks), and
+every reference starts its design run as soon as its record is complete, up
+to BATCH_CONCURRENCY references at a time. All runs share the process-wide
+generation scheduler (their prompts are micro-batched into the same
+model.generate calls), the fold backend's concurrency limit and the TM-score
+and DSSP worker pools, so a panel costs one upload instead of one HTTP round
+trip per reference. Results come out per reference in completion order.
+"""
+import asyncio
+import codecs
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from candidate_filter import AMINO_ACIDS, clean_sequence
+from config import BATCH_CONCURRENCY, BATCH_MAX_LINE_BYTES, BATCH_MAX_REFERENCES, FILTER_MAX_LENGTH
+
+
+@dataclass(frozen=True)
+class FastaRecord:
+    id: str
+    description: str
+    sequence: str
+
+
+class FastaParser:
+    """Incremental FASTA parser: `feed` text as it arrives, `close` at the end of the input."""
+
+    def __init__(self, max_line_bytes: int = BATCH_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self._partial = ""
+        self._header: str | None = None
+        self._parts: list[str] = []
+
+    def feed(self, text: str) -> list[FastaRecord]:
+        *lines, self._partial = (self._partial + text).split("\n")
+        if len(self._partial) > self.max_line_bytes:
+            raise ValueError(f"FASTA line longer than {self.max_line_bytes} bytes")
+        records = []
+        for line in lines:
+            record = self._line(line)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def close(self) -> list[FastaRecord]:
+        records = self.feed("\n")
+        if self._header is not None:
+            records.append(self._record())
+            self._header = None
+        return records
+
+    def _line(self, line: str) -> FastaRecord | None:
+        line = line.strip()
+        if line.startswith(">"):
+            record = self._record() if self._header is not None else None
+            self._header = line[1:].strip()
+            self._parts = []
+            return record
+        if line and not line.startswith(";"):
+            if self._header is None:
+                raise ValueError("FASTA input must start with a '>' header line")
+            self._parts.append(clean_sequence(line))
+        return None
+
+    def _record(self) -> FastaRecord:
+        record_id, _, description = self._header.partition(" ")
+        return FastaRecord(id=record_id, description=description.strip(), sequence="".join(self._parts))
+
+
+async def iter_fasta(chunks: AsyncIterator[bytes], max_records: int = BATCH_MAX_REFERENCES) -> AsyncIterator[FastaRecord]:
+    """FASTA records from a stream of UTF-8 byte chunks, each yielded as soon as it is complete."""
+    parser = FastaParser()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    count = 0
+
+    def _limit(records):
+        nonlocal count
+        count += len(records)
+        if max_records and count > max_records:
+            raise ValueError(f"At most {max_records} FASTA records per batch")
+        return records
+
+    async for chunk in chunks:
+        for record in _limit(parser.feed(decoder.decode(chunk))):
+            yield record
+    for record in _limit(parser.feed(decoder.decode(b"", final=True)) + parser.close()):
+        yield record
+
+
+def record_error(record: FastaRecord) -> str | None:
+    """Why a reference cannot be designed, or None."""
+    if not record.sequence:
+        return "Empty sequence"
+    invalid = set(record.sequence) - set(AMINO_ACIDS)
+    if invalid:
+        return f"Invalid residues: {''.join(sorted(invalid))}"
+    if len(record.sequence) > FILTER_MAX_LENGTH:
+        return f"Sequence longer than {FILTER_MAX_LENGTH} residues"
+    return None
+
+
+class DesignBatch:
+    """
+    Design runs for the references of one upload. `design(sequence)` returns
+    the result dict for one reference; a failure only fails that reference.
+    Records are submitted while the upload is still being read (`ingest`),
+    and `results` streams finished references meanwhile.
+    """
+
+    def __init__(self, design: Callable[[str], Awaitable[dict]], concurrency: int = BATCH_CONCURRENCY):
+        self.design = design
+        self._slots = asyncio.Semaphore(concurrency or os.cpu_count() or 1)
+        self._results: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._tasks: set[asyncio.Task] = set()
+        self.submitted = 0
+        self.succeeded = 0
+        self.ingested = False
+        self.error: str | None = None
+        self.started_at = time.monotonic()
+
+    def submit(self, record: FastaRecord):
+        task = asyncio.create_task(self._run(self.submitted, record))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.submitted += 1
+
+    async def ingest(self, chunks: AsyncIterator[bytes]):
+        """Submit every record of a streamed FASTA body as soon as it is complete."""
+        try:
+            async for record in iter_fasta(chunks):
+                self.submit(record)
+            if not self.submitted:
+                raise ValueError("No FASTA records in request body")
+        except ValueError as exc:  # malformed FASTA, bad UTF-8, too many records
+            # The references submitted so far still run; the rest of the upload is dropped
+            print(f"❌ Batch upload rejected: {exc}")
+            self.error = str(exc)
+            self._results.put_nowait({"event": "error", "status_code": 400, "detail": self.error})
+        except BaseException:  # upload interrupted: the client is gone
+            await self.cancel()
+            raise
+        finally:
+            self.ingested = True
+            self._results.put_nowait(None)  # wakes `results` to check whether it is done
+
+    async def _run(self, index: int, record: FastaRecord):
+        event = {"event": "reference", "index": index, "id": record.id, "description": record.description,
+                 "fold_seq": record.sequence}
+        error = record_error(record)
+        if error is None:
+            async with self._slots:
+                started = time.monotonic()
+                try:
+                    event.update(await self.design(record.sequence))
+                    self.succeeded += 1
+                except Exception as exc:
+                    error = getattr(exc, "detail", None) or str(exc)
+                event["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        if error is not None:
+            print(f"❌ Batch reference {record.id or index}: {error}")
+            event.update(status="error", error=error)
+        self._results.put_nowait(event)
+
+    async def results(self) -> AsyncIterator[dict]:
+        """Reference events as they finish (plus an upload error event), until ingestion ended and all finished."""
+        finished = 0
+        while not (self.ingested and finished == self.submitted):
+            event = await self._results.get()
+            if event is None:
+                continue
+            if event["event"] == "reference":
+                finished += 1
+            yield event
+
+    def summary(self) -> dict:
+        summary = {
+            "event": "summary",
+            "references": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.submitted - self.succeeded,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+        }
+        if self.error is not None:
+            summary["error"] = self.error
+        return summary
+
+    async def cancel(self):
+        """Stop the references still running (client gone)."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,152 @@
+"""
+Event-loop responsiveness under concurrent structure analysis.
+
+A probe task sleeps PROBE_INTERVAL in a loop and records how late it wakes
+up; that lag is how long any other request (e.g. /check) would have waited.
+
+In-process (no model or network needed), against the cached PDBs:
+    python -m benchmarks.bench_event_loop --pdb-dir pdb_data --concurrency 32
+
+`--inline` runs DSSP directly on the event loop, as analyze_pdb_full did
+before the DSSP worker pool, for comparison.
+
+Against a running server, with concurrent /fetch_pdb calls while /check is polled:
+    python -m benchmarks.bench_event_loop --url http://127.0.0.1:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+PROBE_INTERVAL = 0.01
+
+# A short reference biologic (same one used during development)
+REFERENCE = "KVFGRCELAAAMKRHGLDNYRGYSLGNWVCAAKFESNFNTQATNRNTDGSTDYGILQINSRWWCNDGRTPGSRNLCNIPCSALLSSDITASVNCAKKIVSDGNGMNAWVAWRNRCKGTDVQAWIRGCRL"
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+async def probe_lag(stop: asyncio.Event, lags: list[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def inline_analysis(pdb_text: str) -> str:
+    """DSSP on the event loop: the behaviour before the worker pool."""
+    import mdtraj as md
+    from pdb_analyse import summarize_structure
+    from pdb_parser import parse_pdb, to_mdtraj
+
+    structure = parse_pdb(pdb_text)
+    md.compute_dssp(to_mdtraj(structure))
+    return summarize_structure(structure)
+
+
+async def run_in_process(pdb_dir: str, concurrency: int, inline: bool) -> dict:
+    from dssp_analyse import analyze_pdb_full
+    from dssp_serve import dssp_service
+
+    names = sorted(n for n in os.listdir(pdb_dir) if n.endswith(".pdb"))[:concurrency]
+    if not names:
+        sys.exit(f"No .pdb files in {pdb_dir}")
+    texts = []
+    for name in names:
+        with open(os.path.join(pdb_dir, name)) as f:
+            texts.append(f.read())
+
+    # Warm the worker pool (and the mdtraj import) outside the measurement
+    if not inline:
+        await dssp_service.assign(texts[0], "warmup")
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(stop, lags))
+    start = time.perf_counter()
+    if inline:
+        await asyncio.gather(*(inline_analysis(text) for text in texts))
+    else:
+        await asyncio.gather(*(analyze_pdb_full(pdb_text=text, key=name) for name, text in zip(names, texts)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    dssp_service.shutdown()
+
+    return {
+        "mode": "inline" if inline else "worker-pool",
+        "structures": len(texts),
+        "seconds": round(elapsed, 2),
+        "structures_per_sec": round(len(texts) / elapsed, 2),
+        "loop_lag": percentiles(lags),
+    }
+
+
+async def run_against_server(url: str, concurrency: int, fold_seq: str) -> dict:
+    import aiohttp
+
+    check_latencies: list[float] = []
+    statuses: list[int] = []
+    stop = asyncio.Event()
+
+    async with aiohttp.ClientSession() as session:
+        async def poll_check():
+            while not stop.is_set():
+                start = time.perf_counter()
+                async with session.get(f"{url}/check") as response:
+                    await response.read()
+                check_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        async def fetch():
+            async with session.post(f"{url}/fetch_pdb", json={"fold_seq": fold_seq}) as response:
+                await response.read()
+                statuses.append(response.status)
+
+        poller = asyncio.create_task(poll_check())
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+
+    return {
+        "mode": "server",
+        "requests": concurrency,
+        "ok": statuses.count(200),
+        "seconds": round(elapsed, 2),
+        "requests_per_sec": round(concurrency / elapsed, 3),
+        "check_latency": percentiles(check_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of in-process analysis")
+    parser.add_argument("--pdb-dir", default="pdb_data")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--inline", action="store_true", help="In-process only: run DSSP on the event loop")
+    parser.add_argument("--fold-seq", default=REFERENCE)
+    args = parser.parse_args()
+
+    if args.url:
+        result = asyncio.run(run_against_server(args.url.rstrip("/"), args.concurrency, args.fold_seq))
+    else:
+        result = asyncio.run(run_in_process(args.pdb_dir, args.concurrency, args.inline))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
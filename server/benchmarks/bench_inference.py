@@ -0,0 +1,98 @@
+"""
+Compare ProtGPT2 inference profiles: tokens/sec and peak RSS at equal sampling settings.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_inference --profiles default cpu-int8 cpu-bf16
+
+Each profile runs in a fresh subprocess so peak RSS is measured in isolation.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+# A short reference biologic (same one used during development)
+REFERENCE = "KVFGRCELAAAMKRHGLDNYRGYSLGNWVCAAKFESNFNTQATNRNTDGSTDYGILQINSRWWCNDGRTPGSRNLCNIPCSALLSSDITASVNCAKKIVSDGNGMNAWVAWRNRCKGTDVQAWIRGCRL"
+
+
+def run_worker(profile: str, rounds: int, num_return_sequences: int, seed: int) -> dict:
+    import torch
+    from fetch_biosimilars import preprocess_sequence
+    from model_loader import ModelLoader
+
+    loader = ModelLoader()
+    start = time.perf_counter()
+    loader.load_model(profile=profile)
+    load_seconds = time.perf_counter() - start
+
+    torch.manual_seed(seed)
+    prompt_ids = loader.tokenizer(preprocess_sequence(REFERENCE))["input_ids"]
+    input_ids = torch.tensor([prompt_ids] * num_return_sequences, dtype=torch.long)
+
+    new_tokens = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with torch.inference_mode():
+            output = loader.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                do_sample=True,
+                top_k=950,
+                repetition_penalty=1.2,
+                max_length=150,
+                eos_token_id=0,
+                pad_token_id=0,
+            )
+        continuation = output[:, input_ids.shape[1]:]
+        # Tokens up to and including the first EOS; the rest is padding
+        for row in continuation.tolist():
+            new_tokens += row.index(0) + 1 if 0 in row else len(row)
+    generate_seconds = time.perf_counter() - start
+
+    return {
+        "profile": loader.describe(),
+        "load_seconds": round(load_seconds, 2),
+        "new_tokens": new_tokens,
+        "tokens_per_sec": round(new_tokens / generate_seconds, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["default", "cpu-int8"])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--num-return-sequences", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.rounds, args.num_return_sequences, args.seed)))
+        return
+
+    results = []
+    for profile in args.profiles:
+        print(f"Benchmarking profile {profile}...", file=sys.stderr)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_inference", "--worker", profile,
+             "--rounds", str(args.rounds), "--num-return-sequences", str(args.num_return_sequences),
+             "--seed", str(args.seed)],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(f"❌ Profile {profile} failed:\n{proc.stderr}", file=sys.stderr)
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"{'profile':<10} {'tokens/s':>10} {'peak RSS MB':>12} {'load s':>8}")
+    for r in results:
+        print(f"{r['profile']['profile']:<10} {r['tokens_per_sec']:>10} {r['peak_rss_mb']:>12} {r['load_seconds']:>8}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
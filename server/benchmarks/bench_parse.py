@@ -0,0 +1,124 @@
+"""
+Per-structure PDB parse time and peak memory: the shared vectorized parser
+against the parsers it replaces (the summary line loop, mdtraj and Bio.PDB).
+
+Run from the server/ directory:
+    python -m benchmarks.bench_parse --pdb-dir pdb_data --limit 50
+
+mdtraj and Bio.PDB are skipped when not installed.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pdb_parser import parse_pdb
+
+
+def line_loop(pdb_text: str):
+    """The per-line loop the summary used before the shared parser."""
+    chains = {}
+    atom_count = 0
+    for line in pdb_text.splitlines():
+        if line.startswith("ATOM") or line.startswith("HETATM"):
+            atom_count += 1
+            chains.setdefault(line[21].strip(), {})[int(line[22:26].strip())] = line[17:20].strip()
+    return chains, atom_count
+
+
+def mdtraj_parser():
+    try:
+        import mdtraj as md
+    except ImportError:
+        return None
+
+    path = os.path.join(tempfile.gettempdir(), "bench_parse.pdb")
+
+    def parse(pdb_text: str):
+        # load_pdb reads from a path; the write is part of what the old code paid
+        with open(path, "w") as f:
+            f.write(pdb_text)
+        return md.load_pdb(path)
+
+    return parse
+
+
+def biopython_parser():
+    try:
+        from Bio.PDB import PDBParser
+    except ImportError:
+        return None
+    parser = PDBParser(QUIET=True)
+    return lambda pdb_text: parser.get_structure("s", io.StringIO(pdb_text))
+
+
+def measure(parse, texts: list[str], repeat: int) -> dict:
+    times = []
+    for text in texts:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(text)
+            best = min(best, time.perf_counter() - start)
+        times.append(best)
+
+    peaks = []
+    for text in texts:
+        tracemalloc.start()
+        result = parse(text)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del result
+
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "mean_ms": round(statistics.mean(times) * 1000, 2),
+        "median_peak_kib": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdb-dir", default="pdb_data")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = sorted(n for n in os.listdir(args.pdb_dir) if n.endswith(".pdb"))[:args.limit]
+    if not names:
+        sys.exit(f"No .pdb files in {args.pdb_dir}")
+    texts = []
+    for name in names:
+        with open(os.path.join(args.pdb_dir, name)) as f:
+            texts.append(f.read())
+
+    parsers = {
+        "pdb_parser": parse_pdb,
+        "line_loop": line_loop,
+        "mdtraj.load_pdb": mdtraj_parser(),
+        "Bio.PDB": biopython_parser(),
+    }
+    results = {}
+    for label, parse in parsers.items():
+        if parse is None:
+            print(f"{label}: not installed, skipped", file=sys.stderr)
+            continue
+        results[label] = measure(parse, texts, args.repeat)
+        print(f"{label}: {results[label]}", file=sys.stderr)
+
+    sample = parse_pdb(texts[0])
+    print(json.dumps({
+        "structures": len(texts),
+        "atoms_first": sample.atom_count,
+        "parsed_record_kib_first": round(sample.nbytes() / 1024, 1),
+        "parsers": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
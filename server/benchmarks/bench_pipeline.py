@@ -0,0 +1,334 @@
+"""
+End-to-end benchmark harness for the design pipeline.
+
+Each stage runs on its own, in a fresh subprocess so peak RSS is isolated,
+under a configurable concurrency:
+
+    generation   generate_biosimilars_async (needs the ProtGPT2 weights; skipped otherwise)
+    fold         remote fold backend against a local HTTP stub serving precomputed synthetic PDBs
+    parse        pdb_parser.parse_pdb
+    dssp         DSSP worker pool
+    tm_score     TM-align worker pool
+    description  analyze_pdb_full (summary + DSSP)
+    full         the /fetch_pdb flow: fold reference, generate, then fold/score/describe candidates
+
+Every op works on a fresh sequence, so caches never hide the work.
+Reports p50/p95/p99 latency, throughput and peak RSS per stage, writes
+JSON results and compares them with a stored baseline.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_pipeline --ops 20 --concurrency 4 --output bench_results.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json --tolerance 0.2
+    python -m benchmarks.bench_pipeline --stages parse dssp --save-baseline benchmarks/baseline.json
+
+Exits with status 1 when a stage regresses past the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ["generation", "fold", "parse", "dssp", "tm_score", "description", "full"]
+
+# A short reference biologic (same one used during development)
+REFERENCE = "KVFGRCELAAAMKRHGLDNYRGYSLGNWVCAAKFESNFNTQATNRNTDGSTDYGILQINSRWWCNDGRTPGSRNLCNIPCSALLSSDITASVNCAKKIVSDGNGMNAWVAWRNRCKGTDVQAWIRGCRL"
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def variants(n: int, seed: int, rate: float = 0.2) -> list[str]:
+    """`n` distinct point-mutated variants of the reference."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        out.append("".join(rng.choice(AMINO_ACIDS) if rng.random() < rate else aa for aa in REFERENCE))
+    return out
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+async def drive(op, n: int, concurrency: int) -> dict:
+    """Run `op(i)` for i in range(n), at most `concurrency` at a time; latency and throughput stats."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def _timed(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_timed(i) for i in range(n)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "ops": n,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / n * 1000, 2),
+        "throughput_per_sec": round(n / wall, 3),
+    }
+
+
+async def start_fold_stub(latency_ms: float, pdbs: dict[str, str]):
+    """
+    Local stand-in for the ESM Atlas endpoint: answers after `latency_ms`.
+    Structures come from `pdbs` (precomputed before timing, so the fold stage
+    measures the HTTP client rather than the stub); other sequences, e.g.
+    generated candidates, are built on demand.
+    """
+    from aiohttp import web
+    from fold_backends import synthetic_pdb
+
+    async def fold(request):
+        sequence = await request.text()
+        await asyncio.sleep(latency_ms / 1000)
+        pdb_text = pdbs.get(sequence)
+        if pdb_text is None:
+            pdb_text = await asyncio.to_thread(synthetic_pdb, sequence)
+        return web.Response(text=pdb_text)
+
+    app = web.Application()
+    app.router.add_post("/", fold)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/"
+
+
+def load_model():
+    """The ProtGPT2 loader, or None (with the reason printed) when the weights are unavailable."""
+    from model_loader import ModelLoader
+
+    loader = ModelLoader()
+    try:
+        loader.load_model()
+    except Exception as e:
+        print(f"Model unavailable, generation disabled: {e}", file=sys.stderr)
+        return None
+    return loader
+
+
+async def run_stage(stage: str, ops: int, concurrency: int, stub_latency_ms: float, seed: int) -> dict:
+    from dssp_serve import dssp_service
+    from fold_backends import RemoteESMAtlasBackend, set_fold_backend, synthetic_pdb
+    from http_client import http_client
+    from structure_cache import structure_cache
+    from tm_mech import shutdown_executor
+
+    sequences = variants(ops, seed)
+    extra = {}
+
+    if stage in ("parse", "dssp", "tm_score", "description"):
+        texts = [synthetic_pdb(seq) for seq in sequences]
+        reference_text = synthetic_pdb(REFERENCE)
+
+    if stage == "generation":
+        from fetch_biosimilars import generate_biosimilars_async
+
+        loader = load_model()
+        if loader is None:
+            return {"skipped": "model unavailable"}
+
+        async def op(i):
+            await generate_biosimilars_async(loader, sequences[i])
+
+    elif stage == "fold":
+        runner, url = await start_fold_stub(stub_latency_ms, {seq: synthetic_pdb(seq) for seq in sequences})
+        backend = RemoteESMAtlasBackend(url=url, concurrency=concurrency, rate_limited=False)
+        extra["stub_latency_ms"] = stub_latency_ms
+
+        async def op(i):
+            success, _ = await backend.fold(sequences[i])
+            if not success:
+                raise RuntimeError("fold stub request failed")
+
+    elif stage == "parse":
+        from pdb_parser import parse_pdb
+
+        async def op(i):
+            parse_pdb(texts[i])
+
+    elif stage == "dssp":
+        await dssp_service.assign(reference_text, "warmup")
+
+        async def op(i):
+            await dssp_service.assign(texts[i], f"bench-{i}")
+
+    elif stage == "tm_score":
+        from tm_mech import compute_tm_score_pdb
+
+        async def op(i):
+            await compute_tm_score_pdb(texts[i], reference_text, f"bench-{i}", "reference")
+
+    elif stage == "description":
+        from dssp_analyse import analyze_pdb_full
+
+        await dssp_service.assign(reference_text, "warmup")
+
+        async def op(i):
+            await analyze_pdb_full(pdb_text=texts[i], key=f"bench-{i}")
+
+    elif stage == "full":
+        from fetch_biosimilars import generate_candidates_async
+        from fetch_protein import fetch_structure
+        from pipeline import iter_candidate_records
+
+        loader = load_model()
+        extra["candidates"] = "generated" if loader is not None else "sampled variants"
+        # Own seed space, so candidates never coincide with the references
+        fallback_candidates = [variants(2, (seed + 1) * 100003 + i) for i in range(ops)]
+        known = sequences + ([] if loader is not None else [c for pair in fallback_candidates for c in pair])
+        runner, url = await start_fold_stub(stub_latency_ms, {seq: synthetic_pdb(seq) for seq in known})
+        set_fold_backend(RemoteESMAtlasBackend(url=url, rate_limited=False))
+        await structure_cache.start()
+
+        async def op(i):
+            success, original_pdb, original_key = await fetch_structure(sequences[i])
+            if not success:
+                raise RuntimeError("reference fold failed")
+            if loader is not None:
+                candidates, _ = await generate_candidates_async(loader, sequences[i])
+            else:
+                candidates = fallback_candidates[i]
+            async for _ in iter_candidate_records(candidates, original_pdb, original_key):
+                pass
+
+    else:
+        raise ValueError(f"Unknown stage {stage}")
+
+    result = await drive(op, ops, concurrency)
+    result.update(extra)
+
+    if stage in ("fold", "full"):
+        await runner.cleanup()
+        await http_client.close()
+    if stage == "full":
+        structure_cache.close()
+    # Wait for pool workers so their peak RSS shows up in RUSAGE_CHILDREN
+    dssp_service.shutdown(wait=True)
+    shutdown_executor(wait=True)
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["peak_children_rss_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Stages whose p95 latency rose or throughput fell by more than `tolerance`."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or "skipped" in current or "skipped" in previous or "error" in current:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_per_sec"] < previous["throughput_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{stage}: throughput {previous['throughput_per_sec']} -> {current['throughput_per_sec']} /s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--ops", type=int, default=20, help="Operations per stage")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="Fold stub response delay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", help="Also write the results here as the new baseline")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_stage(args.worker, args.ops, args.concurrency, args.stub_latency_ms, args.seed))
+        print(json.dumps(result))
+        return
+
+    # Workers get a throwaway structure cache and no legacy import
+    scratch = tempfile.mkdtemp(prefix="bench_pipeline_")
+    env = dict(
+        os.environ,
+        STRUCTURE_CACHE_DIR=os.path.join(scratch, "structure_cache"),
+        LEGACY_PDB_DIR=os.path.join(scratch, "no_legacy"),
+        JOBS_DB_PATH=os.path.join(scratch, "jobs.sqlite"),
+    )
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "ops": args.ops,
+            "concurrency": args.concurrency,
+            "stub_latency_ms": args.stub_latency_ms,
+        },
+        "stages": {},
+    }
+    try:
+        for stage in args.stages:
+            print(f"Benchmarking {stage}...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_pipeline", "--worker", stage,
+                 "--ops", str(args.ops), "--concurrency", str(args.concurrency),
+                 "--stub-latency-ms", str(args.stub_latency_ms), "--seed", str(args.seed)],
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+            if proc.returncode != 0:
+                print(f"❌ Stage {stage} failed:\n{proc.stderr}", file=sys.stderr)
+                results["stages"][stage] = {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+                continue
+            results["stages"][stage] = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{'stage':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'RSS MB':>8} {'workers MB':>11}")
+    for stage, r in results["stages"].items():
+        if "p50_ms" not in r:
+            print(f"{stage:<12} {r.get('skipped') or r.get('error')}")
+            continue
+        print(f"{stage:<12} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['throughput_per_sec']:>9} "
+              f"{r['peak_rss_mb']:>8} {r['peak_children_rss_mb']:>11}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regressions beyond tolerance:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare free and constrained ProtGPT2 sampling: usable candidates per second of model time.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_sampling --rounds 5 --num-return-sequences 8
+
+Both modes generate from the same reference through the generation
+scheduler (alternating rounds, so warm-up and thermal effects are shared)
+and every sample goes through the pre-fold candidate filter. Yield is
+accepted candidates per second spent in model.generate.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+REFERENCE = "KVFGRCELAAAMKRHGLDNYRGYSLGNWVCAAKFESNFNTQATNRNTDGSTDYGILQINSRWWCNDGRTPGSRNLCNIPCSALLSSDITASVNCAKKIVSDGNGMNAWVAWRNRCKGTDVQAWIRGCRL"
+MODES = ("free", "constrained")
+
+
+async def run(rounds: int, num_return_sequences: int, seed: int, profile: str) -> dict:
+    import torch
+    from candidate_filter import filter_candidates
+    from fetch_biosimilars import generate_biosimilars_async
+    from generation_scheduler import get_scheduler
+    from model_loader import ModelLoader
+
+    loader = ModelLoader()
+    loader.load_model(profile=profile)
+    torch.manual_seed(seed)
+
+    stats = {mode: {"seconds": 0.0, "sampled": 0, "accepted": 0, "lengths": [], "rejected": Counter()} for mode in MODES}
+    # One warm-up round per mode (tokenizer table, prompt cache)
+    for mode in MODES:
+        await generate_biosimilars_async(loader, REFERENCE, num_return_sequences=1, sampling=mode)
+
+    for _ in range(rounds):
+        for mode in MODES:
+            start = time.perf_counter()
+            sampled = await generate_biosimilars_async(loader, REFERENCE, num_return_sequences=num_return_sequences, sampling=mode)
+            stats[mode]["seconds"] += time.perf_counter() - start
+            accepted, rejections = filter_candidates(sampled, REFERENCE)
+            stats[mode]["sampled"] += len(sampled)
+            stats[mode]["accepted"] += len(accepted)
+            stats[mode]["lengths"] += [len(s) for s in accepted]
+            stats[mode]["rejected"].update(r["reason"] for r in rejections)
+
+    await get_scheduler(loader).stop()
+    results = {}
+    for mode, s in stats.items():
+        results[mode] = {
+            "model_seconds": round(s["seconds"], 2),
+            "sampled": s["sampled"],
+            "accepted": s["accepted"],
+            "acceptance_rate": round(s["accepted"] / max(s["sampled"], 1), 3),
+            "accepted_per_second": round(s["accepted"] / max(s["seconds"], 1e-9), 3),
+            "mean_accepted_length": round(sum(s["lengths"]) / max(len(s["lengths"]), 1), 1),
+            "rejected_by_reason": dict(s["rejected"]),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--num-return-sequences", type=int, default=8)
+    parser.add_argument("--profile", default="default")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rounds, args.num_return_sequences, args.seed, args.profile))
+
+    print(f"{'mode':<12} {'accepted/s':>11} {'accept rate':>12} {'sampled':>8} {'model s':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['accepted_per_second']:>11} {r['acceptance_rate']:>12} {r['sampled']:>8} {r['model_seconds']:>8}")
+    print(json.dumps({"reference_length": len(REFERENCE), **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
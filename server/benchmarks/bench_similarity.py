@@ -0,0 +1,119 @@
+"""
+Near-duplicate sequence index: lookup latency, recall and memory at scale.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_similarity --sizes 100000,1000000 --queries 2000
+
+Indexes N random protein-like sequences (lengths 80-400) with the
+configured MinHash/LSH parameters, then queries with point mutants of
+indexed sequences (1-10% substitutions, half of them with one indel) and
+with unrelated sequences. Latency covers the band lookup plus exact
+identity on the ranked candidates (sequences read from memory, not from
+the structure index), i.e. what `StructureCache.nearest` adds on top of
+one SQLite read.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from candidate_filter import AMINO_ACIDS
+from similarity_index import MinHasher, SequenceIndex, encode, sequence_identity
+from structure_cache import CANDIDATES_PER_NEIGHBOUR
+
+
+def random_sequences(rng, n: int) -> list[str]:
+    letters = np.frombuffer(AMINO_ACIDS.encode(), dtype=np.uint8)
+    lengths = rng.integers(80, 401, n)
+    codes = letters[rng.integers(0, len(letters), lengths.sum())]
+    text = codes.tobytes().decode()
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [text[bounds[i]:bounds[i + 1]] for i in range(n)]
+
+
+def mutate(rng, sequence: str) -> str:
+    residues = list(sequence)
+    for position in rng.choice(len(residues), max(1, int(len(residues) * rng.uniform(0.01, 0.10))), replace=False):
+        residues[position] = AMINO_ACIDS[rng.integers(len(AMINO_ACIDS))]
+    if rng.random() < 0.5:
+        position = int(rng.integers(len(residues)))
+        if rng.random() < 0.5:
+            del residues[position]
+        else:
+            residues.insert(position, AMINO_ACIDS[rng.integers(len(AMINO_ACIDS))])
+    return "".join(residues)
+
+
+def run(size: int, queries: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    hasher = MinHasher()
+    index = SequenceIndex(hasher.bands)
+    sequences = random_sequences(rng, size)
+    keys = [f"{i:064x}" for i in range(size)]
+    by_key = dict(zip(keys, sequences))
+
+    # Hashing happens once per structure when it is cached; loading the stored hashes is the startup cost
+    start = time.perf_counter()
+    band_hashes = np.array([hasher.band_hashes(sequence) for sequence in sequences])
+    hash_s = time.perf_counter() - start
+    # Bulk load (startup) for most of the index, then the rest one by one (new folds)
+    incremental = min(10000, size // 10)
+    start = time.perf_counter()
+    index.add_many(keys[:-incremental], band_hashes[:-incremental])
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for key, row in zip(keys[-incremental:], band_hashes[-incremental:]):
+        index.add(key, row)
+    add_us = (time.perf_counter() - start) / incremental * 1e6
+
+    def _lookup(sequence: str):
+        t = time.perf_counter()
+        candidates = index.candidates(hasher.band_hashes(sequence), CANDIDATES_PER_NEIGHBOUR)
+        query = encode(sequence)
+        scored = sorted(((sequence_identity(query, by_key[key]), key) for key, _ in candidates), reverse=True)
+        return (time.perf_counter() - t) * 1000, scored
+
+    targets = rng.integers(0, size, queries)
+    near_ms, hits = [], 0
+    for target in targets:
+        ms, scored = _lookup(mutate(rng, sequences[target]))
+        near_ms.append(ms)
+        hits += bool(scored) and scored[0][1] == keys[target]
+    novel_ms = [_lookup(q)[0] for q in random_sequences(rng, queries)]
+
+    def _pct(values, q):
+        return round(float(np.percentile(values, q)), 3)
+
+    return {
+        "sequences": size,
+        "hash_us_per_sequence": round(hash_s / size * 1e6, 1),
+        "bulk_load_seconds": round(load_s, 2),
+        "incremental_add_us": round(add_us, 1),
+        "index_mb": round(index.nbytes / 2 ** 20, 1),
+        "bytes_per_sequence": round(index.nbytes / size, 1),
+        "near_duplicate_recall_at_1": round(hits / queries, 4),
+        "near_duplicate_ms": {"p50": _pct(near_ms, 50), "p99": _pct(near_ms, 99), "mean": round(statistics.fmean(near_ms), 3)},
+        "novel_ms": {"p50": _pct(novel_ms, 50), "p99": _pct(novel_ms, 99), "mean": round(statistics.fmean(novel_ms), 3)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000", help="comma-separated index sizes")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = [run(int(size), args.queries, args.seed) for size in args.sizes.split(",")]
+    print(f"{'sequences':>10} {'MB':>7} {'recall@1':>9} {'near p50':>9} {'near p99':>9} {'novel p50':>10} {'load s':>7}")
+    for r in results:
+        print(f"{r['sequences']:>10} {r['index_mb']:>7} {r['near_duplicate_recall_at_1']:>9} "
+              f"{r['near_duplicate_ms']['p50']:>9} {r['near_duplicate_ms']['p99']:>9} {r['novel_ms']['p50']:>10} "
+              f"{r['bulk_load_seconds']:>7}")
+    print(json.dumps({"params": MinHasher().params, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
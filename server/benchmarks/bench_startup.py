@@ -0,0 +1,79 @@
+"""
+Measure server cold start: time to import `main` and time until /check and /ready answer.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_startup --port 8765 --runs 3
+
+Run it on the commit before and after a startup change to compare.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def time_import() -> float:
+    """Seconds for a fresh interpreter to `import main`."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def wait_for(url: str, deadline: float) -> float | None:
+    """Poll `url` until it returns 200; seconds since the call, or None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def time_server(port: int, timeout: float, load_mode: str) -> dict:
+    env = dict(os.environ, MODEL_LOAD_MODE=load_mode)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        check = wait_for(f"http://127.0.0.1:{port}/check", timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", timeout)
+        return {
+            "check_seconds": round(check, 2) if check is not None else None,
+            "ready_seconds": round(time.perf_counter() - start, 2) if ready is not None else None,
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--load-mode", default="background", choices=["background", "blocking"])
+    args = parser.parse_args()
+
+    results = []
+    for i in range(args.runs):
+        result = {"import_seconds": round(time_import(), 2)}
+        result.update(time_server(args.port, args.timeout, args.load_mode))
+        print(f"run {i + 1}: {result}", file=sys.stderr)
+        results.append(result)
+    print(json.dumps({"load_mode": args.load_mode, "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
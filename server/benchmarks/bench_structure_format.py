@@ -0,0 +1,102 @@
+"""
+Binary (.pstb) vs text PDB: disk footprint and load time into a parsed structure.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_structure_format --pdb-dir pdb_data --repeat 20
+
+For every PDB in the directory (plus a few synthetic folds when it is
+empty) this checks the lossless round trip, then compares sizes (text,
+gzip, zstd when installed, binary) and the time to get a PDBStructure:
+reading + parse_pdb for text, memory-map + decode for binary.
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from pdb_parser import parse_pdb
+from structure_format import encode, load
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _best_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdb-dir", default="pdb_data")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = {}
+    for path in sorted(glob.glob(os.path.join(args.pdb_dir, "*.pdb"))):
+        with open(path) as f:
+            texts[os.path.basename(path)] = f.read()
+    if not texts:
+        from fold_backends import synthetic_pdb
+
+        for length in (100, 250, 400):
+            texts[f"synthetic_{length}"] = synthetic_pdb(("MKTAYIAKQRQISFVKSHFSRQLEERLGLIEV" * 13)[:length])
+
+    totals = {"text": 0, "gzip": 0, "zstd": 0, "binary": 0}
+    text_ms, binary_ms = [], []
+    lossless = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, text in texts.items():
+            data = encode(text)
+            text_path = os.path.join(tmp, f"{name}.pdb")
+            binary_path = os.path.join(tmp, f"{name}.pstb")
+            with open(text_path, "w") as f:
+                f.write(text)
+            with open(binary_path, "wb") as f:
+                f.write(data)
+            lossless += load(binary_path).to_pdb() == text
+
+            totals["text"] += len(text.encode())
+            totals["gzip"] += len(gzip.compress(text.encode(), compresslevel=6))
+            if zstandard is not None:
+                totals["zstd"] += len(zstandard.ZstdCompressor(level=10).compress(text.encode()))
+            totals["binary"] += len(data)
+
+            def _load_text():
+                with open(text_path) as f:
+                    parse_pdb(f.read()).ca_coords()
+
+            def _load_binary():
+                load(binary_path).to_structure().ca_coords()
+
+            text_ms.append(_best_ms(_load_text, args.repeat))
+            binary_ms.append(_best_ms(_load_binary, args.repeat))
+
+    result = {
+        "structures": len(texts),
+        "lossless": lossless,
+        "bytes": {k: v for k, v in totals.items() if v},
+        "binary_vs_text": round(totals["binary"] / totals["text"], 3),
+        "load_ms_p50": {"text": round(statistics.median(text_ms), 3), "binary": round(statistics.median(binary_ms), 3)},
+        "load_speedup": round(statistics.median(text_ms) / statistics.median(binary_ms), 2),
+    }
+    print(f"{'format':<8} {'bytes':>12} {'vs text':>8}")
+    for fmt, size in result["bytes"].items():
+        print(f"{fmt:<8} {size:>12} {size / totals['text']:>8.3f}")
+    print(f"load p50: text {result['load_ms_p50']['text']} ms, binary {result['load_ms_p50']['binary']} ms "
+          f"({result['load_speedup']}x); lossless {lossless}/{len(texts)}")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
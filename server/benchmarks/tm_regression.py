@@ -0,0 +1,72 @@
+"""
+Regression check of the NumPy TM-align engine against the TM-align binary.
+
+Build the reference binary from the repo's TMAlign.cpp first:
+    g++ -O3 -ffast-math -lm -o TMalign TMAlign.cpp
+
+Then, from the server/ directory:
+    python -m benchmarks.tm_regression --tmalign ./TMalign --pairs 40
+
+Pairs are drawn from the PDB files in --pdb-dir (plus example1/example2).
+Exits non-zero if any TM-score differs by more than --tolerance.
+"""
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+from tm_align import tm_align, read_ca_coords
+
+# TM-score difference we accept against TM-align, in either normalization
+DEFAULT_TOLERANCE = 0.02
+
+
+def reference_scores(tmalign: str, path_a: str, path_b: str) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    out = subprocess.run([tmalign, path_a, path_b], capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    scores = [float(x) for x in re.findall(r"TM-score=\s*([0-9.]+)", out)[:2]]
+    return scores[0], scores[1], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tmalign", default="./TMalign")
+    parser.add_argument("--pdb-dir", default="pdb_data")
+    parser.add_argument("--pairs", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    files = sorted(os.path.join(args.pdb_dir, f) for f in os.listdir(args.pdb_dir) if f.endswith(".pdb"))
+    rng = random.Random(args.seed)
+    pairs = [tuple(rng.sample(files, 2)) for _ in range(args.pairs)]
+    if os.path.exists("example1.pdb") and os.path.exists("example2.pdb"):
+        pairs.append(("example1.pdb", "example2.pdb"))
+
+    worst = 0.0
+    engine_seconds = binary_seconds = 0.0
+    for path_a, path_b in pairs:
+        ref_a, ref_b, elapsed = reference_scores(args.tmalign, path_a, path_b)
+        binary_seconds += elapsed
+        with open(path_a) as fa, open(path_b) as fb:
+            xa, ya = read_ca_coords(fa.read()), read_ca_coords(fb.read())
+        start = time.perf_counter()
+        result = tm_align(xa, ya)
+        engine_seconds += time.perf_counter() - start
+        diff = max(abs(result.tm_score_a - ref_a), abs(result.tm_score_b - ref_b))
+        worst = max(worst, diff)
+        flag = "❌" if diff > args.tolerance else "✅"
+        print(f"{flag} {os.path.basename(path_a)[:12]} {os.path.basename(path_b)[:12]} "
+              f"TM-align=({ref_a:.4f}, {ref_b:.4f}) numpy=({result.tm_score_a:.4f}, {result.tm_score_b:.4f}) diff={diff:.4f}")
+
+    print(f"\n{len(pairs)} pairs, max |dTM| = {worst:.4f} (tolerance {args.tolerance})")
+    print(f"mean time per pair: numpy {engine_seconds / len(pairs):.3f}s, TM-align {binary_seconds / len(pairs):.3f}s")
+    sys.exit(0 if worst <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Cheap pre-fold screening of generated candidates.
+
+Folding is by far the most expensive step, so candidates that cannot be
+useful are rejected before they reach the fold API. Each rejection
+carries one reason:
+
+- prompt_echo:        nothing left after stripping the echoed reference
+- invalid_residue:    characters outside the 20 standard amino acids
+- length:             outside the absolute / reference-relative length window
+- composition:        one residue dominates the sequence
+- low_complexity:     Shannon entropy of the composition below the threshold
+- reference_identity: 3-mer identity to the reference outside the allowed range
+- duplicate:          already seen in this request
+
+Sequence checks are vectorized over the whole batch on a padded code matrix.
+"""
+import threading
+from collections import Counter
+
+import numpy as np
+
+from metrics import CANDIDATES_REJECTED
+from config import (
+    FILTER_MIN_LENGTH,
+    FILTER_MAX_LENGTH,
+    FILTER_MIN_LENGTH_RATIO,
+    FILTER_MAX_LENGTH_RATIO,
+    FILTER_MAX_RESIDUE_FRACTION,
+    FILTER_MIN_ENTROPY,
+    FILTER_MAX_KMER_IDENTITY,
+    FILTER_MIN_KMER_IDENTITY,
+)
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+INVALID = len(AMINO_ACIDS)
+KMER = 3
+
+# Byte -> residue code (0..19), INVALID for everything else
+_CODES = np.full(256, INVALID, dtype=np.uint8)
+for _code, _residue in enumerate(AMINO_ACIDS):
+    _CODES[ord(_residue)] = _code
+
+
+def clean_sequence(sequence: str) -> str:
+    return "".join(sequence.split()).upper()
+
+
+def strip_prompt_echo(candidate: str, reference: str) -> str:
+    """Generated text starts with the prompt; keep only what the model added."""
+    return candidate[len(reference):] if candidate.startswith(reference) else candidate
+
+
+def encode_batch(sequences: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(n, max_len) residue codes padded with INVALID, and the lengths."""
+    lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+    codes = np.full((len(sequences), max(lengths.max(initial=0), 1)), INVALID, dtype=np.uint8)
+    for i, sequence in enumerate(sequences):
+        codes[i, :len(sequence)] = _CODES[np.frombuffer(sequence.encode("latin-1", "replace"), dtype=np.uint8)]
+    return codes, lengths
+
+
+def kmer_presence(codes: np.ndarray) -> np.ndarray:
+    """(n, 20**KMER) bool: which valid k-mers occur in each sequence."""
+    n, width = codes.shape
+    presence = np.zeros((n, len(AMINO_ACIDS) ** KMER), dtype=bool)
+    if width < KMER:
+        return presence
+    windows = np.lib.stride_tricks.sliding_window_view(codes.astype(np.int64), KMER, axis=1)
+    valid = (windows < INVALID).all(axis=2)
+    ids = (windows * (len(AMINO_ACIDS) ** np.arange(KMER - 1, -1, -1))).sum(axis=2)
+    rows = np.broadcast_to(np.arange(n)[:, None], ids.shape)
+    presence[rows[valid], ids[valid]] = True
+    return presence
+
+
+def filter_candidates(
+    candidates: list[str],
+    reference: str,
+    seen: set[str] | None = None,
+) -> tuple[list[str], list[dict]]:
+    """
+    Screen generated candidates against `reference`.
+
+    Returns (accepted sequences in input order, rejections as
+    {"sequence", "reason"}). Accepted sequences are added to `seen`, so
+    repeated calls for one request also drop cross-round duplicates.
+    """
+    seen = set() if seen is None else seen
+    reference = clean_sequence(reference)
+    sequences = [strip_prompt_echo(clean_sequence(c), reference) for c in candidates]
+    reasons: list[str | None] = [None] * len(sequences)
+    if not sequences:
+        return [], []
+
+    codes, lengths = encode_batch(sequences)
+    counts = np.zeros((len(sequences), INVALID + 1), dtype=np.int64)
+    np.add.at(counts, (np.arange(len(sequences))[:, None], codes), 1)
+    counts[:, INVALID] -= codes.shape[1] - lengths  # padding is not a residue
+    residue_counts = counts[:, :INVALID]
+    safe_lengths = np.maximum(lengths, 1)
+
+    fractions = residue_counts / safe_lengths[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(fractions > 0, fractions * np.log2(fractions), 0.0).sum(axis=1)
+
+    ref_presence = kmer_presence(encode_batch([reference])[0])[0]
+    presence = kmer_presence(codes)
+    kmer_total = presence.sum(axis=1)
+    identity = (presence & ref_presence).sum(axis=1) / np.maximum(kmer_total, 1)
+
+    min_length = max(FILTER_MIN_LENGTH, int(FILTER_MIN_LENGTH_RATIO * len(reference)))
+    max_length = min(FILTER_MAX_LENGTH, int(FILTER_MAX_LENGTH_RATIO * len(reference)) or FILTER_MAX_LENGTH)
+
+    # Each rejected candidate reports the first check it fails
+    checks = [
+        ("prompt_echo", (lengths == 0) | np.array([s == reference for s in sequences])),
+        ("invalid_residue", counts[:, INVALID] > 0),
+        ("length", (lengths < min_length) | (lengths > max_length)),
+        ("composition", fractions.max(axis=1) > FILTER_MAX_RESIDUE_FRACTION),
+        ("low_complexity", entropy < FILTER_MIN_ENTROPY),
+        ("reference_identity", (identity > FILTER_MAX_KMER_IDENTITY) | (identity < FILTER_MIN_KMER_IDENTITY)),
+    ]
+    for reason, failed in checks:
+        for i in np.nonzero(failed)[0]:
+            if reasons[i] is None:
+                reasons[i] = reason
+
+    accepted = []
+    rejections = []
+    for sequence, reason in zip(sequences, reasons):
+        if reason is None and sequence in seen:
+            reason = "duplicate"
+        if reason is None:
+            seen.add(sequence)
+            accepted.append(sequence)
+        else:
+            rejections.append({"sequence": sequence, "reason": reason})
+
+    filter_stats.record(len(sequences), rejections)
+    return accepted, rejections
+
+
+class FilterStats:
+    """Process-wide counters: candidates screened and fold calls avoided, by reason."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.rejected = Counter()
+
+    def record(self, screened: int, rejections: list[dict]):
+        with self._lock:
+            self.screened += screened
+            self.rejected.update(r["reason"] for r in rejections)
+        for rejection in rejections:
+            CANDIDATES_REJECTED.inc(reason=rejection["reason"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avoided = sum(self.rejected.values())
+            return {
+                "screened": self.screened,
+                "accepted": self.screened - avoided,
+                "fold_calls_avoided": avoided,
+                "rejected_by_reason": dict(self.rejected),
+            }
+
+
+# Global instance
+filter_stats = FilterStats()
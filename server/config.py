@@ -0,0 +1,152 @@
+import os
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+# Upstream fold API politeness: shared token bucket for every request in the process
+FOLD_RATE_PER_SEC = _env_float("FOLD_RATE_PER_SEC", 1.0)
+FOLD_RATE_BURST = _env_int("FOLD_RATE_BURST", 2)
+
+# How many candidates of one /fetch_pdb request are processed at the same time
+CANDIDATE_CONCURRENCY = _env_int("CANDIDATE_CONCURRENCY", 4)
+
+# ESM Atlas fold endpoint and the pooled HTTP client used to reach it
+ESM_ATLAS_URL = os.getenv("ESM_ATLAS_URL", "https://api.esmatlas.com/foldSequence/v1/pdb/")
+HTTP_POOL_LIMIT = _env_int("HTTP_POOL_LIMIT", 32)
+HTTP_POOL_LIMIT_PER_HOST = _env_int("HTTP_POOL_LIMIT_PER_HOST", 8)
+HTTP_KEEPALIVE_TIMEOUT = _env_float("HTTP_KEEPALIVE_TIMEOUT", 30.0)
+HTTP_TOTAL_TIMEOUT = _env_float("HTTP_TOTAL_TIMEOUT", 120.0)
+HTTP_MAX_RETRIES = _env_int("HTTP_MAX_RETRIES", 3)
+HTTP_BACKOFF_BASE = _env_float("HTTP_BACKOFF_BASE", 0.5)
+HTTP_BACKOFF_MAX = _env_float("HTTP_BACKOFF_MAX", 8.0)
+
+# Folding backend: "remote" (ESM Atlas), "local" (ESMFold in-process) or "synthetic" (offline stand-in).
+# Each backend has its own concurrency limit and per-fold timeout in seconds.
+FOLD_BACKEND = os.getenv("FOLD_BACKEND", "remote")
+FOLD_REMOTE_CONCURRENCY = _env_int("FOLD_REMOTE_CONCURRENCY", 8)
+FOLD_REMOTE_TIMEOUT = _env_float("FOLD_REMOTE_TIMEOUT", 300.0)
+FOLD_LOCAL_MODEL = os.getenv("FOLD_LOCAL_MODEL", "facebook/esmfold_v1")
+FOLD_LOCAL_CONCURRENCY = _env_int("FOLD_LOCAL_CONCURRENCY", 1)
+FOLD_LOCAL_TIMEOUT = _env_float("FOLD_LOCAL_TIMEOUT", 600.0)
+# Synthetic backend latency: mean milliseconds per fold, +/- this fraction (deterministic per sequence)
+FOLD_SYNTHETIC_LATENCY_MS = _env_float("FOLD_SYNTHETIC_LATENCY_MS", 0.0)
+FOLD_SYNTHETIC_JITTER = _env_float("FOLD_SYNTHETIC_JITTER", 0.5)
+FOLD_SYNTHETIC_CONCURRENCY = _env_int("FOLD_SYNTHETIC_CONCURRENCY", 64)
+
+# Structure cache: "sharded" directories or a single "sqlite" store, plus an in-memory LRU front
+STRUCTURE_CACHE_BACKEND = os.getenv("STRUCTURE_CACHE_BACKEND", "sharded")
+STRUCTURE_CACHE_DIR = os.getenv("STRUCTURE_CACHE_DIR", "structure_cache")
+STRUCTURE_CACHE_CODEC = os.getenv("STRUCTURE_CACHE_CODEC", "zstd")
+STRUCTURE_CACHE_LRU_ENTRIES = _env_int("STRUCTURE_CACHE_LRU_ENTRIES", 256)
+STRUCTURE_CACHE_MAX_BYTES = _env_int("STRUCTURE_CACHE_MAX_BYTES", 0)  # 0 = unbounded
+STRUCTURE_CACHE_MAX_AGE_DAYS = _env_float("STRUCTURE_CACHE_MAX_AGE_DAYS", 0)  # 0 = never expire
+STRUCTURE_CACHE_BINARY = _env_int("STRUCTURE_CACHE_BINARY", 1)  # also write memory-mappable .pstb files
+LEGACY_PDB_DIR = os.getenv("LEGACY_PDB_DIR", "pdb_data")
+
+# GET /structure/{hash}: compressed bodies kept in memory, and the browser cache lifetime (immutable content)
+STRUCTURE_DELIVERY_CACHE_ENTRIES = _env_int("STRUCTURE_DELIVERY_CACHE_ENTRIES", 512)
+STRUCTURE_DELIVERY_MAX_AGE = _env_int("STRUCTURE_DELIVERY_MAX_AGE", 31536000)
+
+# Near-duplicate index over cached sequences: MinHash of k-mers split into LSH bands of `rows` values.
+# Candidates at or above SIMILARITY_FLAG_IDENTITY report their nearest known sequence; at or above
+# FOLD_REUSE_IDENTITY they reuse its structure instead of folding (0 = always fold).
+SIMILARITY_INDEX = _env_int("SIMILARITY_INDEX", 1)
+SIMILARITY_KMER = _env_int("SIMILARITY_KMER", 3)
+SIMILARITY_BANDS = _env_int("SIMILARITY_BANDS", 20)
+SIMILARITY_ROWS = _env_int("SIMILARITY_ROWS", 3)
+SIMILARITY_MAX_SHIFT = _env_int("SIMILARITY_MAX_SHIFT", 2)
+SIMILARITY_REFRESH_SECONDS = _env_float("SIMILARITY_REFRESH_SECONDS", 2.0)
+SIMILARITY_FLAG_IDENTITY = _env_float("SIMILARITY_FLAG_IDENTITY", 0.9)
+FOLD_REUSE_IDENTITY = _env_float("FOLD_REUSE_IDENTITY", 0.0)
+
+# ProtGPT2 micro-batching: max sequences per model.generate call and how long to wait to fill a batch
+GEN_MAX_BATCH_SIZE = _env_int("GEN_MAX_BATCH_SIZE", 16)
+GEN_MAX_WAIT_MS = _env_float("GEN_MAX_WAIT_MS", 20.0)
+
+# ProtGPT2 prompt cache: tokenized prompts and their past key/values per reference (0 MB = no KV reuse)
+PROMPT_CACHE_ENTRIES = _env_int("PROMPT_CACHE_ENTRIES", 32)
+PROMPT_CACHE_MAX_MB = _env_float("PROMPT_CACHE_MAX_MB", 512)
+
+# ProtGPT2 inference profile: "default" (fp32, torch threading defaults), "cpu-int8", "cpu-bf16" or "cpu-auto"
+INFERENCE_PROFILE = os.getenv("INFERENCE_PROFILE", "default")
+TORCH_INTRA_OP_THREADS = _env_int("TORCH_INTRA_OP_THREADS", 0)  # 0 = one per CPU core
+TORCH_INTER_OP_THREADS = _env_int("TORCH_INTER_OP_THREADS", 1)
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") not in ("0", "false", "False")
+
+# "background" loads ProtGPT2 after startup so /check answers immediately; "blocking" waits for it
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background")
+
+# Shared model server (python -m model_server): API workers reach it over this Unix socket instead of
+# loading their own copy of ProtGPT2 ("" = load the model in-process)
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+MODEL_SERVER_STATUS_INTERVAL = _env_float("MODEL_SERVER_STATUS_INTERVAL", 2.0)
+
+# Worker processes for CPU-bound structure scoring (0 = one per CPU core)
+TM_WORKERS = _env_int("TM_WORKERS", 0)
+
+# All-vs-all TM-score matrices: max structures per request and memoized pair scores kept in memory
+TM_MATRIX_MAX_STRUCTURES = _env_int("TM_MATRIX_MAX_STRUCTURES", 200)
+TM_MATRIX_MEMO_ENTRIES = _env_int("TM_MATRIX_MEMO_ENTRIES", 100000)
+
+# Parsed structures kept in memory, keyed by sequence hash
+PARSED_STRUCTURE_CACHE_ENTRIES = _env_int("PARSED_STRUCTURE_CACHE_ENTRIES", 512)
+
+# Secondary-structure (DSSP) worker processes (0 = one per CPU core) and cached assignments
+DSSP_WORKERS = _env_int("DSSP_WORKERS", 0)
+DSSP_CACHE_ENTRIES = _env_int("DSSP_CACHE_ENTRIES", 2048)
+
+# Persistent design-run job queue: SQLite file and concurrent jobs per process
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite")
+JOB_WORKERS = _env_int("JOB_WORKERS", 1)
+
+# Pre-fold candidate filter: length window (absolute, and relative to the reference),
+# composition / low-complexity limits and 3-mer identity to the reference
+FILTER_MIN_LENGTH = _env_int("FILTER_MIN_LENGTH", 30)
+FILTER_MAX_LENGTH = _env_int("FILTER_MAX_LENGTH", 400)  # ESM Atlas fold API limit
+FILTER_MIN_LENGTH_RATIO = _env_float("FILTER_MIN_LENGTH_RATIO", 0.5)
+FILTER_MAX_LENGTH_RATIO = _env_float("FILTER_MAX_LENGTH_RATIO", 2.0)
+FILTER_MAX_RESIDUE_FRACTION = _env_float("FILTER_MAX_RESIDUE_FRACTION", 0.35)
+FILTER_MIN_ENTROPY = _env_float("FILTER_MIN_ENTROPY", 3.0)  # bits; natural proteins are ~4.1
+FILTER_MAX_KMER_IDENTITY = _env_float("FILTER_MAX_KMER_IDENTITY", 0.95)
+FILTER_MIN_KMER_IDENTITY = _env_float("FILTER_MIN_KMER_IDENTITY", 0.0)
+
+# Generation oversampling to make up for filtered candidates: factor per round and max rounds
+GEN_OVERSAMPLE = _env_float("GEN_OVERSAMPLE", 1.5)
+GEN_MAX_ROUNDS = _env_int("GEN_MAX_ROUNDS", 3)
+
+# ProtGPT2 sampling: "free" (plain top-k) or "constrained" (length window and
+# mutation-rate cap against the reference, enforced while sampling)
+GEN_SAMPLING_MODE = os.getenv("GEN_SAMPLING_MODE", "free")
+GEN_CONSTRAINED_MIN_LENGTH_RATIO = _env_float("GEN_CONSTRAINED_MIN_LENGTH_RATIO", 0.8)
+GEN_CONSTRAINED_MAX_LENGTH_RATIO = _env_float("GEN_CONSTRAINED_MAX_LENGTH_RATIO", 1.2)
+GEN_CONSTRAINED_MAX_MUTATION_RATE = _env_float("GEN_CONSTRAINED_MAX_MUTATION_RATE", 0.5)
+
+# Adaptive design search (POST /design_search): default budgets per request (0 = unbounded) and
+# candidates generated per round (0 = CANDIDATE_CONCURRENCY)
+SEARCH_MAX_FOLD_CALLS = _env_int("SEARCH_MAX_FOLD_CALLS", 32)
+SEARCH_MAX_SECONDS = _env_float("SEARCH_MAX_SECONDS", 300.0)
+SEARCH_MAX_TOKENS = _env_int("SEARCH_MAX_TOKENS", 0)
+SEARCH_ROUND_SIZE = _env_int("SEARCH_ROUND_SIZE", 0)
+
+# Batch design (POST /fetch_pdb/batch): references designed at once (0 = one per CPU core),
+# FASTA records per upload, and the longest FASTA line accepted while parsing the stream
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", 0)
+BATCH_MAX_REFERENCES = _env_int("BATCH_MAX_REFERENCES", 1000)
+BATCH_MAX_LINE_BYTES = _env_int("BATCH_MAX_LINE_BYTES", 1 << 20)
+
+# Derived-result cache (TM-scores, DSSP, descriptions); empty path = in-memory only
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite")
+RESULT_CACHE_LRU_ENTRIES = _env_int("RESULT_CACHE_LRU_ENTRIES", 4096)
+RESULT_CACHE_MAX_ENTRIES = _env_int("RESULT_CACHE_MAX_ENTRIES", 1000000)  # 0 = unbounded
+
+# Prometheus metrics on /metrics and timing spans (0 turns both into no-ops;
+# per-request timing breakdowns still work when a request asks for them)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
@@ -0,0 +1,183 @@
+"""
+Constrained ProtGPT2 sampling.
+
+A logits processor keeps every sampled row inside a residue-length window
+relative to its reference and caps its mutation rate against the
+reference, position by position (the continuation is compared residue for
+residue with the reference, without gaps). Tokens that would break either
+constraint are masked before top-k sampling; a row left with no allowed
+token is terminated by the stopping criteria, as is a row that reached the
+top of its length window, instead of sampling up to the token budget.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from candidate_filter import AMINO_ACIDS, INVALID, clean_sequence, encode_batch
+from config import (
+    GEN_CONSTRAINED_MIN_LENGTH_RATIO,
+    GEN_CONSTRAINED_MAX_LENGTH_RATIO,
+    GEN_CONSTRAINED_MAX_MUTATION_RATE,
+)
+from metrics import GENERATION_ROWS_TERMINATED
+
+# The mutation cap only bites after this many residues, so one early substitution is not fatal
+GRACE_RESIDUES = 10
+
+
+@dataclass(frozen=True)
+class SamplingConstraints:
+    reference: str
+    min_length: int
+    max_length: int
+    max_mutation_rate: float
+
+    @classmethod
+    def for_reference(cls, reference: str) -> "SamplingConstraints":
+        reference = clean_sequence(reference)
+        return cls(
+            reference=reference,
+            min_length=max(1, int(GEN_CONSTRAINED_MIN_LENGTH_RATIO * len(reference))),
+            max_length=max(1, int(GEN_CONSTRAINED_MAX_LENGTH_RATIO * len(reference))),
+            max_mutation_rate=GEN_CONSTRAINED_MAX_MUTATION_RATE,
+        )
+
+
+class TokenTable:
+    """Residue content of every vocabulary token: codes (V, width), residue counts and validity."""
+
+    def __init__(self, tokenizer):
+        residue_set = set(AMINO_ACIDS)
+        residues = []
+        valid = []
+        for token_id in range(len(tokenizer)):
+            text = tokenizer.decode([token_id])
+            stripped = "".join(text.split())
+            # Residues and FASTA line breaks only; special tokens and other characters are never sampled
+            ok = bool(text) and set(stripped) <= residue_set and token_id not in tokenizer.all_special_ids
+            residues.append(stripped if ok else "")
+            valid.append(ok)
+        self.codes, self.counts = encode_batch(residues)
+        self.valid = np.array(valid)
+        self.width = self.codes.shape[1]
+
+
+_tables: dict[int, TokenTable] = {}
+
+
+def get_token_table(tokenizer) -> TokenTable:
+    """One table per tokenizer, built on first use (one decode per vocabulary entry)."""
+    table = _tables.get(id(tokenizer))
+    if table is None:
+        table = _tables[id(tokenizer)] = TokenTable(tokenizer)
+    return table
+
+
+class ConstraintState:
+    """Per-row residue and mismatch counts, advanced from the generated tokens."""
+
+    def __init__(self, table: TokenTable, constraints: list[SamplingConstraints], prompt_width: int, eos_token_id: int):
+        self.table = table
+        self.eos_token_id = eos_token_id
+        self.references = [encode_batch([c.reference])[0][0][:len(c.reference)] for c in constraints]
+        self.min_residues = np.array([c.min_length for c in constraints])
+        self.max_residues = np.array([c.max_length for c in constraints])
+        self.max_rate = np.array([c.max_mutation_rate for c in constraints])
+        self.residues = np.zeros(len(constraints), dtype=np.int64)
+        self.mismatches = np.zeros(len(constraints), dtype=np.int64)
+        self.finished = np.zeros(len(constraints), dtype=bool)
+        self.dead = np.zeros(len(constraints), dtype=bool)
+        self._synced = prompt_width
+
+    def sync(self, input_ids):
+        """Account for tokens appended since the last call (processor and stopping criteria share this)."""
+        if input_ids.shape[1] <= self._synced:
+            return
+        new_tokens = input_ids[:, self._synced:].cpu().numpy()
+        self._synced = input_ids.shape[1]
+        for column in new_tokens.T:
+            for row, token_id in enumerate(column.tolist()):
+                if self.finished[row]:
+                    continue
+                if token_id == self.eos_token_id:
+                    self.finished[row] = True
+                    continue
+                count = int(self.table.counts[token_id]) if token_id < len(self.table.counts) else 0
+                start = self.residues[row]
+                reference = self.references[row][start:start + count]
+                codes = self.table.codes[token_id, :len(reference)]
+                self.mismatches[row] += int((codes != reference).sum())
+                self.residues[row] += count
+
+    def allowed(self, row: int) -> np.ndarray:
+        """(V,) bool: tokens row `row` may sample next."""
+        table = self.table
+        position = self.residues[row]
+        after = position + table.counts
+        allowed = table.valid & (after <= self.max_residues[row])
+
+        reference = self.references[row]
+        mismatches = np.zeros(len(table.counts), dtype=np.int64)
+        for j in range(min(table.width, len(reference) - position)):
+            column = table.codes[:, j]
+            mismatches += (column != reference[position + j]) & (column != INVALID)
+        allowed &= self.mismatches[row] + mismatches <= self.max_rate[row] * np.maximum(after, GRACE_RESIDUES)
+
+        if position >= self.min_residues[row]:
+            allowed[self.eos_token_id] = True
+        if not allowed.any():
+            self.dead[row] = True
+            allowed[self.eos_token_id] = True
+        return allowed
+
+
+class ConstrainedLogitsProcessor:
+    """Masks tokens that would leave the length window or exceed the mutation cap."""
+
+    def __init__(self, state: ConstraintState):
+        self.state = state
+
+    def __call__(self, input_ids, scores):
+        import torch
+
+        state = self.state
+        state.sync(input_ids)
+        blocked = np.zeros(scores.shape, dtype=bool)
+        vocab = min(scores.shape[1], len(state.table.counts))
+        blocked[:, vocab:] = True
+        for row in range(scores.shape[0]):
+            if not state.finished[row]:
+                blocked[row, :vocab] = ~state.allowed(row)[:vocab]
+        return scores.masked_fill(torch.from_numpy(blocked).to(scores.device), -float("inf"))
+
+
+class ConstrainedStoppingCriteria:
+    """Per-row stop once a row reaches its maximum length or has no allowed continuation."""
+
+    def __init__(self, state: ConstraintState):
+        self.state = state
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        state = self.state
+        state.sync(input_ids)
+        done = ~state.finished & (state.dead | (state.residues >= state.max_residues))
+        terminated = int((done & state.dead).sum())
+        if terminated:
+            GENERATION_ROWS_TERMINATED.inc(terminated)
+        state.finished |= done
+        return torch.from_numpy(state.finished.copy()).to(input_ids.device)
+
+
+def build_constraints(tokenizer, constraints: list[SamplingConstraints], prompt_width: int, eos_token_id: int):
+    """(logits processor list, stopping criteria list) for one batch, one constraint per row."""
+    from transformers import LogitsProcessorList, StoppingCriteriaList
+
+    state = ConstraintState(get_token_table(tokenizer), constraints, prompt_width, eos_token_id)
+    return LogitsProcessorList([ConstrainedLogitsProcessor(state)]), StoppingCriteriaList([ConstrainedStoppingCriteria(state)])
+
+
+def token_budget(constraints: SamplingConstraints) -> int:
+    """New tokens that always fit the length window (one residue per token, plus FASTA line breaks)."""
+    return constraints.max_length + constraints.max_length // 60 + 2
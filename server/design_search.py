@@ -0,0 +1,254 @@
+"""
+Adaptive design search: generate, fold and score until enough good candidates.
+
+The caller sets a target (`count` candidates with TM-score >= `min_tm_score`)
+and a budget (fold calls, wall-clock seconds, model tokens). Generation
+runs in rounds that overlap the folds in flight: a new round starts as soon
+as the candidates waiting to fold run low, so the model and the fold
+backend work at the same time. The search stops the moment the target is
+met (cancelling the folds still running) or a budget runs out. Structures
+already in the cache, served from a near-identical relative or being folded
+for another request cost no fold call.
+"""
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+
+from candidate_filter import clean_sequence, filter_candidates, strip_prompt_echo
+from config import (
+    CANDIDATE_CONCURRENCY,
+    GEN_OVERSAMPLE,
+    GEN_MAX_ROUNDS,
+    GEN_SAMPLING_MODE,
+    SEARCH_MAX_FOLD_CALLS,
+    SEARCH_MAX_SECONDS,
+    SEARCH_MAX_TOKENS,
+    SEARCH_ROUND_SIZE,
+)
+from fetch_biosimilars import generate_biosimilars_async
+from http_client import fold_single_flight
+from metrics import span
+from model_loader import model_loader
+from pipeline import process_candidate
+from structure_cache import structure_cache, structure_key
+
+# ProtGPT2's BPE averages about four residues per token; used when the model is not loaded in-process
+RESIDUES_PER_TOKEN = 4
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    count: int = 2
+    min_tm_score: float = 0.5
+
+    def __post_init__(self):
+        if self.count < 1:
+            raise ValueError("target_count must be at least 1")
+
+
+@dataclass(frozen=True)
+class SearchBudget:
+    # 0 = unbounded; at least one must be set
+    max_fold_calls: int = SEARCH_MAX_FOLD_CALLS
+    max_seconds: float = SEARCH_MAX_SECONDS
+    max_tokens: int = SEARCH_MAX_TOKENS
+
+    def __post_init__(self):
+        if min(self.max_fold_calls, self.max_seconds, self.max_tokens) < 0:
+            raise ValueError("budgets must not be negative")
+        if not (self.max_fold_calls or self.max_seconds or self.max_tokens):
+            raise ValueError("at least one of max_fold_calls, max_seconds and max_tokens must be set")
+
+
+def count_tokens(sampled: list[str], reference: str) -> int:
+    """Model tokens spent on the generated continuations of `sampled`."""
+    tokenizer = getattr(model_loader, "tokenizer", None)
+    total = 0
+    for sequence in sampled:
+        continuation = strip_prompt_echo(clean_sequence(sequence), reference)
+        if tokenizer is not None:
+            total += len(tokenizer(continuation)["input_ids"])
+        else:
+            total += math.ceil(len(continuation) / RESIDUES_PER_TOKEN)
+    return total
+
+
+class DesignSearch:
+    """State of one search; `run()` returns its summary."""
+
+    def __init__(self, fold_seq: str, original_pdb: str, target: SearchTarget, budget: SearchBudget,
+                 original_key: str | None = None, sampling: str = GEN_SAMPLING_MODE, round_size: int = SEARCH_ROUND_SIZE,
+                 started_at: float | None = None):
+        self.fold_seq = fold_seq
+        self.reference = clean_sequence(fold_seq)
+        self.original_pdb = original_pdb
+        # Cache key of the reference structure served (fetch_structure); its own key by default
+        self.original_key = original_key or structure_key(fold_seq)
+        self.target = target
+        self.budget = budget
+        self.sampling = sampling
+        self.round_size = round_size or CANDIDATE_CONCURRENCY
+        self.started_at = time.monotonic() if started_at is None else started_at
+
+        self.waiting: deque[str] = deque()
+        self.folding: set[asyncio.Task] = set()
+        self.generating: asyncio.Task | None = None
+        self.seen: set[str] = set()
+        # Structure keys sent to process_candidate, and those charged a fold call
+        self.dispatched: set[str] = set()
+        self.charged: set[str] = set()
+        self.records: list[dict] = []
+        self.hits: list[dict] = []
+        self.rejected: Counter = Counter()
+        self.rounds = 0
+        self.empty_rounds = 0
+        self.sampled = 0
+        self.launched = 0
+        self.fold_calls = 0
+        self.cached_folds = 0
+        self.tokens = 0
+        self.cancelled_folds = 0
+        self.stop_reason: str | None = None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def _folds_left(self) -> float:
+        return self.budget.max_fold_calls - self.fold_calls if self.budget.max_fold_calls else math.inf
+
+    def _time_left(self) -> float | None:
+        return self.budget.max_seconds - self.elapsed() if self.budget.max_seconds else None
+
+    async def _dispatch(self):
+        """
+        Start folding waiting candidates while there is room. Cached structures
+        and folds already in flight (shared through fold_single_flight) are free.
+        """
+        while self.waiting and len(self.folding) < CANDIDATE_CONCURRENCY:
+            sequence = self.waiting.popleft()
+            key = structure_key(sequence)
+            if key in self.dispatched:
+                self.rejected["duplicate"] += 1
+                continue
+            self.dispatched.add(key)
+            if key in fold_single_flight or await structure_cache.contains(key):
+                self.cached_folds += 1
+            elif self._folds_left() > 0:
+                self.fold_calls += 1
+                self.charged.add(key)
+            else:
+                self.rejected["fold_budget"] += 1
+                continue
+            self.folding.add(asyncio.create_task(
+                process_candidate(self.launched, sequence, self.original_pdb, self.original_key)))
+            self.launched += 1
+
+    def _maybe_generate(self):
+        """Start the next generation round once the waiting candidates run low."""
+        if self.generating is not None or len(self.waiting) >= self.round_size:
+            return
+        if self.empty_rounds >= GEN_MAX_ROUNDS:
+            # The filter rejected every sample of the last rounds; more of the same will not help
+            return
+        wanted = min(self.round_size, self._folds_left() - len(self.waiting))
+        if wanted <= 0 or (self.budget.max_tokens and self.tokens >= self.budget.max_tokens):
+            return
+        self.generating = asyncio.create_task(self._generate(int(wanted)))
+
+    async def _generate(self, wanted: int) -> tuple[list[str], list[dict]]:
+        sampled = await generate_biosimilars_async(
+            model_loader, self.fold_seq, num_return_sequences=math.ceil(wanted * GEN_OVERSAMPLE),
+            sampling=self.sampling,
+        )
+        self.sampled += len(sampled)
+        self.tokens += count_tokens(sampled, self.reference)
+        with span("filter"):
+            return filter_candidates(sampled, self.fold_seq, self.seen)
+
+    def _check_stop(self) -> str | None:
+        if len(self.hits) >= self.target.count:
+            return "target_met"
+        time_left = self._time_left()
+        if time_left is not None and time_left <= 0:
+            return "time_budget"
+        if self.folding or self.generating is not None or self.waiting:
+            return None
+        # Nothing running or waiting and nothing more may start
+        if self.empty_rounds >= GEN_MAX_ROUNDS:
+            return "no_candidates"
+        if self._folds_left() <= 0:
+            return "fold_budget"
+        return "token_budget"
+
+    def _collect(self, task: asyncio.Task):
+        if task is self.generating:
+            self.generating = None
+            kept, rejections = task.result()  # generation errors (e.g. model loading) end the search
+            self.rounds += 1
+            self.empty_rounds = 0 if kept else self.empty_rounds + 1
+            self.rejected.update(r["reason"] for r in rejections)
+            self.waiting.extend(kept)
+            return
+        self.folding.discard(task)
+        record = task.result()
+        key = structure_key(record["sequence"])
+        if record["reused_from"] is not None and key in self.charged:
+            # A relative's cached structure stood in (FOLD_REUSE_IDENTITY): refund the fold call charged at dispatch
+            self.charged.discard(key)
+            self.fold_calls -= 1
+            self.cached_folds += 1
+        self.records.append(record)
+        if record["tm_score"] is not None and record["tm_score"] >= self.target.min_tm_score:
+            self.hits.append(record)
+
+    async def run(self) -> dict:
+        try:
+            while True:
+                await self._dispatch()
+                self._maybe_generate()
+                self.stop_reason = self._check_stop()
+                if self.stop_reason is not None:
+                    break
+                running = self.folding | {self.generating} - {None}
+                done, _ = await asyncio.wait(running, timeout=self._time_left(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._collect(task)
+        finally:
+            # Stopped early (target met, budget out or client gone): drop the work still running
+            leftover = [t for t in (*self.folding, self.generating) if t is not None]
+            self.cancelled_folds = sum(not task.done() for task in self.folding)
+            for task in leftover:
+                task.cancel()
+            await asyncio.gather(*leftover, return_exceptions=True)
+        return self.summary()
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed()
+        hits = sorted(self.hits, key=lambda r: r["tm_score"], reverse=True)
+        folded = [r for r in self.records if r["pdb_data"] is not None]
+        return {
+            "stop_reason": self.stop_reason,
+            "target": asdict(self.target),
+            "budget": asdict(self.budget),
+            "hits": hits,
+            "candidates": [{k: v for k, v in r.items() if k != "pdb_data"} for r in sorted(self.records, key=lambda r: r["index"])],
+            "rounds": self.rounds,
+            "generated": self.sampled,
+            "rejected": dict(self.rejected),
+            "folded": len(folded),
+            "fold_calls": self.fold_calls,
+            "cached_folds": self.cached_folds,
+            "cancelled_folds": self.cancelled_folds,
+            "model_tokens": self.tokens,
+            "elapsed_seconds": round(elapsed, 3),
+            "yield_per_fold_call": round(len(hits) / self.fold_calls, 4) if self.fold_calls else None,
+            "yield_per_second": round(len(hits) / elapsed, 4) if elapsed > 0 else None,
+        }
+
+
+async def design_search(fold_seq: str, original_pdb: str, target: SearchTarget, budget: SearchBudget,
+                        **kwargs) -> dict:
+    """Run one adaptive search; see DesignSearch for the keyword arguments."""
+    return await DesignSearch(fold_seq, original_pdb, target, budget, **kwargs).run()
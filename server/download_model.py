@@ -8,6 +8,8 @@ def download_model(model_id: str = "nferruz/ProtGPT2", model_dir: str = "model_d
     Args:
         model_id: HuggingFace model identifier
         model_dir: Directory to save the model
+
+    The model is written as safetensors so the server can memory-map it at load time.
     """
     print(f"Downloading model {model_id} to {model_dir}...")
     
@@ -23,7 +25,10 @@ def download_model(model_id: str = "nferruz/ProtGPT2", model_dir: str = "model_d
         # Download and save model
         print("Downloading model...")
         model = AutoModelForCausalLM.from_pretrained(model_id, cache_dir=model_dir)
-        model.save_pretrained(os.path.join(model_dir, model_id.replace("/", "--")))
+        model.save_pretrained(
+            os.path.join(model_dir, model_id.replace("/", "--")),
+            safe_serialization=True
+        )
         
         print("✅ Download completed successfully!")
         print(f"Model saved to: {os.path.join(model_dir, model_id.replace('/', '--'))}")
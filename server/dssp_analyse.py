@@ -1,65 +1,43 @@
-import mdtraj as md
-from collections import Counter
 import asyncio
 
-async def analyze_pdb_full(pdb_file):
+from dssp_serve import dssp_service
+from pdb_analyse import summarize_structure
+from pdb_parser import get_structure, text_key
+from result_cache import result_cache
+
+async def analyze_pdb_full(pdb_file=None, pdb_text=None, key=None):
     """
     Async function that combines custom PDB parsing and secondary structure analysis.
+    Takes a PDB file path or the PDB text itself (with its sequence hash as `key`,
+    so a structure already parsed for scoring is reused).
     Returns a single natural-language summary string.
     """
+    if pdb_text is None:
+        def _read():
+            with open(pdb_file, 'r') as f:
+                return f.read()
 
-    # ---------------------------
-    # Custom PDB parsing
-    # ---------------------------
-    chains = {}
-    residues_set = set()
-    atom_count = 0
-
-    async def parse_custom():
-        nonlocal chains, residues_set, atom_count
-        with open(pdb_file, 'r') as f:
-            for line in f:
-                if line.startswith("ATOM") or line.startswith("HETATM"):
-                    atom_count += 1
-                    chain_id = line[21].strip()
-                    res_seq = int(line[22:26].strip())
-                    res_name = line[17:20].strip()
-
-                    # Track residues per chain
-                    if chain_id not in chains:
-                        chains[chain_id] = {}
-                    chains[chain_id][res_seq] = res_name
+        pdb_text = await asyncio.to_thread(_read)
 
-                    # Track unique residues overall
-                    residues_set.add((chain_id, res_seq, res_name))
+    # Memoized by structure content, so a structure seen before is not described again
+    return await result_cache.get_or_compute("description", (text_key(pdb_text),), lambda: _describe(pdb_text, key))
 
-    await parse_custom()
 
-    total_chains = len(chains)
-    total_residues = len(residues_set)
+async def _describe(pdb_text, key):
+    # One parse shared by the summary and DSSP, off the event loop
+    structure = await asyncio.to_thread(get_structure, pdb_text, key)
 
-    # Generate per-chain residue count
-    chain_residue_counts = {cid: len(chain) for cid, chain in chains.items()}
-
-    # Simple “n-mer” detection: first 5 residues per chain
-    chain_first_residues = {
-        cid: "".join([res for _, res in sorted([(seq, res) for seq, res in chain.items()])][:5])
-        for cid, chain in chains.items()
-    }
-
-    custom_summary = f"The protein contains {total_residues} residues across {total_chains} chain(s): "
-    parts = []
-    for cid in sorted(chains.keys()):
-        parts.append(f"chain {cid} has {chain_residue_counts[cid]} residues, starting with {chain_first_residues[cid]}")
-    custom_summary += "; ".join(parts) + f". Total atoms in structure: {atom_count}."
+    # ---------------------------
+    # Custom PDB parsing
+    # ---------------------------
+    custom_summary = summarize_structure(structure)
 
     # ---------------------------
-    # MDTraj DSSP secondary structure analysis
+    # DSSP secondary structure analysis (worker pool, cached by structure hash)
     # ---------------------------
     async def parse_secondary_structure():
-        traj = md.load_pdb(pdb_file)
-        ss = md.compute_dssp(traj)[0]  # first model
-        ss_counts = Counter(ss)
+        result = await dssp_service.assign(pdb_text, key)
+        ss_counts = result.counts
         ss_labels = {
             'H': 'alpha-helix',
             'B': 'isolated beta-bridge',
@@ -71,7 +49,7 @@ async def analyze_pdb_full(pdb_file):
             '-': 'coil'
         }
         readable_counts = {ss_labels.get(k, k): v for k, v in ss_counts.items()}
-        total_residues = len(ss)
+        total_residues = len(result.ss)
 
         ss_summary = f"It is composed of "
         parts = []
@@ -1,46 +1,126 @@
-import tempfile, io, asyncio
-from Bio.PDB import PDBParser, DSSP, PDBIO
+"""
+Secondary-structure (DSSP) assignment off the event loop.
 
-async def run_dssp(pdb_string: str) -> str:
+Assignments run on a bounded process pool straight from parsed
+structures (no temporary files) and are cached by structure hash, so a
+structure is assigned once no matter how many callers ask for it.
+Assignments also persist in the derived-result cache (by content hash).
+"""
+import asyncio
+import os
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from config import DSSP_WORKERS, DSSP_CACHE_ENTRIES
+from http_client import SingleFlight
+from metrics import DSSP_CACHE_REQUESTS, span
+from pdb_parser import PDBStructure, get_structure, text_key, to_mdtraj
+from result_cache import result_cache
+
+# Full DSSP code -> the three-state code mdtraj reports with simplified=True
+# ("X" marks non-protein residues, reported by mdtraj as "NA")
+SIMPLIFIED = {"H": "H", "G": "H", "I": "H", "E": "E", "B": "E", "T": "C", "S": "C", "-": "C", "X": "NA"}
+
+# Map DSSP codes to numbers (for coloring in 3Dmol by B-factor)
+SS_BFACTOR = {"H": 1, "B": 2, "E": 3, "G": 4, "I": 5, "T": 6, "S": 7, "-": 0}
+
+
+@dataclass
+class SecondaryStructure:
+    ss: str                 # one full DSSP code per residue ("-" for loops)
+    counts: dict[str, int]  # simplified (H/E/C) counts, in order of first appearance
+
+    @property
+    def simplified(self) -> str:
+        return "".join(SIMPLIFIED.get(code, code) for code in self.ss)
+
+
+def assign_secondary_structure(structure: PDBStructure) -> str:
+    """Per-residue DSSP codes of a parsed structure (worker process)."""
+    import mdtraj as md  # heavy; imported on first use
+
+    codes = md.compute_dssp(to_mdtraj(structure), simplified=False)[0]
+    return "".join("-" if code == " " else "X" if code == "NA" else code for code in codes)
+
+
+class DSSPService:
+    """Bounded process pool for DSSP plus an LRU of assignments keyed by structure hash."""
+
+    def __init__(self, max_workers: int = DSSP_WORKERS, max_entries: int = DSSP_CACHE_ENTRIES):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_entries = max_entries
+        self._executor: ProcessPoolExecutor | None = None
+        self._entries: OrderedDict[str, SecondaryStructure] = OrderedDict()
+        self._single_flight = SingleFlight()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def assign(self, pdb_text: str, key: str | None = None) -> SecondaryStructure:
+        """Secondary structure of a PDB text; pass the sequence hash as `key` when known."""
+        if key is None:
+            key = text_key(pdb_text)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            DSSP_CACHE_REQUESTS.inc(result="hit")
+            return result
+        DSSP_CACHE_REQUESTS.inc(result="miss")
+        return await self._single_flight.do(key, lambda: self._compute(pdb_text, key))
+
+    async def _compute(self, pdb_text: str, key: str) -> SecondaryStructure:
+        async def _assign():
+            structure = await asyncio.to_thread(get_structure, pdb_text, key)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), assign_secondary_structure, structure)
+
+        with span("dssp"):
+            ss = await result_cache.get_or_compute("dssp", (text_key(pdb_text),), _assign)
+
+        result = SecondaryStructure(ss=ss, counts={})
+        result.counts = dict(Counter(result.simplified))
+        self._entries[key] = result
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+
+# Global instance
+dssp_service = DSSPService()
+
+
+def _write_ss_bfactor(pdb_string: str, key: str | None, ss: str) -> str:
+    """`pdb_string` with each first-model atom's B-factor set from its residue's DSSP code."""
+    structure = get_structure(pdb_string, key)
+    values = [SS_BFACTOR.get(ss[residue], 0) for residue in structure.residue_index.tolist()]
+
+    # Rewrite the B-factor column of the first model's atoms in place
+    lines = pdb_string.splitlines(keepends=True)
+    atom = 0
+    for i, line in enumerate(lines):
+        if line.startswith("ENDMDL"):
+            break
+        if line.startswith(("ATOM  ", "HETATM")):
+            body = line.rstrip("\r\n")
+            lines[i] = body[:60].ljust(60) + f"{values[atom]:6.2f}" + body[66:] + line[len(body):]
+            atom += 1
+    return "".join(lines)
+
+
+async def run_dssp(pdb_string: str, key: str | None = None) -> str:
     """
     Takes a raw PDB string, runs DSSP,
     and returns a modified PDB string with
     secondary structure encoded in B-factor.
     """
-    # Write PDB string to a temporary file (DSSP requires file path)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdb") as tmp:
-        tmp.write(pdb_string.encode())
-        pdb_path = tmp.name
-
-    # Parse structure
-    parser = PDBParser(QUIET=True)
-    structure = parser.get_structure("prot", pdb_path)
-    model = structure[0]
-
-    # Run DSSP in a thread (since it's blocking)
-    def _dssp():
-        return DSSP(model, pdb_path)
-
-    dssp = await asyncio.to_thread(_dssp)
-
-    # Map DSSP codes to numbers (for coloring in 3Dmol by B-factor)
-    ss_map = {"H": 1, "B": 2, "E": 3, "G": 4, "I": 5, "T": 6, "S": 7, "-": 0}
-
-    for key in dssp.keys():
-        chain, res_id = key
-        res_num = res_id[1]
-        try:
-            residue = model[chain][res_num]
-            ss_code = dssp[key][2]
-            for atom in residue:
-                atom.set_bfactor(ss_map.get(ss_code, 0))
-        except Exception:
-            continue
-
-    # Save modified PDB to string
-    io_out = io.StringIO()
-    io_obj = PDBIO()
-    io_obj.set_structure(structure)
-    io_obj.save(io_out)
-
-    return io_out.getvalue()
+    result = await dssp_service.assign(pdb_string, key)
+    # Parsing and rewriting a large structure would stall the event loop
+    return await asyncio.to_thread(_write_ss_bfactor, pdb_string, key, result.ss)
@@ -1,6 +1,11 @@
-import asyncio
+import math
 from typing import List
 from fastapi import HTTPException
+from candidate_filter import filter_candidates
+from config import GEN_OVERSAMPLE, GEN_MAX_ROUNDS, GEN_SAMPLING_MODE
+from constrained_sampling import SamplingConstraints
+from generation_scheduler import get_scheduler
+from metrics import span
 
 async def generate_biosimilars_async(
     model_loader,  # Just add this parameter
@@ -10,39 +15,77 @@ async def generate_biosimilars_async(
     top_k: int = 950,
     repetition_penalty: float = 1.2,
     eos_token_id: int = 0,
+    sampling: str = GEN_SAMPLING_MODE,
 ) -> List[str]:
     """
     Asynchronously generate protein sequences using the pre-loaded ProtGPT2 model.
+    `sampling="constrained"` keeps samples inside a length window and mutation
+    cap relative to `fold_sequence` and stops them early when they cannot.
     """
+    if sampling not in ("free", "constrained"):
+        raise ValueError(f"Unknown sampling mode {sampling!r}; expected 'free' or 'constrained'")
 
-    def _run_generation():
-        """Synchronous function to run the model generation."""
-        if not model_loader.is_loaded:
-            raise HTTPException(status_code=500, detail="Model not loaded")
-        
-        # Preprocess the input sequence to follow FASTA format
-        # Remove any existing newlines and format with 60 amino acids per line
-        processed_sequence = preprocess_sequence(fold_sequence)
-        
-        # Generate sequences using the pre-loaded model
-        sequences = model_loader.protgpt2(
+    if not model_loader.is_loaded:
+        if model_loader.state == "loading":
+            raise HTTPException(status_code=503, detail="Model is still loading")
+        if model_loader.state == "unavailable":
+            raise HTTPException(status_code=503, detail="Model server unavailable")
+        raise HTTPException(status_code=500, detail="Model not loaded")
+
+    # Preprocess the input sequence to follow FASTA format
+    # Remove any existing newlines and format with 60 amino acids per line
+    processed_sequence = preprocess_sequence(fold_sequence)
+
+    # Concurrent requests are micro-batched into shared model.generate calls
+    with span("generation"):
+        sequences = await get_scheduler(model_loader).submit(
             processed_sequence,
+            num_return_sequences=num_return_sequences,
             max_length=max_length,
-            do_sample=True,
             top_k=top_k,
             repetition_penalty=repetition_penalty,
-            num_return_sequences=num_return_sequences,
-            eos_token_id=eos_token_id
+            eos_token_id=eos_token_id,
+            constraints=SamplingConstraints.for_reference(fold_sequence) if sampling == "constrained" else None,
         )
-        
-        # Extract just the generated text and remove newlines
-        return [clean_generated_sequence(seq['generated_text']) for seq in sequences]
-    
-    # Run the synchronous generation function in a thread pool
-    loop = asyncio.get_event_loop()
-    results = await loop.run_in_executor(None, _run_generation)
-    
-    return results
+
+    # Extract just the generated text and remove newlines
+    return [clean_generated_sequence(seq) for seq in sequences]
+
+
+async def generate_candidates_async(
+    model_loader,
+    fold_sequence: str,
+    num_return_sequences: int = 2,
+    **generation_kwargs,
+) -> tuple[List[str], List[dict]]:
+    """
+    Generate biosimilars and screen them before folding.
+
+    Oversamples by GEN_OVERSAMPLE and keeps generating (up to GEN_MAX_ROUNDS)
+    until `num_return_sequences` candidates pass the filter.
+    Returns (accepted candidates, rejections with reasons).
+    """
+    accepted = []
+    rejections = []
+    seen = set()
+    for _ in range(GEN_MAX_ROUNDS):
+        missing = num_return_sequences - len(accepted)
+        if missing <= 0:
+            break
+        sampled = await generate_biosimilars_async(
+            model_loader,
+            fold_sequence,
+            num_return_sequences=math.ceil(missing * GEN_OVERSAMPLE),
+            **generation_kwargs,
+        )
+        with span("filter"):
+            kept, rejected = filter_candidates(sampled, fold_sequence, seen)
+        accepted.extend(kept)
+        rejections.extend(rejected)
+
+    if rejections:
+        print(f"📌 Candidate filter: kept {len(accepted)}, rejected {len(rejections)} before folding")
+    return accepted[:num_return_sequences], rejections
 
 
 def preprocess_sequence(sequence: str) -> str:
@@ -1,39 +1,81 @@
-import aiohttp
-import aiofiles
-import os
-import hashlib
+from config import FOLD_REUSE_IDENTITY
+from fold_backends import get_fold_backend
+from http_client import fold_single_flight
+from metrics import STRUCTURE_CACHE_REQUESTS, span
+from pdb_parser import parsed_structures
+from structure_cache import structure_cache, structure_key
 
-# Ensure the pdb_data directory exists
-os.makedirs("pdb_data", exist_ok=True)
 
 async def fetch_pdb(fold_sequence: str) -> tuple[bool, str | None]:
     """
-    Fetches the PDB for a given fold sequence from ESM Atlas API.
-    
+    Fetches the PDB for a given fold sequence from the configured folding
+    backend (ESM Atlas API by default).
+
     Returns:
         (success: bool, pdb_content: str | None)
     """
-    # Use a hash of the fold_sequence for unique filenames
-    file_hash = hashlib.sha256(fold_sequence.encode()).hexdigest()
-    file_path = os.path.join("pdb_data", f"{file_hash}.pdb")
-    
-    # Check if file already exists
-    if os.path.exists(file_path):
-        print(f"PDB for this sequence is cached: {file_path}")
-        async with aiofiles.open(file_path, 'r') as f:
-            pdb_content = await f.read()
+    success, pdb_content, _ = await fetch_structure(fold_sequence)
+    return success, pdb_content
+
+
+async def fetch_structure(fold_sequence: str) -> tuple[bool, str | None, str | None]:
+    """
+    `fetch_pdb` plus the structure cache key of the structure served: the
+    sequence's own key, or a relative's when FOLD_REUSE_IDENTITY reuses one.
+    Parsed-structure and DSSP caches trust their keys, so work on the
+    returned PDB must be keyed by this one.
+    """
+    # The structure cache is keyed by a hash of the fold_sequence
+    file_hash = structure_key(fold_sequence)
+
+    # Check if the structure is already cached
+    with span("cache_lookup"):
+        pdb_content = await structure_cache.get(file_hash)
+    if pdb_content is not None:
+        STRUCTURE_CACHE_REQUESTS.inc(result="hit")
+        print(f"PDB for this sequence is cached: {file_hash}")
+        # Scoring and analysis look structures up by this key; load it from the binary file, not the text
+        if file_hash not in parsed_structures:
+            try:
+                structure = await structure_cache.get_structure(file_hash)
+            except Exception as e:
+                # Only a warm-up: scoring parses the text instead
+                print(f"❌ Loading binary structure {file_hash} failed: {e}")
+                structure = None
+            if structure is not None:
+                parsed_structures.put(file_hash, structure)
+        return True, pdb_content, file_hash
+
+    # A close enough relative already folded stands in for this sequence
+    if FOLD_REUSE_IDENTITY > 0:
+        try:
+            neighbours = await structure_cache.nearest(fold_sequence, exclude_key=file_hash)
+        except Exception as e:
+            print(f"❌ Similar-structure lookup failed for {file_hash}: {e}")
+            neighbours = []
+        if neighbours and neighbours[0]["identity"] >= FOLD_REUSE_IDENTITY:
+            pdb_content = await structure_cache.get(neighbours[0]["key"])
+            if pdb_content is not None:
+                STRUCTURE_CACHE_REQUESTS.inc(result="similar")
+                print(f"📌 Reusing structure {neighbours[0]['key']} "
+                      f"({neighbours[0]['identity']:.1%} identical) for {file_hash}")
+                return True, pdb_content, neighbours[0]["key"]
+    STRUCTURE_CACHE_REQUESTS.inc(result="miss")
+
+    # Concurrent callers for the same sequence share one upstream request
+    success, pdb_content = await fold_single_flight.do(
+        file_hash, lambda: _fetch_and_store(fold_sequence, file_hash)
+    )
+    return success, pdb_content, file_hash if success else None
+
+
+async def _fetch_and_store(fold_sequence: str, file_hash: str) -> tuple[bool, str | None]:
+    """Fold the sequence with the configured backend and write the PDB to the cache on success."""
+    # Only cache misses reach the backend (and the shared upstream budget)
+    with span("fold"):
+        success, pdb_content = await get_fold_backend().fold(fold_sequence)
+    if success:
+        await structure_cache.put(file_hash, pdb_content, sequence=fold_sequence)
+        print(f"PDB fetched and cached: {file_hash}")
         return True, pdb_content
-    
-    url = "https://api.esmatlas.com/foldSequence/v1/pdb/"
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, data=fold_sequence) as response:
-            if response.status == 200:
-                pdb_content = await response.text()
-                async with aiofiles.open(file_path, 'w') as f:
-                    await f.write(pdb_content)
-                print(f"PDB fetched and saved to: {file_path}")
-                return True, pdb_content
-            else:
-                print(f"Failed to fetch PDB. Status code: {response.status}")
-                return False, None
+    return False, None
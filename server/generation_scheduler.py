@@ -0,0 +1,216 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from config import GEN_MAX_BATCH_SIZE, GEN_MAX_WAIT_MS
+from constrained_sampling import SamplingConstraints, build_constraints, token_budget
+from metrics import GENERATION_BATCH_SIZE, GENERATION_BATCH_REQUESTS
+from prompt_cache import PromptCache
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    num_return_sequences: int
+    # (max_length, top_k, repetition_penalty, eos_token_id, constrained); only equal params share a batch
+    params: tuple
+    future: asyncio.Future
+    constraints: SamplingConstraints | None = None
+
+
+class GenerationScheduler:
+    """
+    Dynamic micro-batching scheduler for ProtGPT2.
+
+    Requests are queued and collected for up to `max_wait_ms` (or until
+    `max_batch_size` sequences are pending), left-padded into a single
+    `model.generate` call and resolved per request through futures.
+    Batches run one at a time on a dedicated thread, so concurrent users
+    never run overlapping forward passes. Batches of a single prompt start
+    from its cached prefix key/values instead of re-running the prompt.
+    """
+
+    def __init__(self, model_loader, max_batch_size: int = GEN_MAX_BATCH_SIZE, max_wait_ms: float = GEN_MAX_WAIT_MS):
+        self.model_loader = model_loader
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._deferred: deque[GenerationRequest] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="protgpt2")
+        self._worker: asyncio.Task | None = None
+        self.prompt_cache = PromptCache()
+
+        # Simple counters for throughput reporting
+        self.batches_run = 0
+        self.sequences_generated = 0
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(
+        self,
+        prompt: str,
+        num_return_sequences: int,
+        max_length: int,
+        top_k: int,
+        repetition_penalty: float,
+        eos_token_id: int,
+        constraints: SamplingConstraints | None = None,
+    ) -> list[str]:
+        """
+        Queue one prompt and wait for its `num_return_sequences` generated texts.
+        With `constraints`, sampling stays inside their length window and mutation cap.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        params = (max_length, top_k, repetition_penalty, eos_token_id, constraints is not None)
+        await self._queue.put(GenerationRequest(prompt, num_return_sequences, params, future, constraints))
+        return await future
+
+    def queue_depth(self) -> int:
+        """Requests waiting for a batch (queued plus deferred)."""
+        return (self._queue.qsize() if self._queue is not None else 0) + len(self._deferred)
+
+    async def _next_request(self, timeout: float | None) -> GenerationRequest | None:
+        if self._deferred:
+            return self._deferred.popleft()
+        if timeout is None:
+            return await self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait() if not self._queue.empty() else None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _collect_batch(self) -> list[GenerationRequest]:
+        """Wait for a first request, then gather compatible ones until full or the window closes."""
+        first = await self._next_request(None)
+        batch = [first]
+        size = first.num_return_sequences
+        deadline = time.monotonic() + self.max_wait
+        incompatible = []
+
+        while size < self.max_batch_size:
+            request = await self._next_request(deadline - time.monotonic())
+            if request is None:
+                break
+            if request.params != first.params or size + request.num_return_sequences > self.max_batch_size:
+                incompatible.append(request)
+                continue
+            batch.append(request)
+            size += request.num_return_sequences
+
+        # Requests that could not join go first in the next batch
+        self._deferred.extendleft(reversed(incompatible))
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            batch = [r for r in batch if not r.future.done()]  # skip cancelled callers
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self._generate_batch, batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            for request, texts in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(texts)
+
+    def _generate_batch(self, batch: list[GenerationRequest]) -> list[list[str]]:
+        """Run one padded `model.generate` call for the whole batch (worker thread)."""
+        import torch
+
+        model = self.model_loader.model
+        tokenizer = self.model_loader.tokenizer
+        max_length, top_k, repetition_penalty, eos_token_id, constrained = batch[0].params
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else eos_token_id
+
+        rows = []
+        for request in batch:
+            rows.extend([self.prompt_cache.tokens(request.prompt, tokenizer).input_ids] * request.num_return_sequences)
+
+        # One shared prompt: reuse its prefix key/values, no padding needed
+        prefix = None
+        if all(request.prompt == batch[0].prompt for request in batch):
+            prefix = self.prompt_cache.prefix(batch[0].prompt, model, tokenizer)
+
+        # Left-pad so every row continues from the same position
+        width = max(len(ids) for ids in rows)
+        input_ids = torch.full((len(rows), width), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for i, ids in enumerate(rows):
+            input_ids[i, width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[i, width - len(ids):] = 1
+        generate_kwargs = {"past_key_values": prefix.expand(len(rows), model)} if prefix is not None else {}
+
+        # max_length counts prompt tokens, as in the pipeline; keep each row to its own budget
+        budgets = [max(1, max_length - len(ids)) for ids in rows]
+        if constrained:
+            # The length window bounds each row instead, and rows stop as soon as they reach it
+            row_constraints = [r.constraints for r in batch for _ in range(r.num_return_sequences)]
+            budgets = [token_budget(c) for c in row_constraints]
+            processors, stopping = build_constraints(tokenizer, row_constraints, width, eos_token_id)
+            generate_kwargs.update(logits_processor=processors, stopping_criteria=stopping)
+        with torch.inference_mode():
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                do_sample=True,
+                top_k=top_k,
+                repetition_penalty=repetition_penalty,
+                max_new_tokens=max(budgets),
+                eos_token_id=eos_token_id,
+                pad_token_id=pad_token_id,
+                **generate_kwargs,
+            )
+
+        self.batches_run += 1
+        self.sequences_generated += len(rows)
+        GENERATION_BATCH_SIZE.observe(len(rows))
+        GENERATION_BATCH_REQUESTS.observe(len(batch))
+
+        # Same text the text-generation pipeline returns: prompt + decoded continuation
+        results = []
+        row = 0
+        for request in batch:
+            texts = []
+            for _ in range(request.num_return_sequences):
+                continuation = output[row, width:width + budgets[row]]
+                texts.append(request.prompt + tokenizer.decode(continuation, skip_special_tokens=True))
+                row += 1
+            results.append(texts)
+        return results
+
+
+_schedulers: dict[int, GenerationScheduler] = {}
+
+
+def get_scheduler(model_loader) -> GenerationScheduler:
+    """One scheduler per loaded model, created on first use (a model server client brings its own)."""
+    remote = getattr(model_loader, "scheduler", None)
+    if remote is not None:
+        return remote
+    scheduler = _schedulers.get(id(model_loader))
+    if scheduler is None:
+        scheduler = _schedulers[id(model_loader)] = GenerationScheduler(model_loader)
+    return scheduler
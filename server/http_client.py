@@ -0,0 +1,134 @@
+import asyncio
+import random
+
+import aiohttp
+
+from config import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_TOTAL_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+)
+from metrics import UPSTREAM_RESPONSES, UPSTREAM_RETRIES
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PooledHTTPClient:
+    """
+    App-lifetime aiohttp session with connection pooling and keep-alive.
+
+    The session is created lazily on first use (or by `start()` at startup)
+    and closed by `close()` at shutdown.
+    """
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        total_timeout: float = HTTP_TOTAL_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_base: float = HTTP_BACKOFF_BASE,
+        backoff_max: float = HTTP_BACKOFF_MAX,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.total_timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After."""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def post_text(self, url: str, data, limiter=None) -> tuple[int, str | None]:
+        """
+        POST `data` to `url` and return (status, body text).
+
+        429/5xx responses and connection errors are retried with jittered
+        backoff. If a `limiter` is given, every attempt acquires a token first.
+        """
+        session = await self.start()
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                async with session.post(url, data=data) as response:
+                    UPSTREAM_RESPONSES.inc(status=response.status)
+                    if response.status == 200:
+                        return response.status, await response.text()
+                    if response.status not in RETRY_STATUSES or last_attempt:
+                        return response.status, None
+                    delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                    print(f"Upstream returned {response.status}, retrying in {delay:.2f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                UPSTREAM_RESPONSES.inc(status="error")
+                if last_attempt:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"Upstream request failed ({e!r}), retrying in {delay:.2f}s")
+            UPSTREAM_RETRIES.inc()
+            await asyncio.sleep(delay)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one shared task.
+
+    The task is shielded, so one caller being cancelled does not cancel
+    the upstream work the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, coro_factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+# Global instances
+http_client = PooledHTTPClient()
+fold_single_flight = SingleFlight()
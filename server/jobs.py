@@ -0,0 +1,336 @@
+"""
+Persistent job queue for long design runs.
+
+Jobs and their per-candidate progress live in a local SQLite file, and a
+configurable number of worker tasks in the server process pick them up.
+Generated sequences are stored as soon as they exist and every candidate
+is checkpointed as it completes, so a restart resumes interrupted jobs
+where they stopped. PDBs stay in the structure cache; job results only
+reference them by sequence hash.
+
+Several server processes (uvicorn --workers) can share one job file: a
+claim is a single UPDATE, so each job runs in exactly one process, and the
+claiming process is recorded as the job's owner so that a starting process
+only requeues jobs whose owner has exited.
+"""
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import aclosing
+
+from config import JOBS_DB_PATH, JOB_WORKERS
+from fetch_biosimilars import generate_candidates_async
+from fetch_protein import fetch_structure
+from model_loader import model_loader
+from pipeline import iter_candidate_records
+from structure_cache import structure_key
+
+# Job lifecycle: queued -> running -> succeeded | failed
+STAGES = ("generated", "folded", "scored", "described")
+# Idle workers also look for jobs submitted to other processes sharing the job file this often
+POLL_SECONDS = 5.0
+
+
+def process_owner() -> str:
+    """Owner id of the jobs this process claims: "<host>:<pid>"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_exited(owner: str | None) -> bool:
+    """Whether the process that claimed a job is gone (unknown owners and other hosts count as alive)."""
+    if owner is None:
+        return True  # claimed before owners were recorded
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return True  # this process, from before a stop/start
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class JobStore:
+    """SQLite tables for jobs and their candidates."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                fold_seq TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_candidates (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                sequence TEXT NOT NULL,
+                structure_key TEXT NOT NULL,
+                folded INTEGER NOT NULL DEFAULT 0,
+                scored INTEGER NOT NULL DEFAULT 0,
+                described INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                tm_score REAL,
+                description TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS job_rejections (
+                job_id TEXT NOT NULL,
+                sequence TEXT NOT NULL,
+                reason TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_rejections_job ON job_rejections (job_id);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # Job files created before jobs recorded the process running them
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.commit()
+
+    def _row(self, cursor) -> dict | None:
+        row = cursor.fetchone()
+        return dict(zip([c[0] for c in cursor.description], row)) if row else None
+
+    def create(self, fold_seq: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, fold_seq, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (job_id, fold_seq, time.time()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def requeue_running(self) -> int:
+        """Running jobs whose owner process has exited go back to the queue."""
+        with self._lock:
+            running = self._conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            count = 0
+            for job_id, owner in running:
+                if _owner_exited(owner):
+                    # Only while that owner still holds it: another process may have requeued and claimed it meanwhile
+                    count += self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL "
+                        "WHERE id = ? AND status = 'running' AND owner IS ?",
+                        (job_id, owner),
+                    ).rowcount
+            self._conn.commit()
+        return count
+
+    def claim(self, owner: str) -> dict | None:
+        """Oldest queued job, marked running by `owner`; one statement, so no two processes get the same job."""
+        with self._lock:
+            job = self._row(self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started_at = COALESCE(started_at, ?) "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "AND status = 'queued' RETURNING *",
+                (owner, time.time()),
+            ))
+            self._conn.commit()
+        return job
+
+    def finish(self, job_id: str, status: str, error: str | None = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)))
+            if job is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(folded), 0), COALESCE(SUM(scored), 0), "
+                "COALESCE(SUM(described), 0), COALESCE(SUM(done), 0) FROM job_candidates WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            rejected = self._conn.execute(
+                "SELECT COUNT(*) FROM job_rejections WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+        job["progress"] = dict(zip(STAGES + ("completed",), counts), rejected=rejected)
+        return job
+
+    def add_candidates(self, job_id: str, sequences: list[str], rejections: list[dict] = ()):
+        """Store the generated candidates and the filter's rejections in one transaction."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_candidates (job_id, idx, sequence, structure_key) VALUES (?, ?, ?, ?)",
+                [(job_id, i, seq, structure_key(seq)) for i, seq in enumerate(sequences)],
+            )
+            self._conn.executemany(
+                "INSERT INTO job_rejections (job_id, sequence, reason) VALUES (?, ?, ?)",
+                [(job_id, r["sequence"], r["reason"]) for r in rejections],
+            )
+            self._conn.commit()
+
+    def rejections(self, job_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sequence, reason FROM job_rejections WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+        return [{"sequence": sequence, "reason": reason} for sequence, reason in rows]
+
+    def candidates(self, job_id: str) -> list[dict]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM job_candidates WHERE job_id = ? ORDER BY idx", (job_id,))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def mark_stage(self, job_id: str, idx: int, stage: str, served_key: str | None = None):
+        """Mark a stage done; "folded" also records the key of the structure served (a relative's when reused)."""
+        if stage not in STAGES[1:]:
+            raise ValueError(f"Unknown stage: {stage}")
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE job_candidates SET {stage} = 1, structure_key = COALESCE(?, structure_key) "
+                "WHERE job_id = ? AND idx = ?",
+                (served_key, job_id, idx),
+            )
+            self._conn.commit()
+
+    def complete_candidate(self, job_id: str, idx: int, tm_score: float | None, description: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_candidates SET done = 1, tm_score = ?, description = ? WHERE job_id = ? AND idx = ?",
+                (tm_score, description, job_id, idx),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Worker tasks that run queued design jobs one stage at a time."""
+
+    def __init__(self, path: str = JOBS_DB_PATH, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.store: JobStore | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self.owner: str | None = None
+
+    async def start(self):
+        if self.store is None:
+            self.store = await asyncio.to_thread(JobStore, self.path)
+        self.owner = process_owner()
+        resumed = await asyncio.to_thread(self.store.requeue_running)
+        if resumed:
+            print(f"📌 Resuming {resumed} interrupted job(s)")
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; running jobs stay marked running and resume on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def submit(self, fold_seq: str) -> str:
+        job_id = await asyncio.to_thread(self.store.create, fold_seq)
+        self._wakeup.set()
+        return job_id
+
+    def queued(self) -> int | None:
+        """Jobs waiting for a worker (None before start)."""
+        return self.store.count("queued") if self.store is not None else None
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def candidates(self, job_id: str) -> list[dict]:
+        return await asyncio.to_thread(self.store.candidates, job_id)
+
+    async def rejections(self, job_id: str) -> list[dict]:
+        return await asyncio.to_thread(self.store.rejections, job_id)
+
+    async def _worker(self):
+        while True:
+            # Clear before claiming so a submit during the claim is not missed
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim, self.owner)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+                await asyncio.to_thread(self.store.finish, job["id"], "succeeded")
+                print(f"✅ Job {job['id']} finished")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                await asyncio.to_thread(self.store.finish, job["id"], "failed", str(getattr(e, "detail", e)))
+
+    async def _run(self, job: dict):
+        job_id, fold_seq = job["id"], job["fold_seq"]
+        print(f"📌 Running job {job_id}")
+
+        success, original_pdb, original_key = await fetch_structure(fold_seq)
+        if not success or not original_pdb:
+            raise RuntimeError("Failed to fetch original PDB for input sequence")
+
+        # Generated sequences are stored once, so a resumed job scores the same candidates
+        candidates = await asyncio.to_thread(self.store.candidates, job_id)
+        if not candidates:
+            # Jobs queued during startup wait for the model instead of failing with 503
+            await model_loader.wait_until_loaded()
+            sequences, rejections = await generate_candidates_async(model_loader, fold_seq)
+            await asyncio.to_thread(self.store.add_candidates, job_id, sequences, rejections)
+            candidates = await asyncio.to_thread(self.store.candidates, job_id)
+
+        todo = [c for c in candidates if not c["done"]]
+        by_position = [c["idx"] for c in todo]
+
+        async def on_stage(stage: str, record: dict):
+            await asyncio.to_thread(
+                self.store.mark_stage, job_id, by_position[record["index"]], stage, record["structure_key"]
+            )
+
+        records = iter_candidate_records(
+            [c["sequence"] for c in todo], original_pdb, original_key, on_stage=on_stage
+        )
+        async with aclosing(records):
+            async for record in records:
+                await asyncio.to_thread(
+                    self.store.complete_candidate,
+                    job_id, by_position[record["index"]], record["tm_score"], record["description"],
+                )
+
+
+# Global instance
+job_queue = JobQueue()
@@ -1,29 +1,85 @@
+import asyncio
+import time
+
 import uvicorn
-import os
-import random
-import aiofiles
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fetch_protein import fetch_pdb
-from dssp_serve import run_dssp
-from fetch_biosimilars import generate_biosimilars_async
+from fetch_protein import fetch_pdb, fetch_structure
+from dssp_serve import run_dssp, dssp_service
+from fetch_biosimilars import generate_candidates_async
+from candidate_filter import filter_stats
+from generation_scheduler import get_scheduler
 from model_loader import model_loader
-from tm_mech import compute_tm_score
-from dssp_analyse import analyze_pdb_full
-import asyncio
-import hashlib
+from tm_mech import shutdown_executor
+from tm_matrix import tm_score_matrix, cluster_matrix, encode_matrix
+from pipeline import iter_candidate_records, stream_pipeline, encode_ndjson, encode_sse
+from config import (
+    GEN_SAMPLING_MODE,
+    MODEL_LOAD_MODE,
+    SEARCH_MAX_FOLD_CALLS,
+    SEARCH_MAX_SECONDS,
+    SEARCH_MAX_TOKENS,
+    SEARCH_ROUND_SIZE,
+    TM_MATRIX_MAX_STRUCTURES,
+)
+from design_search import SearchBudget, SearchTarget, design_search
+from batch_design import DesignBatch
+from http_client import http_client, fold_single_flight
+from fold_backends import close_fold_backend, get_fold_backend
+from structure_cache import structure_cache, structure_key
+from structure_delivery import cache_headers, etag_matches, negotiate_encoding, structure_bodies, structure_ref
+from jobs import job_queue
+from result_cache import result_cache
+from metrics import STRUCTURE_CACHE_REQUESTS, gauge_callback, render, request_timings
 
 app = FastAPI()
 
+
+def _structure_cache_hit_ratio():
+    hits, misses = STRUCTURE_CACHE_REQUESTS.value(result="hit"), STRUCTURE_CACHE_REQUESTS.value(result="miss")
+    return hits / (hits + misses) if hits + misses else None
+
+
+# Read at scrape time
+gauge_callback("generation_queue_depth", "Generation requests waiting for a batch",
+               lambda: get_scheduler(model_loader).queue_depth())
+gauge_callback("fold_inflight", "Distinct sequences being folded (single-flight)", lambda: len(fold_single_flight))
+gauge_callback("job_queue_depth", "Persistent jobs waiting for a worker", job_queue.queued)
+gauge_callback("prompt_cache_bytes", "Past key/value bytes held by the ProtGPT2 prompt cache",
+               lambda: get_scheduler(model_loader).prompt_cache.nbytes)
+gauge_callback("structure_cache_hit_ratio", "Structure cache hits / lookups since start", _structure_cache_hit_ratio)
+
 # Load model at application startup
 @app.on_event("startup")
 async def startup_event():
     """Load the model when the application starts"""
     print("Loading ProtGPT2 model...")
-    model_loader.load_model()
+    if MODEL_LOAD_MODE == "background":
+        # /check answers right away; /ready reports when the model can serve
+        model_loader.load_in_background()
+    else:
+        model_loader.load_model()
+    await http_client.start()
+    await structure_cache.start()
+    await result_cache.start()
+    await job_queue.start()
+    print(f"Folding backend: {get_fold_backend().name}")
     print("Application startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers, the generation scheduler and worker pools (TM-align, DSSP), close the HTTP session and flush the structure cache"""
+    await job_queue.stop()
+    await get_scheduler(model_loader).stop()
+    await http_client.close()
+    await close_fold_backend()
+    shutdown_executor()
+    dssp_service.shutdown()
+    structure_cache.close()
+    result_cache.close()
+
 # allow all origins
 app.add_middleware(
     CORSMiddleware,
@@ -36,77 +92,65 @@ app.add_middleware(
 class FoldSeqRequest(BaseModel):
     fold_seq: str
 
+STRUCTURE_MODES = ("inline", "ref")
+
+
+def _check_structures_mode(structures: str):
+    if structures not in STRUCTURE_MODES:
+        raise HTTPException(status_code=400, detail="structures must be 'inline' or 'ref'")
+
+
+def _reference_structure(event: dict) -> dict:
+    """Replace an event's PDB text with a reference to GET /structure/{hash}."""
+    pdb_text = event.pop("pdb_data", None)
+    event["structure"] = structure_ref(structure_bodies.remember(pdb_text)) if pdb_text is not None else None
+    return event
+
 @app.post("/fetch_pdb")
-async def fetch_pdb_endpoint(req: FoldSeqRequest):
+async def fetch_pdb_endpoint(req: FoldSeqRequest, timings: bool = False, structures: str = "inline"):
     """
     Generate biosimilars, fetch PDBs, compute TM-score vs original PDB,
     and generate natural-language descriptions for each protein.
+    `timings=true` adds a per-stage timing breakdown to the response.
+    `structures=ref` references each structure by content hash
+    (GET /structure/{hash}) instead of inlining its PDB text.
     """
+    _check_structures_mode(structures)
+    with request_timings(timings) as request_timing:
+        response = await _fetch_pdb(req)
+    if structures == "ref":
+        response["original_structure"] = structure_ref(structure_bodies.remember(response.pop("original_pdb")))
+        response["pdb_data"] = [_reference_structure(item) for item in response["pdb_data"]]
+    if request_timing is not None:
+        response["timings"] = request_timing.summary()
+    return response
+
+
+async def _fetch_pdb(req: FoldSeqRequest) -> dict:
     try:
         # 1️⃣ Fetch original PDB for the input fold sequence
-        success_orig, original_pdb = await fetch_pdb(req.fold_seq)
+        success_orig, original_pdb, original_key = await fetch_structure(req.fold_seq)
         if not success_orig or not original_pdb:
             raise HTTPException(status_code=400, detail="Failed to fetch original PDB for input sequence")
 
-        # Get the file path for the original PDB
-        orig_file_hash = hashlib.sha256(req.fold_seq.encode()).hexdigest()
-        orig_pdb_path = os.path.join("pdb_data", f"{orig_file_hash}.pdb")
+        # 2️⃣ Generate biosimilars, screening out candidates not worth folding
+        biosimilars, rejected = await generate_candidates_async(model_loader, req.fold_seq)
 
-        # 2️⃣ Generate biosimilars
-        biosimilars = await generate_biosimilars_async(model_loader, req.fold_seq)
+        # 3️⃣ Fold, score and describe every candidate concurrently.
+        # Upstream politeness comes from the shared token bucket in fetch_pdb.
+        records = [record async for record in iter_candidate_records(biosimilars, original_pdb, original_key)]
+        records.sort(key=lambda record: record["index"])
 
         pdb_results = []
         tm_scores = []
         descriptions = []
 
-        for i, seq in enumerate(biosimilars):
-            print(f"Fetching PDB for sequence {i+1}: {seq}")
-
-            # Add 1-second delay between requests
-            if i > 0:
-                await asyncio.sleep(1)
-
-            try:
-                success, pdb_content = await fetch_pdb(seq)
-                if success and pdb_content:
-                    # File path for the generated PDB
-                    seq_file_hash = hashlib.sha256(seq.encode()).hexdigest()
-                    seq_pdb_path = os.path.join("pdb_data", f"{seq_file_hash}.pdb")
-
-                    # Compute TM-score
-                    try:
-                        tm_score = await compute_tm_score(
-                            pdb1_filename=f"{seq_file_hash}.pdb",
-                            pdb2_filename=f"{orig_file_hash}.pdb",
-                            pdb_dir="pdb_data"
-                        )
-                    except Exception as e:
-                        print(f"❌ Error computing TM-score for sequence {i+1}: {e}")
-                        tm_score = 0.0
-
-                    # Generate natural-language description
-                    try:
-                        description = await analyze_pdb_full(seq_pdb_path)
-                    except Exception as e:
-                        print(f"❌ Error analyzing PDB for sequence {i+1}: {e}")
-                        description = "Failed to generate description."
-
-                    pdb_results.append({
-                        "sequence": seq,
-                        "pdb_data": pdb_content
-                    })
-                    tm_scores.append(tm_score)
-                    descriptions.append(description)
-                    print(f"✅ Sequence {i+1}: fetched PDB, TM-score={tm_score}, description generated")
-
-                else:
-                    print(f"❌ Failed to fetch PDB for sequence {i+1}")
-                    descriptions.append("Failed to fetch PDB.")
-
-            except Exception as e:
-                print(f"❌ Error fetching PDB for sequence {i+1}: {e}")
-                descriptions.append("Failed to fetch PDB.")
-                continue
+        # Assemble in generation order; failed candidates only contribute a description
+        for record in records:
+            if record["pdb_data"] is not None:
+                pdb_results.append({"sequence": record["sequence"], "pdb_data": record["pdb_data"]})
+                tm_scores.append(record["tm_score"])
+            descriptions.append(record["description"])
 
         # Return results
         return {
@@ -117,7 +161,9 @@ async def fetch_pdb_endpoint(req: FoldSeqRequest):
             "description": descriptions,
             "total_generated": len(biosimilars),
             "successful_fetches": len(pdb_results),
-            "failed_fetches": len(biosimilars) - len(pdb_results)
+            "failed_fetches": len(biosimilars) - len(pdb_results),
+            "rejected": rejected,
+            "fold_calls_avoided": len(rejected),
         }
 
     except HTTPException:
@@ -127,42 +173,255 @@ async def fetch_pdb_endpoint(req: FoldSeqRequest):
         raise HTTPException(status_code=500, detail=str(exc))
 
 
-    
+@app.post("/fetch_pdb/stream")
+async def fetch_pdb_stream_endpoint(req: FoldSeqRequest, request: Request, format: str = "ndjson",
+                                    timings: bool = False, structures: str = "inline"):
+    """
+    Streaming /fetch_pdb: the original structure first, then each candidate
+    (sequence, PDB, TM-score, description) as soon as it completes, then a
+    summary. `format` is "ndjson" (one JSON object per line) or "sse".
+    `timings=true` adds a per-stage breakdown to the summary event;
+    `structures=ref` sends structure references as in /fetch_pdb.
+    Disconnecting cancels the candidates still in flight.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    _check_structures_mode(structures)
+
+    success_orig, original_pdb, original_key = await fetch_structure(req.fold_seq)
+    if not success_orig or not original_pdb:
+        raise HTTPException(status_code=400, detail="Failed to fetch original PDB for input sequence")
+
+    encode = encode_sse if format == "sse" else encode_ndjson
+
+    async def _events():
+        # The response body runs in its own task; collect the breakdown there
+        with request_timings(timings) as request_timing:
+            events = stream_pipeline(req.fold_seq, original_pdb, original_key)
+            try:
+                async for event in events:
+                    if await request.is_disconnected():
+                        print("📌 Stream client disconnected, cancelling remaining candidates")
+                        break
+                    if request_timing is not None and event["event"] == "summary":
+                        event["timings"] = request_timing.summary()
+                    if structures == "ref" and "pdb_data" in event:
+                        event = _reference_structure(event)
+                    yield encode(event)
+            finally:
+                await events.aclose()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that does not listen for disconnects itself: the
+    request body is still being read while the response streams, and both
+    would otherwise consume the same ASGI receive channel.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@app.post("/fetch_pdb/batch")
+async def fetch_pdb_batch_endpoint(request: Request, structures: str = "inline"):
+    """
+    /fetch_pdb for every record of a multi-record FASTA request body.
+    The body is parsed as it streams in and each reference starts as soon
+    as its record is complete; all references share generation batching,
+    fold concurrency and the scoring pools. Responds right away with NDJSON:
+    one "reference" event per record (the /fetch_pdb result, or status
+    "error") as it finishes, while the upload continues, then a summary.
+    A malformed upload produces an "error" event; references already
+    submitted still complete. `structures=ref` as in /fetch_pdb.
+    """
+    _check_structures_mode(structures)
+    batch = DesignBatch(lambda fold_seq: _fetch_pdb(FoldSeqRequest(fold_seq=fold_seq)))
+    ingestion = asyncio.create_task(batch.ingest(request.stream()))
+
+    async def _events():
+        try:
+            async for event in batch.results():
+                # Polling for a disconnect reads the receive channel, so only once the body is consumed
+                if batch.ingested and await request.is_disconnected():
+                    print("📌 Batch client disconnected, cancelling remaining references")
+                    return
+                if structures == "ref" and event.get("status") == "success":
+                    event["original_structure"] = structure_ref(structure_bodies.remember(event.pop("original_pdb")))
+                    event["pdb_data"] = [_reference_structure(item) for item in event["pdb_data"]]
+                yield encode_ndjson(event)
+            yield encode_ndjson(batch.summary())
+        finally:
+            # Client gone (mid-upload the body read fails and ends ingestion): stop everything
+            ingestion.cancel()
+            await asyncio.gather(ingestion, return_exceptions=True)
+            await batch.cancel()
+
+    return _UploadStreamingResponse(_events(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
+class DesignSearchRequest(BaseModel):
+    fold_seq: str
+    target_count: int = 2
+    min_tm_score: float = 0.5
+    max_fold_calls: int = SEARCH_MAX_FOLD_CALLS
+    max_seconds: float = SEARCH_MAX_SECONDS
+    max_tokens: int = SEARCH_MAX_TOKENS
+    sampling: str = GEN_SAMPLING_MODE
+    round_size: int = SEARCH_ROUND_SIZE
+
+
+@app.post("/design_search")
+async def design_search_endpoint(req: DesignSearchRequest, timings: bool = False, structures: str = "inline"):
+    """
+    Generate, fold and score candidates in overlapping rounds until
+    `target_count` of them reach `min_tm_score` against the input structure,
+    or a budget (fold calls, seconds since the request arrived, model
+    tokens; 0 = unbounded) runs out. Reports the stop reason and the yield
+    per fold call and per second. `timings` and `structures` as in /fetch_pdb.
+    """
+    started_at = time.monotonic()
+    _check_structures_mode(structures)
+    if req.sampling not in ("free", "constrained"):
+        raise HTTPException(status_code=400, detail="sampling must be 'free' or 'constrained'")
+    try:
+        target = SearchTarget(count=req.target_count, min_tm_score=req.min_tm_score)
+        budget = SearchBudget(max_fold_calls=req.max_fold_calls, max_seconds=req.max_seconds, max_tokens=req.max_tokens)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    with request_timings(timings) as request_timing:
+        success_orig, original_pdb, original_key = await fetch_structure(req.fold_seq)
+        if not success_orig or not original_pdb:
+            raise HTTPException(status_code=400, detail="Failed to fetch original PDB for input sequence")
+        response = await design_search(req.fold_seq, original_pdb, target, budget, original_key=original_key,
+                                       sampling=req.sampling, round_size=req.round_size, started_at=started_at)
+
+    response["original_pdb"] = original_pdb
+    if structures == "ref":
+        response["original_structure"] = structure_ref(structure_bodies.remember(response.pop("original_pdb")))
+        response["hits"] = [_reference_structure(hit) for hit in response["hits"]]
+    if request_timing is not None:
+        response["timings"] = request_timing.summary()
+    return response
+
+
+@app.get("/structure/{digest}")
+async def structure_endpoint(digest: str, request: Request):
+    """
+    A cached structure by content hash (SHA-256 of its PDB text). The body
+    for a hash never changes: strong ETag, immutable caching, 304 on a
+    matching If-None-Match, gzip or brotli per Accept-Encoding.
+    """
+    digest = digest.lower()
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise HTTPException(status_code=404, detail="Structure not found")
+    headers = cache_headers(digest)
+    if etag_matches(request.headers.get("if-none-match"), digest):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    body = await structure_bodies.body(digest, encoding)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Structure not found")
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="chemical/x-pdb", headers=headers)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(req: FoldSeqRequest):
+    """
+    Queue a design run (the /fetch_pdb pipeline) as a persistent job.
+    Poll GET /jobs/{job_id} for progress and fetch GET /jobs/{job_id}/result.
+    """
+    job_id = await job_queue.submit(req.fold_seq)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    """Job status plus per-stage progress (generated, folded, scored, described, completed, rejected)."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "error": job["error"],
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+@app.get("/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str, include_pdb: bool = False):
+    """
+    Results of a finished job in generation order. Structures are referenced
+    by sequence hash (`structure_key`) in the structure cache; pass
+    include_pdb=true to inline them.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    candidates = []
+    for row in await job_queue.candidates(job_id):
+        served_key = row["structure_key"] if row["folded"] else None
+        candidate = {
+            "index": row["idx"],
+            "sequence": row["sequence"],
+            "structure_key": served_key,
+            "reused_from": served_key if served_key not in (None, structure_key(row["sequence"])) else None,
+            "tm_score": row["tm_score"],
+            "description": row["description"],
+        }
+        if include_pdb and row["folded"]:
+            # The structure the job scored; re-folds transparently if it was evicted since the job ran
+            candidate["pdb_data"] = await structure_cache.get(row["structure_key"])
+            if candidate["pdb_data"] is None:
+                _, candidate["pdb_data"] = await fetch_pdb(row["sequence"])
+        candidates.append(candidate)
+
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "reference_key": structure_key(job["fold_seq"]),
+        "candidates": candidates,
+        "total_generated": len(candidates),
+        "successful_fetches": sum(1 for c in candidates if c["structure_key"]),
+        "failed_fetches": sum(1 for c in candidates if not c["structure_key"]),
+        "rejected": await job_queue.rejections(job_id),
+    }
+
 @app.post("/fake_fetch_pdb")
 async def fake_fetch_pdb_endpoint(req: FoldSeqRequest):
     """
-    Fake endpoint that randomly loads PDB files from the pdb_data directory
+    Fake endpoint that randomly loads cached structures from the structure cache
     to save time during testing and development.
     """
     try:
-        # Get list of all PDB files in the directory
-        pdb_dir = "pdb_data"
-        if not os.path.exists(pdb_dir):
-            return {
-                "status": "error",
-                "message": "pdb_data directory not found"
-            }
-        
-        pdb_files = [f for f in os.listdir(pdb_dir) if f.endswith('.pdb')]
-        
-        if not pdb_files:
+        # Randomly select 2 cached structures (or fewer if not enough available)
+        selected_entries = await structure_cache.random_entries(2)
+
+        if not selected_entries:
             return {
                 "status": "error",
-                "message": "No PDB files found in pdb_data directory"
+                "message": "No PDB files found in the structure cache"
             }
-        
-        # Randomly select 2 PDB files (or fewer if not enough available)
-        num_to_select = min(2, len(pdb_files))
-        selected_files = random.sample(pdb_files, num_to_select)
-        
+
         pdb_results = []
-        for i, pdb_file in enumerate(selected_files):
+        for i, entry in enumerate(selected_entries):
+            pdb_file = entry["key"]
             try:
-                file_path = os.path.join(pdb_dir, pdb_file)
-                
-                # Read the PDB file content asynchronously
-                async with aiofiles.open(file_path, 'r') as f:
-                    pdb_content = await f.read()
+                pdb_content = await structure_cache.get(pdb_file)
+                if pdb_content is None:
+                    raise FileNotFoundError("entry evicted")
                 
                 # Create a fake sequence based on the input or use a placeholder
                 fake_sequence = req.fold_seq[:50] + f"_fake_{i+1}" if req.fold_seq else f"fake_sequence_{i+1}"
@@ -171,7 +430,7 @@ async def fake_fetch_pdb_endpoint(req: FoldSeqRequest):
                     "sequence": fake_sequence,
                     "pdb_data": pdb_content
                 })
-                print(f"✅ Successfully loaded fake PDB from: {pdb_file}")
+                print(f"✅ Successfully loaded fake PDB: {pdb_file}")
                 
             except Exception as e:
                 print(f"❌ Error reading PDB file {pdb_file}: {e}")
@@ -191,9 +450,67 @@ async def fake_fetch_pdb_endpoint(req: FoldSeqRequest):
         print("Error in /fake_fetch_pdb:", exc)
         raise HTTPException(status_code=500, detail=str(exc))
 
+class TMMatrixRequest(BaseModel):
+    hashes: list[str]
+    reference_hash: str | None = None
+    cluster_threshold: float = 0.5
+
+@app.post("/tm_matrix")
+async def tm_matrix_endpoint(req: TMMatrixRequest):
+    """
+    All-vs-all TM-score matrix for cached structures (by sequence hash),
+    optionally including a reference, plus a greedy clustering summary.
+    M[i][j] is structure i aligned to structure j, normalized by the length of j.
+    """
+    keys = list(dict.fromkeys(([req.reference_hash] if req.reference_hash else []) + req.hashes))
+    if len(keys) < 2:
+        raise HTTPException(status_code=400, detail="Need at least two distinct structures")
+    if len(keys) > TM_MATRIX_MAX_STRUCTURES:
+        raise HTTPException(status_code=400, detail=f"At most {TM_MATRIX_MAX_STRUCTURES} structures per matrix")
+
+    try:
+        matrix = await tm_score_matrix.compute(keys)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as exc:
+        print("Error in /tm_matrix:", exc)
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    reference_index = 0 if req.reference_hash else None
+    clusters = cluster_matrix(keys, matrix, req.cluster_threshold, reference_index)
+    return {
+        "status": "success",
+        "hashes": keys,
+        "reference_hash": req.reference_hash,
+        "matrix": encode_matrix(matrix),
+        "clusters": clusters,
+        "redundant": [m for c in clusters for m in c["members"] if m != c["representative"]],
+    }
+
 @app.get("/check")
 async def health_check():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "model": model_loader.describe(),
+        "fold_backend": get_fold_backend().name,
+        "candidate_filter": filter_stats.snapshot(),
+        "prompt_cache": get_scheduler(model_loader).prompt_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "similarity_index": structure_cache.similarity_stats(),
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of stage latencies, cache, upstream, generation and queue metrics"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model can serve requests, 503 while loading or after a failure"""
+    model = model_loader.describe()
+    if model_loader.is_loaded:
+        return {"status": "ready", "model": model}
+    return JSONResponse(status_code=503, content={"status": model_loader.state, "model": model})
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
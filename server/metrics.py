@@ -0,0 +1,285 @@
+"""
+Lightweight metrics: counters, gauges and histograms rendered in the
+Prometheus text format, plus timing spans around pipeline stages.
+
+`span(stage)` records into the stage latency histogram and, when the
+current request asked for it, into that request's timing breakdown
+(carried in a context variable, so it follows the request's tasks).
+With METRICS_ENABLED=0 and no breakdown requested, spans and metric
+updates return immediately.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """A set/inc/dec gauge, or one read from `callback()` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list[str]:
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return []
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-1] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(row)) for key, row in self._values.items())
+        lines = []
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Global instance
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "pipeline_stage_seconds", "Time spent per pipeline stage", ("stage",)))
+RESULT_CACHE_REQUESTS = registry.register(Counter(
+    "result_cache_requests_total", "Derived-result cache lookups by stage and result", ("stage", "result")))
+STRUCTURE_CACHE_REQUESTS = registry.register(Counter(
+    "structure_cache_requests_total", "Structure cache lookups by result", ("result",)))
+DSSP_CACHE_REQUESTS = registry.register(Counter(
+    "dssp_cache_requests_total", "DSSP assignment cache lookups by result", ("result",)))
+UPSTREAM_RESPONSES = registry.register(Counter(
+    "upstream_responses_total", "Fold API responses by HTTP status ('error' for connection failures)", ("status",)))
+UPSTREAM_RETRIES = registry.register(Counter(
+    "upstream_retries_total", "Fold API attempts that were retried"))
+FOLD_REQUESTS = registry.register(Counter(
+    "fold_requests_total", "Folds by backend and outcome", ("backend", "outcome")))
+GENERATION_BATCH_SIZE = registry.register(Histogram(
+    "generation_batch_size", "Sequences per model.generate call", buckets=SIZE_BUCKETS))
+GENERATION_BATCH_REQUESTS = registry.register(Histogram(
+    "generation_batch_requests", "Requests merged into one model.generate call", buckets=SIZE_BUCKETS))
+GENERATION_ROWS_TERMINATED = registry.register(Counter(
+    "generation_rows_terminated_total", "Constrained samples stopped early with no allowed continuation"))
+CANDIDATES_IN_FLIGHT = registry.register(Gauge(
+    "candidates_in_flight", "Candidates being folded, scored or described"))
+CANDIDATES_REJECTED = registry.register(Counter(
+    "candidates_rejected_total", "Generated candidates rejected before folding", ("reason",)))
+
+
+def gauge_callback(name: str, documentation: str, callback) -> Gauge:
+    """Register a gauge whose value is read from `callback()` on every scrape."""
+    return registry.register(Gauge(name, documentation, callback=callback))
+
+
+def render() -> str:
+    return registry.render()
+
+
+# ---------------------------
+# Spans and per-request timing breakdowns
+# ---------------------------
+_request_timings: contextvars.ContextVar["RequestTimings | None"] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """Per-stage call counts and total time for one request (summed across concurrent candidates)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {"count": count, "total_ms": round(total * 1000, 2)}
+                for stage, (count, total) in self._stages.items()
+            }
+        return {"wall_ms": round((time.perf_counter() - self.started) * 1000, 2), "stages": stages}
+
+
+@contextmanager
+def request_timings(enabled: bool = True):
+    """Collect a timing breakdown for spans run in this context (and tasks it creates)."""
+    if not enabled:
+        yield None
+        return
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "timings", "start")
+
+    def __init__(self, stage: str, timings: RequestTimings | None):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if self.timings is not None:
+            self.timings.add(self.stage, elapsed)
+        return False
+
+
+def span(stage: str):
+    """Time a block as `stage`; a shared no-op when nothing would record it."""
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        return _NO_SPAN
+    return _Span(stage, timings)
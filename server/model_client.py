@@ -0,0 +1,266 @@
+"""
+API-worker side of the shared model server (see model_server).
+
+`RemoteModelLoader` stands in for ModelLoader when MODEL_SERVER_SOCKET is
+set: its state mirrors the server's, and `get_scheduler` hands out its
+`RemoteScheduler`, whose `submit` has the GenerationScheduler signature,
+so generate_biosimilars_async and its callers are unchanged. Every worker
+keeps one multiplexed connection; cancelling a caller sends a "cancel"
+frame so the server drops the request if its batch has not started.
+
+Frames are a 4-byte big-endian length followed by a JSON object.
+"""
+import asyncio
+import dataclasses
+import itertools
+import json
+import socket
+import struct
+import time
+
+from fastapi import HTTPException
+
+from config import MODEL_SERVER_STATUS_INTERVAL
+from constrained_sampling import SamplingConstraints
+
+HEADER = struct.Struct(">I")
+
+
+def encode_frame(message: dict) -> bytes:
+    data = json.dumps(message).encode()
+    return HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict | None:
+    """Next frame, or None when the peer closed the connection."""
+    try:
+        (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+        return json.loads(await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def write_frame(writer: asyncio.StreamWriter, message: dict):
+    writer.write(encode_frame(message))
+    await writer.drain()
+
+
+class ModelServerClient:
+    """One connection to the model server, shared by concurrent calls and reopened on demand."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._cancels: set[asyncio.Task] = set()
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                self._reader_task = asyncio.create_task(self._read_replies(reader, self._writer))
+            return self._writer
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while (message := await read_frame(reader)) is not None:
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (ConnectionError, ValueError) as exc:
+            print(f"❌ Model server connection error: {exc}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Model server connection lost"))
+            self._pending.clear()
+
+    async def call(self, message: dict) -> dict:
+        """Send one request and wait for its reply."""
+        writer = await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            async with self._write_lock:
+                await write_frame(writer, {**message, "id": request_id})
+            return await future
+        except asyncio.CancelledError:
+            if message["op"] == "generate":
+                task = asyncio.create_task(self._cancel(writer, request_id))
+                self._cancels.add(task)
+                task.add_done_callback(self._cancels.discard)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _cancel(self, writer: asyncio.StreamWriter, request_id: int):
+        try:
+            async with self._write_lock:
+                await write_frame(writer, {"op": "cancel", "id": request_id})
+        except ConnectionError:
+            pass
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+    def status_blocking(self) -> dict:
+        """Status over a short-lived blocking connection (usable before the event loop runs requests)."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(encode_frame({"op": "status", "id": 0}))
+            (length,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+            return json.loads(_recv_exactly(sock, length))["status"]
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("Model server closed the connection")
+        data += chunk
+    return data
+
+
+class RemotePromptCache:
+    """Prompt cache figures as last reported by the model server."""
+
+    def __init__(self, loader: "RemoteModelLoader"):
+        self.loader = loader
+
+    @property
+    def nbytes(self) -> int:
+        return self.stats().get("bytes", 0)
+
+    def stats(self) -> dict:
+        return self.loader.server_status.get("prompt_cache", {})
+
+
+class RemoteScheduler:
+    """GenerationScheduler interface, served by the model server's scheduler."""
+
+    def __init__(self, loader: "RemoteModelLoader"):
+        self.loader = loader
+        self.prompt_cache = RemotePromptCache(loader)
+        self._in_flight = 0
+
+    async def submit(
+        self,
+        prompt: str,
+        num_return_sequences: int,
+        max_length: int,
+        top_k: int,
+        repetition_penalty: float,
+        eos_token_id: int,
+        constraints: SamplingConstraints | None = None,
+    ) -> list[str]:
+        self._in_flight += 1
+        try:
+            reply = await self.loader.client.call({
+                "op": "generate",
+                "prompt": prompt,
+                "num_return_sequences": num_return_sequences,
+                "max_length": max_length,
+                "top_k": top_k,
+                "repetition_penalty": repetition_penalty,
+                "eos_token_id": eos_token_id,
+                "constraints": dataclasses.asdict(constraints) if constraints is not None else None,
+            })
+        except OSError as exc:
+            raise HTTPException(status_code=503, detail=f"Model server unavailable: {exc}")
+        finally:
+            self._in_flight -= 1
+        if "error" in reply:
+            raise HTTPException(status_code=reply.get("status_code", 500), detail=reply["error"])
+        return reply["texts"]
+
+    def queue_depth(self) -> int:
+        """Requests this worker is waiting on (the server queue is shared by all workers)."""
+        return self._in_flight
+
+    async def stop(self):
+        await self.loader.close()
+
+
+class RemoteModelLoader:
+    """ModelLoader stand-in whose model lives in the model server process."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.client = ModelServerClient(socket_path)
+        self.scheduler = RemoteScheduler(self)
+        # unloaded -> loading -> ready | failed, or unavailable while the server cannot be reached
+        self.state = "unloaded"
+        self.error = None
+        self.server_status: dict = {}
+        self._monitor_task: asyncio.Task | None = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.state == "ready"
+
+    def _update(self, status: dict | None, error: str | None = None):
+        if status is None:
+            self.state, self.error = "unavailable", error
+            return
+        self.server_status = status
+        self.state, self.error = status["state"], status["model"].get("error")
+
+    def load_model(self, **kwargs):
+        """Block until the server has its model loaded (MODEL_LOAD_MODE=blocking); the server picks the profile."""
+        while self.state not in ("ready", "failed"):
+            try:
+                self._update(self.client.status_blocking())
+            except OSError as exc:
+                self._update(None, str(exc))
+            if self.state not in ("ready", "failed"):
+                time.sleep(MODEL_SERVER_STATUS_INTERVAL)
+        if self.state == "failed":
+            raise RuntimeError(f"Model server failed to load the model: {self.error}")
+        self.load_in_background()
+
+    def load_in_background(self, **kwargs) -> asyncio.Task:
+        """Start following the server's state; see `state`."""
+        if self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitor())
+        return self._monitor_task
+
+    async def _monitor(self):
+        while True:
+            try:
+                reply = await self.client.call({"op": "status"})
+                self._update(reply["status"])
+            except OSError as exc:
+                if self.state != "unavailable":
+                    print(f"❌ Model server unavailable at {self.socket_path}: {exc}")
+                self._update(None, str(exc))
+            await asyncio.sleep(MODEL_SERVER_STATUS_INTERVAL)
+
+    async def wait_until_loaded(self):
+        """Wait while the server is still loading; failures are left to the caller's `state` check."""
+        self.load_in_background()
+        while self.state in ("unloaded", "loading"):
+            await asyncio.sleep(0.1)
+
+    def describe(self) -> dict:
+        return {**self.server_status.get("model", {}), "state": self.state, "error": self.error,
+                "server": self.socket_path}
+
+    async def close(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+            self._monitor_task = None
+        await self.client.close()
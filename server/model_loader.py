@@ -1,17 +1,94 @@
 # model_loader.py
+import asyncio
 import os
-from transformers import pipeline, AutoModelForCausalLM, AutoTokenizer
+import threading
+from config import INFERENCE_PROFILE, TORCH_INTRA_OP_THREADS, TORCH_INTER_OP_THREADS, MODEL_WARMUP, MODEL_SERVER_SOCKET
+
+PROFILES = ("default", "cpu-int8", "cpu-bf16", "cpu-auto")
+
+
+def cpu_supports_bf16() -> bool:
+    """True if the CPU has native bf16 matmul support (AVX512-BF16 or AMX)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def conv1d_to_linear(module):
+    """
+    Replace GPT-2 style Conv1D layers with equivalent nn.Linear layers,
+    so dynamic quantization (which only targets nn.Linear) can reach them.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+
 
 class ModelLoader:
     def __init__(self):
         self.protgpt2 = None
+        self.model = None
+        self.tokenizer = None
+        self.profile = None
         self.is_loaded = False
+        # unloaded -> loading -> ready | failed
+        self.state = "unloaded"
+        self.error = None
+        self._load_lock = threading.Lock()
+        self._load_task = None
     
-    def load_model(self, model_dir: str = "model_data", model_id: str = "nferruz/ProtGPT2"):
+    def load_model(self, model_dir: str = "model_data", model_id: str = "nferruz/ProtGPT2",
+                   profile: str = INFERENCE_PROFILE):
         """Load the model once at application startup"""
-        if self.is_loaded:
+        with self._load_lock:
+            if self.is_loaded:
+                return self.protgpt2
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown inference profile: {profile} (expected one of {PROFILES})")
+            self.state = "loading"
+            try:
+                self._load(model_dir, model_id, profile)
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                raise
+            self.state = "ready"
             return self.protgpt2
-        
+
+    def load_in_background(self, **kwargs) -> asyncio.Task:
+        """Start loading on a worker thread and return immediately; see `state`."""
+        if self._load_task is None:
+            self.state = "loading"
+            self._load_task = asyncio.create_task(asyncio.to_thread(self.load_model, **kwargs))
+            self._load_task.add_done_callback(self._log_background_failure)
+        return self._load_task
+
+    async def wait_until_loaded(self):
+        """Wait for a background load in progress; load failures are left to the caller's `state` check."""
+        if self._load_task is not None and not self._load_task.done():
+            await asyncio.wait([self._load_task])
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Background model load failed: {task.exception()}")
+
+    def _load(self, model_dir: str, model_id: str, profile: str):
+        # Heavy imports stay here so importing this module is cheap
+        from transformers import pipeline, AutoModelForCausalLM, AutoTokenizer
+
         # Check if model files exist in the specified directory
         model_path = os.path.join(model_dir, model_id.replace("/", "--"))
         
@@ -25,10 +102,14 @@ class ModelLoader:
         # If model exists locally, use local path with local_files_only
         if model_files_exist:
             print(f"Loading model from local cache: {model_path}")
-            # Load model and tokenizer separately with local_files_only
+            # Load model and tokenizer separately with local_files_only.
+            # safetensors weights are memory-mapped and loaded straight into place.
+            has_safetensors = any(f.endswith(".safetensors") for f in os.listdir(model_path))
             model = AutoModelForCausalLM.from_pretrained(
                 model_path,
-                local_files_only=True
+                local_files_only=True,
+                use_safetensors=has_safetensors,
+                low_cpu_mem_usage=True
             )
             tokenizer = AutoTokenizer.from_pretrained(
                 model_path,
@@ -49,9 +130,79 @@ class ModelLoader:
                 cache_dir=model_dir
             )
         
+        # The generation scheduler calls model.generate directly for batched requests
+        self.model = self.protgpt2.model
+        self.tokenizer = self.protgpt2.tokenizer
+        self.model.eval()
+
+        self._apply_profile(profile)
+        if MODEL_WARMUP:
+            self._warmup()
+
         self.is_loaded = True
-        print("Model loaded successfully!")
-        return self.protgpt2
+        print(f"Model loaded successfully! ({self.describe()})")
+
+    def _apply_profile(self, profile: str):
+        """Apply the CPU inference profile: thread pinning plus int8 or bf16 weights."""
+        import torch
+
+        if profile == "default":
+            self.profile = profile
+            return
+
+        torch.set_num_threads(TORCH_INTRA_OP_THREADS or os.cpu_count())
+        try:
+            torch.set_num_interop_threads(TORCH_INTER_OP_THREADS)
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            print("Inter-op thread count already fixed, keeping the current value")
+
+        if profile == "cpu-auto":
+            profile = "cpu-bf16" if cpu_supports_bf16() else "cpu-int8"
+
+        if profile == "cpu-bf16":
+            self.model = self.model.to(torch.bfloat16)
+        else:
+            conv1d_to_linear(self.model)
+            # In place, so peak RSS doesn't hold an fp32 and an int8 copy at once
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        self.protgpt2.model = self.model
+        self.profile = profile
+
+    def _warmup(self):
+        """Run one short generation so the first request doesn't pay for lazy init."""
+        import torch
+
+        input_ids = torch.tensor([self.tokenizer("<|endoftext|>\nM")["input_ids"]], dtype=torch.long)
+        with torch.inference_mode():
+            self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                do_sample=False,
+                max_new_tokens=8,
+                pad_token_id=0,
+            )
+
+    def describe(self) -> dict:
+        """Report the active inference profile."""
+        if self.model is None:
+            return {"state": self.state, "profile": self.profile, "error": self.error}
+        import torch
+
+        return {
+            "state": self.state,
+            "profile": self.profile,
+            "dtype": "qint8" if self.profile == "cpu-int8" else str(next(self.model.parameters()).dtype),
+            "intra_op_threads": torch.get_num_threads(),
+            "inter_op_threads": torch.get_num_interop_threads(),
+        }
+
+# Global instance: the model itself, or a client of the shared model server
+if MODEL_SERVER_SOCKET:
+    from model_client import RemoteModelLoader
 
-# Global instance
-model_loader = ModelLoader()
\ No newline at end of file
+    model_loader = RemoteModelLoader(MODEL_SERVER_SOCKET)
+else:
+    model_loader = ModelLoader()
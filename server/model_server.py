@@ -0,0 +1,139 @@
+"""
+Shared ProtGPT2 model server for multi-worker deployments.
+
+Run one per host, then start the API with as many uvicorn workers as
+there are cores, all pointing at the same socket:
+
+    python -m model_server --socket /tmp/protgpt2.sock
+    MODEL_SERVER_SOCKET=/tmp/protgpt2.sock uvicorn main:app --workers 8
+
+The model, its micro-batching queue and its prompt cache live only in this
+process, so memory does not grow with the worker count and requests from
+every worker share batches. Requests arrive as frames on a Unix socket (see
+model_client); a "cancel" frame, or the worker disconnecting, drops
+requests whose batch has not started yet. The workers also share the
+persistent job file (JOBS_DB_PATH): each job is claimed by exactly one
+worker, and a restarting worker only requeues jobs whose owner has exited.
+"""
+import argparse
+import asyncio
+import os
+
+from config import INFERENCE_PROFILE, MODEL_SERVER_SOCKET
+from constrained_sampling import SamplingConstraints
+from generation_scheduler import GenerationScheduler
+from model_client import read_frame, write_frame
+from model_loader import PROFILES, ModelLoader
+
+
+class ModelServer:
+    """Serves generate, cancel and status requests against one loaded model."""
+
+    def __init__(self, loader: ModelLoader):
+        self.loader = loader
+        self.scheduler = GenerationScheduler(loader)
+        self.connections = 0
+
+    def status(self) -> dict:
+        return {
+            "state": self.loader.state,
+            "model": self.loader.describe(),
+            "queue_depth": self.scheduler.queue_depth(),
+            "prompt_cache": self.scheduler.prompt_cache.stats(),
+            "batches_run": self.scheduler.batches_run,
+            "sequences_generated": self.scheduler.sequences_generated,
+            "connections": self.connections,
+        }
+
+    async def _generate(self, message: dict) -> dict:
+        if not self.loader.is_loaded:
+            if self.loader.state == "loading":
+                return {"error": "Model is still loading", "status_code": 503}
+            return {"error": "Model not loaded", "status_code": 500}
+        constraints = message.get("constraints")
+        texts = await self.scheduler.submit(
+            message["prompt"],
+            num_return_sequences=message["num_return_sequences"],
+            max_length=message["max_length"],
+            top_k=message["top_k"],
+            repetition_penalty=message["repetition_penalty"],
+            eos_token_id=message["eos_token_id"],
+            constraints=SamplingConstraints(**constraints) if constraints else None,
+        )
+        return {"texts": texts}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """One API worker connection; its requests run concurrently and reply by id."""
+        self.connections += 1
+        tasks: dict[int, asyncio.Task] = {}
+        write_lock = asyncio.Lock()
+
+        async def reply(message: dict):
+            try:
+                async with write_lock:
+                    await write_frame(writer, message)
+            except ConnectionError:
+                pass  # the worker went away; its requests are being cancelled
+
+        async def generate(request_id: int, message: dict):
+            try:
+                result = await self._generate(message)
+            except Exception as exc:
+                result = {"error": str(exc)}
+            finally:
+                tasks.pop(request_id, None)
+            await reply({"id": request_id, **result})
+
+        try:
+            while (message := await read_frame(reader)) is not None:
+                op = message.get("op")
+                if op == "generate":
+                    tasks[message["id"]] = asyncio.create_task(generate(message["id"], message))
+                elif op == "cancel":
+                    task = tasks.pop(message["id"], None)
+                    if task is not None:
+                        task.cancel()
+                elif op == "status":
+                    await reply({"id": message["id"], "status": self.status()})
+                else:
+                    await reply({"id": message.get("id"), "error": f"Unknown op {op!r}", "status_code": 400})
+        except (ConnectionError, ValueError) as exc:
+            print(f"❌ Model server connection error: {exc}")
+        finally:
+            self.connections -= 1
+            for task in tasks.values():
+                task.cancel()
+            writer.close()
+
+
+async def serve(socket_path: str, profile: str):
+    loader = ModelLoader()
+    server = ModelServer(loader)
+    # The socket answers status requests while the model loads
+    loader.load_in_background(profile=profile)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # stale socket from a previous run
+    unix_server = await asyncio.start_unix_server(server.handle, path=socket_path)
+    print(f"✅ Model server listening on {socket_path}")
+    try:
+        async with unix_server:
+            await unix_server.serve_forever()
+    finally:
+        await server.scheduler.stop()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET or "/tmp/protgpt2.sock")
+    parser.add_argument("--profile", default=INFERENCE_PROFILE, choices=PROFILES)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.socket, args.profile))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,32 @@
-def parse_pdb_custom(pdb_file):
-    chains = {}
-    residues_set = set()
-    atom_count = 0
+import numpy as np
 
-    with open(pdb_file, 'r') as f:
-        for line in f:
-            if line.startswith("ATOM") or line.startswith("HETATM"):
-                atom_count += 1
-                chain_id = line[21].strip()
-                res_seq = int(line[22:26].strip())
-                res_name = line[17:20].strip()
+from pdb_parser import PDBStructure, get_structure
 
-                # Track residues per chain
-                if chain_id not in chains:
-                    chains[chain_id] = {}
-                chains[chain_id][res_seq] = res_name
 
-                # Track unique residues overall
-                residues_set.add((chain_id, res_seq, res_name))
+def summarize_structure(structure: PDBStructure) -> str:
+    """Natural-language summary of chains, residues and atoms of a parsed structure."""
+    chains = {}
+    residues_set = set()
+    atom_count = structure.atom_count
+
+    # Only atoms where (chain, residue number, residue name) changes matter for the summary
+    if atom_count:
+        changed = np.ones(atom_count, dtype=bool)
+        changed[1:] = (
+            (structure.chain[1:] != structure.chain[:-1])
+            | (structure.resseq[1:] != structure.resseq[:-1])
+            | (structure.resname[1:] != structure.resname[:-1])
+        )
+        for chain_id, res_seq, res_name in zip(
+            structure.chain[changed].tolist(), structure.resseq[changed].tolist(), structure.resname[changed].tolist()
+        ):
+            # Track residues per chain
+            if chain_id not in chains:
+                chains[chain_id] = {}
+            chains[chain_id][res_seq] = res_name
+
+            # Track unique residues overall
+            residues_set.add((chain_id, res_seq, res_name))
 
     total_chains = len(chains)
     total_residues = len(residues_set)
@@ -39,6 +48,11 @@ def parse_pdb_custom(pdb_file):
     return summary
 
 
+def parse_pdb_custom(pdb_file):
+    with open(pdb_file, 'r') as f:
+        return summarize_structure(get_structure(f.read()))
+
+
 if __name__ == "__main__":
     pdb_file = "example1.pdb"  # replace with your PDB file
     result = parse_pdb_custom(pdb_file)
@@ -0,0 +1,244 @@
+"""
+Single-pass, vectorized PDB parser shared by analysis, DSSP and scoring.
+
+ATOM/HETATM records of the first model are packed into one fixed-width
+byte matrix and every column is sliced out at once with NumPy, giving a
+structure-of-arrays record. Parsed structures are cached by key
+(the sequence hash when known) so each PDB is parsed once per process.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import PARSED_STRUCTURE_CACHE_ENTRIES
+
+LINE_WIDTH = 80
+
+THREE_TO_ONE = {
+    "ALA": "A", "ARG": "R", "ASN": "N", "ASP": "D", "CYS": "C",
+    "GLN": "Q", "GLU": "E", "GLY": "G", "HIS": "H", "ILE": "I",
+    "LEU": "L", "LYS": "K", "MET": "M", "PHE": "F", "PRO": "P",
+    "SER": "S", "THR": "T", "TRP": "W", "TYR": "Y", "VAL": "V",
+}
+
+
+@dataclass
+class PDBStructure:
+    """Columnar (structure-of-arrays) view of the atoms of one model."""
+    coords: np.ndarray      # (n, 3) float32
+    hetatm: np.ndarray      # (n,) bool
+    serial: np.ndarray      # (n,) int32
+    atom_name: np.ndarray   # (n,) str
+    altloc: np.ndarray      # (n,) str
+    resname: np.ndarray     # (n,) str
+    chain: np.ndarray       # (n,) str
+    resseq: np.ndarray      # (n,) int32
+    icode: np.ndarray       # (n,) str
+    occupancy: np.ndarray   # (n,) float32
+    bfactor: np.ndarray     # (n,) float32, pLDDT for ESMFold models
+    element: np.ndarray     # (n,) str
+
+    def __post_init__(self):
+        n = len(self.coords)
+        # A residue starts wherever chain, residue number or insertion code changes
+        if n:
+            changed = (
+                (self.chain[1:] != self.chain[:-1])
+                | (self.resseq[1:] != self.resseq[:-1])
+                | (self.icode[1:] != self.icode[:-1])
+            )
+            self.residue_starts = np.concatenate(([0], np.nonzero(changed)[0] + 1))
+        else:
+            self.residue_starts = np.zeros(0, dtype=np.int64)
+        self.residue_index = np.repeat(
+            np.arange(len(self.residue_starts)), np.diff(np.append(self.residue_starts, n))
+        )
+
+    @property
+    def atom_count(self) -> int:
+        return len(self.coords)
+
+    @property
+    def residue_count(self) -> int:
+        return len(self.residue_starts)
+
+    def ca_indices(self) -> np.ndarray:
+        """Index of the first CA atom (ATOM records only) of every residue that has one."""
+        ca = np.nonzero((self.atom_name == "CA") & ~self.hetatm)[0]
+        _, first = np.unique(self.residue_index[ca], return_index=True)
+        return ca[first]
+
+    def ca_coords(self) -> np.ndarray:
+        return self.coords[self.ca_indices()]
+
+    def sequence(self) -> str:
+        return "".join(THREE_TO_ONE.get(r, "X") for r in self.resname[self.residue_starts])
+
+    def residue_plddt(self) -> np.ndarray:
+        """Per-residue pLDDT (B-factor of the CA atom)."""
+        return self.bfactor[self.ca_indices()]
+
+    def nbytes(self) -> int:
+        return sum(
+            getattr(self, name).nbytes
+            for name in ("coords", "hetatm", "serial", "atom_name", "altloc", "resname", "chain",
+                         "resseq", "icode", "occupancy", "bfactor", "element", "residue_starts", "residue_index")
+        )
+
+
+def _column(table: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Fixed-width column [start, end) of the byte matrix as an (n,) bytes array."""
+    return np.ascontiguousarray(table[:, start:end]).view(f"S{end - start}")[:, 0]
+
+
+def _text(table: np.ndarray, start: int, end: int) -> np.ndarray:
+    return np.char.strip(_column(table, start, end).astype(str))
+
+
+# Right-justified numeric columns of the PDB format: name -> (start, end, decimals, default)
+NUMERIC_COLUMNS = {
+    "serial": (6, 11, 0, 0),
+    "resseq": (22, 26, 0, 0),
+    "x": (30, 38, 3, 0),
+    "y": (38, 46, 3, 0),
+    "z": (46, 54, 3, 0),
+    "occupancy": (54, 60, 2, 1.0),
+    "bfactor": (60, 66, 2, 0),
+}
+
+
+def _number(table: np.ndarray, start: int, end: int, decimals: int, default) -> np.ndarray:
+    """
+    Parse a right-justified numeric column ("  -7.742", " 323").
+
+    Standard fixed-point columns are decoded with digit arithmetic on the
+    byte matrix (one small matmul against the place values). Columns that
+    do not follow the standard layout fall back to string conversion.
+    """
+    field = table[:, start:end]
+    width = end - start
+    dot = width - decimals - 1
+    if decimals and not np.all((field[:, dot] == ord(".")) | (field == ord(" ")).all(axis=1)):
+        column = np.char.strip(_column(table, start, end))
+        column[column == b""] = str(default).encode()
+        return column.astype(np.float64)
+
+    digits = field.astype(np.int16) - 48
+    is_digit = (digits >= 0) & (digits <= 9)
+    exponents = np.arange(width - 1, -1, -1) - decimals
+    if decimals:
+        exponents[:dot] -= 1
+    values = np.where(is_digit, digits, 0) @ (10.0 ** exponents)
+    values = np.where((field == ord("-")).any(axis=1), -values, values)
+
+    if default:
+        values[~is_digit.any(axis=1)] = default
+    return values
+
+
+def parse_pdb(pdb_text: str) -> PDBStructure:
+    """Parse the ATOM/HETATM records of the first model in one pass."""
+    records = []
+    for line in pdb_text.splitlines():
+        if line.startswith(("ATOM  ", "HETATM")):
+            records.append(line[:LINE_WIDTH].ljust(LINE_WIDTH))
+        elif line.startswith("ENDMDL"):
+            break
+
+    n = len(records)
+    table = np.frombuffer("".join(records).encode("ascii", "replace"), dtype=np.uint8).reshape(n, LINE_WIDTH)
+
+    numbers = {name: _number(table, *spec) for name, spec in NUMERIC_COLUMNS.items()}
+    coords = np.stack([numbers["x"], numbers["y"], numbers["z"]], axis=1).astype(np.float32)
+    element = _text(table, 76, 78)
+    atom_name = _text(table, 12, 16)
+    # Older files leave the element column empty; fall back to the first letter of the name
+    missing = element == ""
+    if missing.any():
+        element[missing] = np.char.lstrip(atom_name[missing], "0123456789").astype("U1")
+
+    return PDBStructure(
+        coords=coords,
+        hetatm=table[:, 0] == ord("H"),
+        serial=np.rint(numbers["serial"]).astype(np.int32),
+        atom_name=atom_name,
+        altloc=_text(table, 16, 17),
+        resname=_text(table, 17, 20),
+        chain=_text(table, 21, 22),
+        resseq=np.rint(numbers["resseq"]).astype(np.int32),
+        icode=_text(table, 26, 27),
+        occupancy=numbers["occupancy"].astype(np.float32),
+        bfactor=numbers["bfactor"].astype(np.float32),
+        element=element,
+    )
+
+
+def text_key(pdb_text: str) -> str:
+    """Cache key for a PDB text whose sequence hash is not known."""
+    return hashlib.blake2b(pdb_text.encode(), digest_size=16).hexdigest()
+
+
+class ParsedStructureCache:
+    """Bounded LRU of parsed structures keyed by sequence hash (or text hash)."""
+
+    def __init__(self, max_entries: int = PARSED_STRUCTURE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, PDBStructure] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pdb_text: str, key: str | None = None) -> PDBStructure:
+        if key is None:
+            key = text_key(pdb_text)
+        with self._lock:
+            structure = self._entries.get(key)
+            if structure is not None:
+                self._entries.move_to_end(key)
+                return structure
+        structure = parse_pdb(pdb_text)
+        self.put(key, structure)
+        return structure
+
+    def put(self, key: str, structure: PDBStructure):
+        """Seed the cache with a structure loaded some other way (binary format)."""
+        with self._lock:
+            self._entries[key] = structure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+
+# Global instance
+parsed_structures = ParsedStructureCache()
+
+
+def get_structure(pdb_text: str, key: str | None = None) -> PDBStructure:
+    """Parse `pdb_text` once per process; pass the sequence hash as `key` when known."""
+    return parsed_structures.get(pdb_text, key)
+
+
+def to_mdtraj(structure: PDBStructure):
+    """Build an mdtraj Trajectory straight from the parsed arrays (no re-parse)."""
+    import mdtraj as md  # heavy; imported on first use
+
+    topology = md.Topology()
+    chain = residue = None
+    chain_ids = structure.chain
+    starts = set(structure.residue_starts.tolist())
+    for i in range(structure.atom_count):
+        if chain is None or chain_ids[i] != chain_ids[i - 1]:
+            chain = topology.add_chain()
+        if i in starts:
+            residue = topology.add_residue(str(structure.resname[i]), chain, resSeq=int(structure.resseq[i]))
+        try:
+            element = md.element.get_by_symbol(str(structure.element[i]).capitalize())
+        except KeyError:
+            element = md.element.virtual
+        topology.add_atom(str(structure.atom_name[i]), element, residue, serial=int(structure.serial[i]))
+    # mdtraj works in nanometers
+    return md.Trajectory(structure.coords[None, :, :] / 10.0, topology)
@@ -0,0 +1,177 @@
+"""
+The /fetch_pdb pipeline: fold, score and describe generated candidates.
+
+Candidates run in a sliding window of CANDIDATE_CONCURRENCY tasks and
+records are yielded as they complete. A new candidate only starts once a
+finished record has been consumed, so a slow reader holds back the work
+instead of piling up PDB strings, and closing the generator (e.g. on a
+client disconnect) cancels whatever is still running.
+"""
+import asyncio
+import json
+from contextlib import aclosing
+
+from config import CANDIDATE_CONCURRENCY, SIMILARITY_FLAG_IDENTITY
+from dssp_analyse import analyze_pdb_full
+from fetch_biosimilars import generate_candidates_async
+from fetch_protein import fetch_structure
+from metrics import CANDIDATES_IN_FLIGHT, span
+from model_loader import model_loader
+from structure_cache import structure_cache, structure_key
+from tm_mech import compute_tm_score_pdb
+
+
+async def process_candidate(i: int, seq: str, original_pdb: str, original_key: str, on_stage=None) -> dict:
+    """
+    Fetch, score and describe a single biosimilar candidate.
+
+    Returns a record with the candidate index, sequence, PDB (None on
+    failure), its structure cache key, TM-score against the original and
+    description, plus the closest previously folded sequence when it is a
+    near-duplicate. `reused_from` is the key of a relative's structure
+    served in place of folding (FOLD_REUSE_IDENTITY), else None.
+    `on_stage(stage, record)` is awaited after "folded", "scored" and "described".
+    """
+    CANDIDATES_IN_FLIGHT.inc()
+    try:
+        return await _process_candidate(i, seq, original_pdb, original_key, on_stage)
+    finally:
+        CANDIDATES_IN_FLIGHT.dec()
+
+
+async def _process_candidate(i: int, seq: str, original_pdb: str, original_key: str, on_stage) -> dict:
+    record = {"index": i, "sequence": seq, "pdb_data": None, "structure_key": None, "reused_from": None,
+              "tm_score": None, "description": "Failed to fetch PDB."}
+
+    seq_key = structure_key(seq)
+    if SIMILARITY_FLAG_IDENTITY > 0:
+        # Its own key is excluded: a repeat candidate is an exact cache hit, not a near-duplicate
+        try:
+            neighbours = await structure_cache.nearest(seq, exclude_key=seq_key)
+        except Exception as e:
+            print(f"❌ Error looking up similar sequences for sequence {i+1}: {e}")
+            neighbours = []
+        if neighbours and neighbours[0]["identity"] >= SIMILARITY_FLAG_IDENTITY:
+            record["nearest_known"] = {"structure_key": neighbours[0]["key"], "identity": neighbours[0]["identity"]}
+
+    print(f"Fetching PDB for sequence {i+1}: {seq}")
+    try:
+        success, pdb_content, served_key = await fetch_structure(seq)
+    except Exception as e:
+        print(f"❌ Error fetching PDB for sequence {i+1}: {e}")
+        return record
+
+    if not success or not pdb_content:
+        print(f"❌ Failed to fetch PDB for sequence {i+1}")
+        return record
+
+    # Scoring and analysis share one parse of the PDB, keyed by the structure actually served
+    # (a reused relative's structure must not be cached under this sequence's key)
+    record.update(pdb_data=pdb_content, structure_key=served_key, description=None)
+    if served_key != seq_key:
+        record["reused_from"] = served_key
+    if on_stage is not None:
+        await on_stage("folded", record)
+
+    async def _tm_score():
+        try:
+            record["tm_score"] = await compute_tm_score_pdb(pdb_content, original_pdb, served_key, original_key)
+        except Exception as e:
+            print(f"❌ Error computing TM-score for sequence {i+1}: {e}")
+            record["tm_score"] = 0.0
+        if on_stage is not None:
+            await on_stage("scored", record)
+
+    async def _description():
+        try:
+            with span("description"):
+                record["description"] = await analyze_pdb_full(pdb_text=pdb_content, key=served_key)
+        except Exception as e:
+            print(f"❌ Error analyzing PDB for sequence {i+1}: {e}")
+            record["description"] = "Failed to generate description."
+        if on_stage is not None:
+            await on_stage("described", record)
+
+    # TM-score and description only depend on the fetched PDB, so run them together
+    await asyncio.gather(_tm_score(), _description())
+    print(f"✅ Sequence {i+1}: fetched PDB, TM-score={record['tm_score']}, description generated")
+    return record
+
+
+async def iter_candidate_records(
+    biosimilars: list[str],
+    original_pdb: str,
+    original_key: str,
+    concurrency: int = CANDIDATE_CONCURRENCY,
+    on_stage=None,
+):
+    """
+    Yield candidate records in completion order, at most `concurrency` in flight.
+    `on_stage` is passed through to `process_candidate`.
+    """
+    candidates = iter(enumerate(biosimilars))
+    pending: set[asyncio.Task] = set()
+
+    def launch():
+        item = next(candidates, None)
+        if item is not None:
+            i, seq = item
+            pending.add(asyncio.create_task(process_candidate(i, seq, original_pdb, original_key, on_stage)))
+
+    for _ in range(concurrency):
+        launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+                launch()
+    finally:
+        # Reader went away (or failed): drop the candidates still in flight
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def stream_pipeline(fold_seq: str, original_pdb: str, original_key: str):
+    """
+    Events for one streamed /fetch_pdb request: the reference structure,
+    one event per candidate as it completes, then a summary (or an error).
+    `original_key` is the cache key of the reference structure served (see
+    fetch_structure).
+    """
+    yield {"event": "reference", "sequence": fold_seq, "pdb_data": original_pdb}
+
+    try:
+        biosimilars, rejected = await generate_candidates_async(model_loader, fold_seq)
+    except Exception as exc:
+        yield {"event": "error", "status_code": getattr(exc, "status_code", 500), "detail": str(getattr(exc, "detail", exc))}
+        return
+
+    successful = 0
+    # aclosing: when this stream is closed early, the candidates in flight are cancelled right away
+    async with aclosing(iter_candidate_records(biosimilars, original_pdb, original_key)) as records:
+        async for record in records:
+            if record["pdb_data"] is not None:
+                successful += 1
+            yield {"event": "candidate", **record}
+
+    yield {
+        "event": "summary",
+        "status": "success",
+        "total_generated": len(biosimilars),
+        "successful_fetches": successful,
+        "failed_fetches": len(biosimilars) - successful,
+        "rejected": rejected,
+        "fold_calls_avoided": len(rejected),
+    }
+
+
+def encode_ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def encode_sse(event: dict) -> str:
+    payload = {k: v for k, v in event.items() if k != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
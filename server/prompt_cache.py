@@ -0,0 +1,126 @@
+"""
+Prompt prefix cache for ProtGPT2.
+
+Users keep generating from the same few reference sequences, so the
+tokenized prompt and the past key/values of its forward pass are kept in
+a bounded LRU (by entries and by tensor bytes). A generation from a
+cached reference only runs the last prompt token and the new tokens.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from config import PROMPT_CACHE_ENTRIES, PROMPT_CACHE_MAX_MB
+
+
+def _legacy(past) -> tuple:
+    """((key, value), ...) per layer, whatever cache class the model returned."""
+    if isinstance(past, tuple):
+        return past
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    return tuple((layer.keys, layer.values) for layer in past.layers)
+
+
+@dataclass
+class PromptEntry:
+    input_ids: list[int]
+    # Past key/values for input_ids[:-1] (batch of one), None until first needed
+    past: tuple | None = None
+    nbytes: int = 0
+
+    def expand(self, rows: int, model):
+        """The cached prefix broadcast to `rows` rows, as a cache `generate` extends without touching ours."""
+        legacy = tuple((k.expand(rows, -1, -1, -1), v.expand(rows, -1, -1, -1)) for k, v in self.past)
+        # GPT-2 only takes cache objects once transformers ports it to the Cache API
+        if not getattr(model, "_supports_cache_class", True):
+            return legacy
+        from transformers import DynamicCache
+
+        if hasattr(DynamicCache, "from_legacy_cache"):
+            return DynamicCache.from_legacy_cache(legacy)
+        return DynamicCache(legacy)
+
+
+class PromptCache:
+    """LRU of tokenized prompts and their prefix KV, capped by entries and bytes."""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_ENTRIES, max_mb: float = PROMPT_CACHE_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries: OrderedDict[str, PromptEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def tokens(self, prompt: str, tokenizer) -> PromptEntry:
+        """Entry for `prompt`, tokenizing on first use."""
+        with self._lock:
+            entry = self._entries.get(prompt)
+            if entry is not None:
+                self._entries.move_to_end(prompt)
+                return entry
+        entry = PromptEntry(input_ids=tokenizer(prompt)["input_ids"])
+        with self._lock:
+            entry = self._entries.setdefault(prompt, entry)
+            self._evict()
+        return entry
+
+    def prefix(self, prompt: str, model, tokenizer) -> PromptEntry | None:
+        """
+        Entry with the prompt's past key/values, running the prefix forward
+        pass on a miss. None when KV reuse is off, the prompt is a single
+        token or its KV alone would exceed the byte cap.
+        """
+        import torch
+
+        entry = self.tokens(prompt, tokenizer)
+        if self.max_bytes <= 0 or len(entry.input_ids) < 2:
+            return None
+        if entry.past is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with torch.inference_mode():
+            output = model(input_ids=torch.tensor([entry.input_ids[:-1]], dtype=torch.long), use_cache=True)
+        past = _legacy(output.past_key_values)
+        nbytes = sum(t.numel() * t.element_size() for layer in past for t in layer)
+        with self._lock:
+            self.misses += 1
+            if nbytes > self.max_bytes:
+                return None
+            if prompt not in self._entries:
+                self._entries[prompt] = entry
+            if entry.past is None:
+                entry.past, entry.nbytes = past, nbytes
+                self.nbytes += nbytes
+            self._entries.move_to_end(prompt)
+            self._evict()
+        return entry
+
+    def _evict(self):
+        # Caller holds the lock; the newest entry always stays
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "kv_entries": sum(entry.past is not None for entry in self._entries.values()),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
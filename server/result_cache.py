@@ -0,0 +1,203 @@
+"""
+Derived-result cache for the per-candidate stages (TM-score, DSSP, description).
+
+Results are keyed by (stage, stage version, content hashes of the inputs)
+and kept in a small in-memory LRU in front of a SQLite table, so a
+structure or structure pair seen before costs a dictionary lookup instead
+of a worker-pool round trip, across restarts too. Bumping a stage's entry
+in STAGE_VERSIONS changes its keys (and those of stages depending on it),
+and rows from older versions are dropped when the cache opens.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import RESULT_CACHE_PATH, RESULT_CACHE_LRU_ENTRIES, RESULT_CACHE_MAX_ENTRIES
+from http_client import SingleFlight
+from metrics import RESULT_CACHE_REQUESTS
+
+# Bump a stage's version whenever its output for the same input changes
+STAGE_VERSIONS = {
+    "tm_score": 1,
+    "dssp": 1,
+    "description": 1,
+}
+# Stages whose output embeds another stage's (their keys change with it too)
+STAGE_DEPENDENCIES = {
+    "description": ("dssp",),
+}
+
+# Trim the table to RESULT_CACHE_MAX_ENTRIES every this many puts
+TRIM_EVERY = 256
+
+
+def stage_version(stage: str) -> str:
+    """Version of `stage` including the stages it depends on, e.g. "1" or "1;dssp=1"."""
+    parts = [str(STAGE_VERSIONS[stage])]
+    parts += [f"{dep}={STAGE_VERSIONS[dep]}" for dep in STAGE_DEPENDENCIES.get(stage, ())]
+    return ";".join(parts)
+
+
+class ResultStore:
+    """SQLite table of JSON results, one row per key."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_created ON results (created_at);
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, stage: str, version: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, stage, version, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, version, value, time.time()),
+            )
+            self._conn.commit()
+
+    def drop_stale(self, versions: dict[str, str]) -> int:
+        """Delete rows of unknown stages or older stage versions."""
+        with self._lock:
+            placeholders = " OR ".join("(stage = ? AND version = ?)" for _ in versions)
+            params = [x for item in versions.items() for x in item]
+            count = self._conn.execute(f"DELETE FROM results WHERE NOT ({placeholders})", params).rowcount
+            self._conn.commit()
+        return count
+
+    def trim(self, max_entries: int) -> int:
+        """Keep the newest `max_entries` rows."""
+        with self._lock:
+            count = self._conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """
+    In-memory LRU over an optional SQLite store (memory only until `start`,
+    or when RESULT_CACHE_PATH is empty). Concurrent misses for one key
+    share a single computation.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, lru_entries: int = RESULT_CACHE_LRU_ENTRIES,
+                 max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.lru_entries = lru_entries
+        self.max_entries = max_entries
+        self.store: ResultStore | None = None
+        self._lru: OrderedDict[str, object] = OrderedDict()
+        self._single_flight = SingleFlight()
+        self._puts_since_trim = 0
+
+    @staticmethod
+    def key(stage: str, *input_hashes: str) -> str:
+        material = "\0".join((stage, stage_version(stage), *input_hashes))
+        return hashlib.blake2b(material.encode(), digest_size=20).hexdigest()
+
+    def open(self):
+        if self.store is not None or not self.path:
+            return
+        self.store = ResultStore(self.path)
+        dropped = self.store.drop_stale({stage: stage_version(stage) for stage in STAGE_VERSIONS})
+        if dropped:
+            print(f"📌 Result cache: dropped {dropped} results from older stage versions")
+        print(f"Result cache ready: {self.store.count()} entries")
+
+    async def start(self):
+        await asyncio.to_thread(self.open)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _lru_put(self, key: str, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, stage: str, *input_hashes: str):
+        """Cached result or None."""
+        key = self.key(stage, *input_hashes)
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            RESULT_CACHE_REQUESTS.inc(stage=stage, result="hit")
+            return self._lru[key]
+        if self.store is not None:
+            raw = await asyncio.to_thread(self.store.get, key)
+            if raw is not None:
+                value = json.loads(raw)
+                self._lru_put(key, value)
+                RESULT_CACHE_REQUESTS.inc(stage=stage, result="hit")
+                return value
+        RESULT_CACHE_REQUESTS.inc(stage=stage, result="miss")
+        return None
+
+    async def put(self, stage: str, input_hashes: tuple, value):
+        key = self.key(stage, *input_hashes)
+        self._lru_put(key, value)
+        if self.store is None:
+            return
+        await asyncio.to_thread(self.store.put, key, stage, stage_version(stage), json.dumps(value))
+        self._puts_since_trim += 1
+        if self.max_entries and self._puts_since_trim >= TRIM_EVERY:
+            self._puts_since_trim = 0
+            await asyncio.to_thread(self.store.trim, self.max_entries)
+
+    async def get_or_compute(self, stage: str, input_hashes: tuple, compute):
+        """Cached result for `stage` on these inputs, else `await compute()` stored under them."""
+        value = await self.get(stage, *input_hashes)
+        if value is not None:
+            return value
+
+        async def _compute():
+            result = await compute()
+            await self.put(stage, input_hashes, result)
+            return result
+
+        return await self._single_flight.do(self.key(stage, *input_hashes), _compute)
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._lru),
+            "persistent": self.store is not None,
+            "stage_versions": {stage: stage_version(stage) for stage in STAGE_VERSIONS},
+        }
+
+
+# Global instance
+result_cache = ResultCache()
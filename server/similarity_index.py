@@ -0,0 +1,183 @@
+"""
+MinHash/LSH index of known sequences for near-duplicate lookup.
+
+A sequence is summarized by the MinHash signature of its k-mer set, split
+into `bands` groups of `rows` values; two sequences with k-mer Jaccard
+similarity J share at least one band hash with probability
+1 - (1 - J**rows)**bands. Entries of every band live in one sorted uint64
+array (band, band hash, entry id), plus a small dict of recent additions
+that is merged in every `merge_every` additions, so a lookup is one
+vectorized binary search and memory is 8 bytes per band plus a 32-byte
+key per sequence.
+Candidates are ranked by matching bands; callers verify them with
+`sequence_identity` on the actual sequences.
+"""
+import threading
+
+import numpy as np
+
+from candidate_filter import AMINO_ACIDS, INVALID
+from config import SIMILARITY_KMER, SIMILARITY_BANDS, SIMILARITY_ROWS, SIMILARITY_MAX_SHIFT
+
+LOW_32 = np.uint64(0xFFFFFFFF)
+MERGE_EVERY = 4096
+# Entries are band number (BAND_BITS) | top bits of the band hash | entry id (32 bits) in one uint64
+BAND_BITS = 5
+
+# Byte -> residue code, INVALID for anything but the 20 standard residues
+_CODES = np.full(256, INVALID, dtype=np.uint8)
+_CODES[np.frombuffer(AMINO_ACIDS.encode(), dtype=np.uint8)] = np.arange(len(AMINO_ACIDS))
+
+
+class MinHasher:
+    """Band hashes of a sequence's k-mer MinHash signature."""
+
+    def __init__(self, k: int = SIMILARITY_KMER, bands: int = SIMILARITY_BANDS, rows: int = SIMILARITY_ROWS,
+                 seed: int = 1):
+        if len(AMINO_ACIDS) ** k >= 1 << 32:
+            raise ValueError(f"k-mer length {k} too large for 32-bit k-mer ids")
+        self.k, self.bands, self.rows, self.seed = k, bands, rows, seed
+        rng = np.random.default_rng(seed)
+        # Multiply-add-shift hashes of the k-mer ids: (a * x + b) >> 32, wrapping in 64 bits
+        self._a = rng.integers(1, 1 << 63, (bands * rows, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, (bands * rows, 1), dtype=np.uint64)
+        self._mix = rng.integers(1, 1 << 32, rows, dtype=np.uint64) | np.uint64(1)
+        self._powers = len(AMINO_ACIDS) ** np.arange(k - 1, -1, -1, dtype=np.int64)
+
+    @property
+    def params(self) -> str:
+        """Identifies the hash family; stored band hashes are only valid for the same params."""
+        return f"k={self.k};bands={self.bands};rows={self.rows};seed={self.seed}"
+
+    def kmers(self, sequence: str) -> np.ndarray:
+        """Distinct k-mer ids of the standard residues in `sequence`."""
+        codes = encode(sequence).astype(np.int64)
+        if len(codes) < self.k:
+            return np.empty(0, dtype=np.uint64)
+        windows = np.lib.stride_tricks.sliding_window_view(codes, self.k)
+        ids = windows @ self._powers
+        if (codes == INVALID).any():
+            ids = ids[(windows < INVALID).all(axis=1)]
+        return np.unique(ids).astype(np.uint64)
+
+    def band_hashes(self, sequence: str) -> np.ndarray | None:
+        """(bands,) uint32, or None for a sequence without a single k-mer."""
+        kmers = self.kmers(sequence)
+        if not len(kmers):
+            return None
+        signature = ((self._a * kmers + self._b) >> np.uint64(32)).min(axis=1)
+        mixed = (signature.reshape(self.bands, self.rows) * self._mix).sum(axis=1)
+        return (mixed & LOW_32).astype(np.uint32)
+
+
+class SequenceIndex:
+    """LSH buckets over band hashes; entries are identified by 64-hex-character keys."""
+
+    def __init__(self, bands: int = SIMILARITY_BANDS, merge_every: int = MERGE_EVERY):
+        if bands > 1 << BAND_BITS:
+            raise ValueError(f"At most {1 << BAND_BITS} bands are supported")
+        self.bands = bands
+        self.merge_every = merge_every
+        self._lock = threading.Lock()
+        self._band_prefix = np.arange(bands, dtype=np.uint64) << np.uint64(64 - BAND_BITS)
+        self._keys = np.empty((0, 32), dtype=np.uint8)
+        self._sorted = np.empty(0, dtype=np.uint64)
+        # Entries added since the last merge: bucket prefix -> tail positions
+        self._tail_keys: list[bytes] = []
+        self._tail_buckets: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._tail_keys)
+
+    @property
+    def nbytes(self) -> int:
+        return self._keys.nbytes + self._sorted.nbytes + len(self._tail_keys) * (32 + 8 * self.bands)
+
+    def _prefixes(self, band_hashes: np.ndarray) -> np.ndarray:
+        """(bands,) uint64 bucket prefixes: band number, then the top bits of the band hash."""
+        return self._band_prefix | ((band_hashes.astype(np.uint64) >> np.uint64(BAND_BITS)) << np.uint64(32))
+
+    def add(self, key: str, band_hashes: np.ndarray):
+        with self._lock:
+            position = len(self._tail_keys)
+            self._tail_keys.append(bytes.fromhex(key))
+            for prefix in self._prefixes(band_hashes).tolist():
+                self._tail_buckets.setdefault(prefix, []).append(position)
+            if len(self._tail_keys) >= self.merge_every:
+                self._merge()
+
+    def add_many(self, keys: list[str], band_hashes: np.ndarray):
+        """Bulk add: (n, bands) band hashes, merged in one pass."""
+        with self._lock:
+            self._merge()
+            self._append(np.frombuffer(bytes.fromhex("".join(keys)), dtype=np.uint8).reshape(-1, 32),
+                         np.asarray(band_hashes, dtype=np.uint32))
+
+    def _merge(self):
+        if not self._tail_keys:
+            return
+        keys = np.frombuffer(b"".join(self._tail_keys), dtype=np.uint8).reshape(-1, 32)
+        band_hashes = np.zeros((len(keys), self.bands), dtype=np.uint32)
+        shift = np.uint64(32 - BAND_BITS)
+        for prefix, positions in self._tail_buckets.items():
+            band = prefix >> (64 - BAND_BITS)
+            band_hashes[positions, band] = (np.uint64(prefix) >> shift) & np.uint64(0xFFFFFFFF)
+        self._tail_keys, self._tail_buckets = [], {}
+        self._append(keys, band_hashes)
+
+    def _append(self, keys: np.ndarray, band_hashes: np.ndarray):
+        first = len(self._keys)
+        ids = np.arange(first, first + len(keys), dtype=np.uint64)
+        entries = (self._prefixes(band_hashes) | ids[:, None]).ravel()
+        # Stable sort of two sorted runs is a linear merge
+        self._sorted = np.sort(np.concatenate([self._sorted, np.sort(entries)]), kind="stable")
+        self._keys = np.concatenate([self._keys, keys])
+
+    def candidates(self, band_hashes: np.ndarray, limit: int) -> list[tuple[str, int]]:
+        """Up to `limit` (key, matching bands) pairs, most matching bands first."""
+        prefixes = self._prefixes(band_hashes)
+        with self._lock:
+            starts = np.searchsorted(self._sorted, prefixes, side="left")
+            ends = np.searchsorted(self._sorted, prefixes | LOW_32, side="right")
+            found = [self._sorted[start:end] & LOW_32 for start, end in zip(starts.tolist(), ends.tolist())]
+            merged = len(self._keys)
+            tail = [merged + position for prefix in prefixes.tolist()
+                    for position in self._tail_buckets.get(prefix, ())]
+            found.append(np.array(tail, dtype=np.uint64))
+            ids, votes = np.unique(np.concatenate(found), return_counts=True)
+            order = np.argsort(-votes, kind="stable")[:limit]
+            result = []
+            for i in order.tolist():
+                entry = int(ids[i])
+                key = self._keys[entry].tobytes() if entry < merged else self._tail_keys[entry - merged]
+                result.append((key.hex(), int(votes[i])))
+            return result
+
+
+def encode(sequence: str) -> np.ndarray:
+    """Residue codes (INVALID for non-standard residues)."""
+    return _CODES[np.frombuffer(sequence.encode("latin-1", "replace"), dtype=np.uint8)]
+
+
+def sequence_identity(a: str | np.ndarray, b: str | np.ndarray, max_shift: int = SIMILARITY_MAX_SHIFT) -> float:
+    """
+    Fraction of identical residues over the longer sequence, compared
+    position by position at offsets within `max_shift` residues, with one
+    change of offset allowed (a single insertion or deletion). Sequences
+    may be given as `encode` codes to encode a query only once.
+    """
+    x = encode(a) if isinstance(a, str) else a
+    y = encode(b) if isinstance(b, str) else b
+    if not len(x) or not len(y):
+        return 0.0
+    # padded[max_shift + i - shift] is the residue of b facing a[i] at that offset
+    padded = np.full(len(x) + 2 * max_shift, 255, dtype=np.uint8)
+    overlap = min(len(y), len(x) + max_shift)
+    padded[max_shift:max_shift + overlap] = y[:overlap]
+    windows = np.lib.stride_tricks.as_strided(padded, (2 * max_shift + 1, len(x)), padded.strides * 2)
+    before = np.zeros((2 * max_shift + 1, len(x) + 1), dtype=np.int32)
+    np.cumsum(windows == x, axis=1, out=before[:, 1:])
+    after = before[:, -1:] - before
+    # Best prefix at one offset plus best suffix at another, over every split point
+    best = int((before.max(axis=0) + after.max(axis=0)).max())
+    return best / max(len(x), len(y))
@@ -0,0 +1,755 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always available
+    zstandard = None
+
+from config import (
+    STRUCTURE_CACHE_BACKEND,
+    STRUCTURE_CACHE_DIR,
+    STRUCTURE_CACHE_CODEC,
+    STRUCTURE_CACHE_LRU_ENTRIES,
+    STRUCTURE_CACHE_MAX_BYTES,
+    STRUCTURE_CACHE_MAX_AGE_DAYS,
+    STRUCTURE_CACHE_BINARY,
+    LEGACY_PDB_DIR,
+    FOLD_BACKEND,
+    SIMILARITY_INDEX,
+    SIMILARITY_REFRESH_SECONDS,
+)
+from pdb_parser import THREE_TO_ONE, PDBStructure, parse_pdb
+from similarity_index import MinHasher, SequenceIndex, encode as encode_residues, sequence_identity
+from structure_format import decode as decode_binary, encode as encode_binary, load as load_binary
+
+CODEC_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+# Run eviction every this many puts (and always at startup)
+EVICT_EVERY = 64
+
+# Flush buffered last-hit timestamps to the index after this many hits
+HIT_FLUSH_EVERY = 128
+
+# Below this many entries random sampling just shuffles the whole index
+RANDOM_SCAN_LIMIT = 10000
+
+# Similarity lookups verify this many LSH candidates per requested neighbour
+CANDIDATES_PER_NEIGHBOUR = 4
+
+def structure_key(sequence: str) -> str:
+    """
+    Cache key of a fold sequence: the SHA-256 of its text. Synthetic
+    structures get their own key space so they never shadow real folds.
+    """
+    if FOLD_BACKEND == "synthetic":
+        sequence = "synthetic:" + sequence
+    return hashlib.sha256(sequence.encode()).hexdigest()
+
+
+def content_hash(pdb_text: str) -> str:
+    """SHA-256 of the PDB text itself: the address structures are served under."""
+    return hashlib.sha256(pdb_text.encode()).hexdigest()
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def summarize_structure(structure: PDBStructure) -> tuple[str, float | None]:
+    """
+    Return (sequence, mean pLDDT) from the CA atoms of a parsed structure.
+    ESMFold writes per-residue pLDDT into the B-factor column.
+    """
+    ca = structure.ca_indices()
+    sequence = "".join(THREE_TO_ONE.get(resname, "X") for resname in structure.resname[ca].tolist())
+    plddt_mean = float(structure.bfactor[ca].mean()) if len(ca) else None
+    return sequence, plddt_mean
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write `data` to `path` through a temp file unique to this call, so concurrent writers never share one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ShardedDirBackend:
+    """Compressed bodies in `<root>/<key[:2]>/<key[2:4]>/<key>.pdb<ext>`."""
+
+    name = "sharded"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str, codec: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.pdb{CODEC_EXTENSIONS[codec]}")
+
+    def read(self, key: str, codec: str) -> bytes | None:
+        try:
+            with open(self._path(key, codec), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, codec: str, body: bytes):
+        _atomic_write(self._path(key, codec), body)
+
+    def delete(self, key: str, codec: str):
+        try:
+            os.remove(self._path(key, codec))
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Compressed bodies as BLOBs in a single `<root>/structures.sqlite` file."""
+
+    name = "sqlite"
+
+    def __init__(self, root: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "structures.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bodies (key TEXT PRIMARY KEY, body BLOB NOT NULL)")
+        self._conn.commit()
+
+    def read(self, key: str, codec: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM bodies WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def write(self, key: str, codec: str, body: bytes):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO bodies (key, body) VALUES (?, ?)", (key, body))
+            self._conn.commit()
+
+    def delete(self, key: str, codec: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM bodies WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    ShardedDirBackend.name: ShardedDirBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+class StructureIndex:
+    """SQLite metadata index: one row per cached structure."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS structures (
+                key TEXT PRIMARY KEY,
+                sequence TEXT,
+                length INTEGER,
+                plddt_mean REAL,
+                codec TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS structures_last_hit ON structures (last_hit_at);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS similarity (key TEXT PRIMARY KEY, bands BLOB NOT NULL);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(structures)")}
+        if "content_hash" not in columns:
+            # Indexes created before structures were served by content hash
+            self._conn.execute("ALTER TABLE structures ADD COLUMN content_hash TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS structures_content ON structures (content_hash)")
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM structures WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        return dict(zip(columns, row)) if row else None
+
+    def upsert(self, key: str, sequence: str | None, length: int, plddt_mean: float | None,
+               codec: str, size_bytes: int, now: float, content_hash: str | None = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO structures (key, sequence, length, plddt_mean, codec, size_bytes, "
+                "created_at, last_hit_at, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, sequence, length, plddt_mean, codec, size_bytes, now, now, content_hash),
+            )
+            self._conn.commit()
+
+    def key_for_content(self, content_hash: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key FROM structures WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def missing_content_hash(self, limit: int) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT key FROM structures WHERE content_hash IS NULL LIMIT ?", (limit,)
+            )]
+
+    def set_content_hash(self, key: str, content_hash: str):
+        with self._lock:
+            self._conn.execute("UPDATE structures SET content_hash = ? WHERE key = ?", (content_hash, key))
+            self._conn.commit()
+
+    def touch(self, hits: dict[str, float]):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE structures SET last_hit_at = MAX(last_hit_at, ?) WHERE key = ?",
+                [(ts, key) for key, ts in hits.items()],
+            )
+            self._conn.commit()
+
+    def delete(self, keys: list[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM structures WHERE key = ?", [(k,) for k in keys])
+            self._conn.executemany("DELETE FROM similarity WHERE key = ?", [(k,) for k in keys])
+            self._conn.commit()
+
+    def sequences(self, keys: list[str]) -> dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, sequence FROM structures WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {key: sequence for key, sequence in rows if sequence}
+
+    def missing_similarity(self, limit: int) -> list[tuple[str, str | None]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.key, s.sequence FROM structures s LEFT JOIN similarity m ON m.key = s.key "
+                "WHERE m.key IS NULL LIMIT ?", (limit,)
+            ).fetchall()
+
+    def put_similarity(self, rows: list[tuple[str, bytes]]):
+        with self._lock:
+            # OR IGNORE keeps the rowid, which readers use to pick up new rows incrementally
+            self._conn.executemany("INSERT OR IGNORE INTO similarity (key, bands) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def similarity_since(self, rowid: int, limit: int) -> list[tuple[int, str, bytes]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT rowid, key, bands FROM similarity WHERE rowid > ? ORDER BY rowid LIMIT ?", (rowid, limit)
+            ).fetchall()
+
+    def clear_similarity(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM similarity")
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM structures").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM structures").fetchone()[0]
+
+    def expired(self, cutoff: float) -> list[tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, codec FROM structures WHERE last_hit_at < ?", (cutoff,)
+            ).fetchall()
+
+    def least_recent(self, limit: int) -> list[tuple[str, str, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, codec, size_bytes FROM structures ORDER BY last_hit_at LIMIT ?", (limit,)
+            ).fetchall()
+
+    def random_entries(self, n: int) -> list[dict]:
+        """Pick up to `n` distinct rows, avoiding a full-table ORDER BY RANDOM() on large indexes."""
+        with self._lock:
+            count, max_rowid = self._conn.execute("SELECT COUNT(*), MAX(rowid) FROM structures").fetchone()
+            if not count:
+                return []
+            if count <= RANDOM_SCAN_LIMIT:
+                rows = self._conn.execute(
+                    "SELECT key, sequence, length FROM structures ORDER BY RANDOM() LIMIT ?", (n,)
+                ).fetchall()
+                return [{"key": k, "sequence": seq, "length": length} for k, seq, length in rows]
+            picked = {}
+            for _ in range(n * 4):
+                if len(picked) >= n:
+                    break
+                row = self._conn.execute(
+                    "SELECT key, sequence, length FROM structures WHERE rowid >= ? LIMIT 1",
+                    (random.randint(1, max_rowid),),
+                ).fetchone()
+                if row:
+                    picked[row[0]] = {"key": row[0], "sequence": row[1], "length": row[2]}
+            return list(picked.values())
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StructureCache:
+    """
+    Read-through cache of folded structures keyed by sequence hash.
+
+    Bodies are compressed (zstd when installed, otherwise gzip) and stored
+    by a pluggable backend. A SQLite index keeps per-structure metadata
+    (length, mean pLDDT, size, created/last-hit time) that drives size- and
+    age-based eviction, and a small in-memory LRU serves hot structures.
+    With `binary`, each structure also gets an uncompressed .pstb file that
+    `get_structure` memory-maps instead of parsing the text. With
+    `similarity`, a MinHash index over the cached sequences answers
+    `nearest` (band hashes are stored in the index database, so other
+    processes sharing the cache pick up each other's structures).
+    """
+
+    def __init__(
+        self,
+        root: str = STRUCTURE_CACHE_DIR,
+        backend: str = STRUCTURE_CACHE_BACKEND,
+        codec: str = STRUCTURE_CACHE_CODEC,
+        lru_entries: int = STRUCTURE_CACHE_LRU_ENTRIES,
+        max_bytes: int = STRUCTURE_CACHE_MAX_BYTES,
+        max_age_days: float = STRUCTURE_CACHE_MAX_AGE_DAYS,
+        legacy_dir: str | None = LEGACY_PDB_DIR,
+        binary: bool = bool(STRUCTURE_CACHE_BINARY),
+        similarity: bool = bool(SIMILARITY_INDEX),
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown structure cache backend: {backend}")
+        if codec == "zstd" and zstandard is None:
+            codec = "gzip"
+        self.root = root
+        self.backend_name = backend
+        self.codec = codec
+        self.lru_entries = lru_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.legacy_dir = legacy_dir
+        self.binary = binary
+        self.hasher = MinHasher() if similarity else None
+
+        self.backend = None
+        self.index = None
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self._pending_hits: dict[str, float] = {}
+        # Guards the LRU and pending hits, which worker threads also touch during eviction
+        self._mem_lock = threading.Lock()
+        # Serializes puts and eviction (worker threads): the previous-entry lookup, the writes and _total_bytes
+        self._write_lock = threading.Lock()
+        self._total_bytes = 0
+        self._puts_since_evict = 0
+        self._open_lock = threading.Lock()
+        self.sequence_index = SequenceIndex(self.hasher.bands) if similarity else None
+        self._similarity_rowid = 0
+        self._similarity_synced_at = 0.0
+        self._similarity_lock = threading.Lock()
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def open(self):
+        """Create the store, import legacy flat files once and run eviction."""
+        with self._open_lock:
+            if self.index is not None:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            self.index = StructureIndex(os.path.join(self.root, "index.sqlite"))
+            self.backend = BACKENDS[self.backend_name](self.root)
+            self._total_bytes = self.index.total_bytes()
+        self._import_legacy()
+        self._backfill_content_hashes()
+        self._backfill_similarity()
+        self._evict()
+        print(f"Structure cache ready: {self.index.count()} entries, backend={self.backend_name}, codec={self.codec}")
+
+    async def start(self):
+        await asyncio.to_thread(self.open)
+
+    def close(self):
+        if self.index is None:
+            return
+        self._flush_hits()
+        self.backend.close()
+        self.index.close()
+        self.index = None
+
+    def _import_legacy(self):
+        """Index the flat `<sha256>.pdb` files of the old pdb_data/ layout (one-off)."""
+        if not self.legacy_dir or not os.path.isdir(self.legacy_dir):
+            return
+        marker = f"legacy_imported:{os.path.abspath(self.legacy_dir)}"
+        if self.index.get_meta(marker):
+            return
+        imported = 0
+        with os.scandir(self.legacy_dir) as entries:
+            for entry in entries:
+                key, ext = os.path.splitext(entry.name)
+                if ext != ".pdb" or len(key) != 64 or self.index.get(key):
+                    continue
+                with open(entry.path, "r") as f:
+                    self._put_sync(key, f.read(), sequence=None)
+                imported += 1
+        self.index.set_meta(marker, str(time.time()))
+        print(f"Imported {imported} legacy PDB files from {self.legacy_dir}")
+
+    def _backfill_content_hashes(self):
+        """Give entries cached before content addressing their hash (one-off)."""
+        filled = 0
+        while True:
+            keys = self.index.missing_content_hash(256)
+            if not keys:
+                break
+            for key in keys:
+                pdb_text = self._get_sync(key)
+                if pdb_text is not None:
+                    self.index.set_content_hash(key, content_hash(pdb_text))
+                    filled += 1
+        if filled:
+            print(f"Indexed content hashes of {filled} cached structures")
+
+    def _band_row(self, key: str, sequence: str | None) -> tuple[str, bytes]:
+        band_hashes = self.hasher.band_hashes(sequence) if sequence else None
+        # An empty row marks a sequence without k-mers, so it is not hashed again
+        return key, band_hashes.tobytes() if band_hashes is not None else b""
+
+    def _backfill_similarity(self):
+        """Hash the sequences cached before the similarity index (or its parameters) existed, then load it."""
+        if self.hasher is None:
+            return
+        if self.index.get_meta("similarity_params") != self.hasher.params:
+            self.index.clear_similarity()
+            self.index.set_meta("similarity_params", self.hasher.params)
+        hashed = 0
+        while rows := self.index.missing_similarity(1024):
+            self.index.put_similarity([self._band_row(key, sequence) for key, sequence in rows])
+            hashed += len(rows)
+        if hashed:
+            print(f"Hashed {hashed} cached sequences for the similarity index")
+        self._refresh_similarity()
+
+    def _refresh_similarity(self):
+        """Load similarity rows added since the last refresh (by this or another process)."""
+        with self._similarity_lock:
+            keys, band_hashes = [], []
+            while rows := self.index.similarity_since(self._similarity_rowid, 10000):
+                for _, key, bands in rows:
+                    if bands:
+                        keys.append(key)
+                        band_hashes.append(np.frombuffer(bands, dtype=np.uint32))
+                self._similarity_rowid = rows[-1][0]
+            if len(keys) >= self.sequence_index.merge_every:
+                self.sequence_index.add_many(keys, np.array(band_hashes))
+            else:
+                for key, row in zip(keys, band_hashes):
+                    self.sequence_index.add(key, row)
+            self._similarity_synced_at = time.monotonic()
+
+    def _nearest_sync(self, sequence: str, limit: int, exclude_key: str | None) -> list[dict]:
+        if time.monotonic() - self._similarity_synced_at > SIMILARITY_REFRESH_SECONDS:
+            self._refresh_similarity()
+        band_hashes = self.hasher.band_hashes(sequence)
+        if band_hashes is None:
+            return []
+        candidates = [key for key, _ in self.sequence_index.candidates(band_hashes, limit * CANDIDATES_PER_NEIGHBOUR)
+                      if key != exclude_key]
+        if not candidates:
+            return []
+        # Evicted entries have no row any more and drop out here
+        sequences = self.index.sequences(candidates)
+        query = encode_residues(sequence)
+        neighbours = [{"key": key, "identity": round(sequence_identity(query, known), 4)}
+                      for key, known in sequences.items()]
+        neighbours.sort(key=lambda n: n["identity"], reverse=True)
+        return neighbours[:limit]
+
+    # ---------------------------
+    # LRU front
+    # ---------------------------
+    def _lru_get(self, key: str) -> str | None:
+        with self._mem_lock:
+            pdb_text = self._lru.get(key)
+            if pdb_text is not None:
+                self._lru.move_to_end(key)
+        return pdb_text
+
+    def _lru_put(self, key: str, pdb_text: str):
+        if self.lru_entries <= 0:
+            return
+        with self._mem_lock:
+            self._lru[key] = pdb_text
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_entries:
+                self._lru.popitem(last=False)
+
+    def _record_hit(self, key: str):
+        with self._mem_lock:
+            self._pending_hits[key] = time.time()
+            flush = len(self._pending_hits) >= HIT_FLUSH_EVERY
+        if flush:
+            self._flush_hits()
+
+    def _flush_hits(self):
+        with self._mem_lock:
+            hits, self._pending_hits = self._pending_hits, {}
+        if hits and self.index is not None:
+            self.index.touch(hits)
+
+    # ---------------------------
+    # Synchronous core (run in worker threads)
+    # ---------------------------
+    def _get_sync(self, key: str) -> str | None:
+        row = self.index.get(key)
+        if row is None:
+            return None
+        body = self.backend.read(key, row["codec"])
+        if body is None:
+            # Body vanished underneath the index; drop the stale row
+            self.index.delete([key])
+            return None
+        return decompress(body, row["codec"]).decode()
+
+    def _binary_path(self, key: str) -> str:
+        return os.path.join(self.root, "binary", key[:2], f"{key}.pstb")
+
+    def _encode_binary(self, key: str, pdb_text: str) -> bytes | None:
+        """The .pstb form of a structure, or None if the text cannot be encoded."""
+        try:
+            return encode_binary(pdb_text)
+        except ValueError as e:
+            print(f"❌ Binary structure for {key} skipped: {e}")
+            return None
+
+    def _write_binary(self, key: str, data: bytes) -> int:
+        """Write the .pstb file for a structure; returns its size."""
+        path = self._binary_path(key)
+        try:
+            _atomic_write(path, data)
+        except OSError as e:
+            if not os.path.exists(path):
+                raise
+            # Another writer (thread or process) got there first; its file is identical
+            print(f"📌 Binary structure for {key} written concurrently, keeping it: {e}")
+        return len(data)
+
+    def _put_sync(self, key: str, pdb_text: str, sequence: str | None):
+        # One text parse per put: the summary comes from the binary form when there is one
+        binary = self._encode_binary(key, pdb_text) if self.binary else None
+        structure = decode_binary(binary).to_structure() if binary is not None else parse_pdb(pdb_text)
+        derived_sequence, plddt_mean = summarize_structure(structure)
+        body = compress(pdb_text.encode(), self.codec)
+        sequence = sequence or derived_sequence
+        with self._write_lock:
+            # Read under the lock, so two puts of one key cannot both count it as new
+            previous = self.index.get(key)
+            self.backend.write(key, self.codec, body)
+            size = len(body) + (self._write_binary(key, binary) if binary is not None else 0)
+            if previous is not None:
+                self._total_bytes -= previous["size_bytes"]
+                if previous["codec"] != self.codec:
+                    self.backend.delete(key, previous["codec"])
+            self.index.upsert(key, sequence, len(derived_sequence), plddt_mean, self.codec, size, time.time(),
+                              content_hash(pdb_text))
+            self._total_bytes += size
+        if self.hasher is not None and previous is None:
+            self.index.put_similarity([self._band_row(key, sequence)])
+            if self._similarity_synced_at:  # loaded already; otherwise open() loads everything
+                self._refresh_similarity()
+
+    def _structure_sync(self, key: str) -> PDBStructure | None:
+        path = self._binary_path(key)
+        if not os.path.exists(path):
+            # Entries cached before binary files existed get one on first use
+            pdb_text = self._get_sync(key)
+            binary = self._encode_binary(key, pdb_text) if pdb_text is not None else None
+            if binary is None:
+                return None
+            self._write_binary(key, binary)
+        return load_binary(path).to_structure()
+
+    def _remove_sync(self, entries: list[tuple[str, str]]):
+        for key, codec in entries:
+            self.backend.delete(key, codec)
+            try:
+                os.remove(self._binary_path(key))
+            except FileNotFoundError:
+                pass
+            with self._mem_lock:
+                self._lru.pop(key, None)
+                self._pending_hits.pop(key, None)
+        self.index.delete([key for key, _ in entries])
+
+    def _evict(self) -> int:
+        """Drop entries older than max_age, then least-recently-hit ones above max_bytes."""
+        self._flush_hits()
+        with self._write_lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        removed = 0
+        if self.max_age > 0:
+            expired = self.index.expired(time.time() - self.max_age)
+            if expired:
+                self._remove_sync(expired)
+                removed += len(expired)
+                self._total_bytes = self.index.total_bytes()
+        while self.max_bytes > 0 and self._total_bytes > self.max_bytes:
+            victims = []
+            excess = self._total_bytes - self.max_bytes
+            for key, codec, size in self.index.least_recent(256):
+                victims.append((key, codec))
+                excess -= size
+                if excess <= 0:
+                    break
+            if not victims:
+                break
+            self._remove_sync(victims)
+            removed += len(victims)
+            self._total_bytes = self.index.total_bytes()
+        if removed:
+            print(f"Structure cache evicted {removed} entries")
+        return removed
+
+    # ---------------------------
+    # Async API
+    # ---------------------------
+    async def get(self, key: str) -> str | None:
+        """Return the cached PDB text for `key`, or None on a miss."""
+        if self.index is None:
+            await self.start()
+        pdb_text = self._lru_get(key)
+        if pdb_text is None:
+            pdb_text = await asyncio.to_thread(self._get_sync, key)
+            if pdb_text is None:
+                return None
+            self._lru_put(key, pdb_text)
+        self._record_hit(key)
+        return pdb_text
+
+    async def put(self, key: str, pdb_text: str, sequence: str | None = None):
+        """Store a structure and evict if the cache is over budget."""
+        if self.index is None:
+            await self.start()
+        await asyncio.to_thread(self._put_sync, key, pdb_text, sequence)
+        self._lru_put(key, pdb_text)
+        self._puts_since_evict += 1
+        over_budget = self.max_bytes > 0 and self._total_bytes > self.max_bytes
+        if over_budget or self._puts_since_evict >= EVICT_EVERY:
+            self._puts_since_evict = 0
+            await asyncio.to_thread(self._evict)
+
+    async def get_by_content(self, content_hash: str) -> str | None:
+        """PDB text whose SHA-256 is `content_hash`, or None if no cached structure has it."""
+        if self.index is None:
+            await self.start()
+        key = await asyncio.to_thread(self.index.key_for_content, content_hash)
+        if key is None:
+            return None
+        return await self.get(key)
+
+    async def get_structure(self, key: str) -> PDBStructure | None:
+        """
+        The parsed first model of a cached structure, memory-mapped from its
+        .pstb file (no text parsing); None on a miss or with binary files off.
+        """
+        if not self.binary:
+            return None
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self._structure_sync, key)
+
+    async def contains(self, key: str) -> bool:
+        with self._mem_lock:
+            if key in self._lru:
+                return True
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self.index.get, key) is not None
+
+    async def metadata(self, key: str) -> dict | None:
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self.index.get, key)
+
+    async def nearest(self, sequence: str, limit: int = 1, exclude_key: str | None = None) -> list[dict]:
+        """
+        Up to `limit` cached sequences most similar to `sequence`, as
+        {"key", "identity"} with the best first ([] without a similarity index).
+        """
+        if self.hasher is None:
+            return []
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self._nearest_sync, sequence, limit, exclude_key)
+
+    def similarity_stats(self) -> dict | None:
+        if self.sequence_index is None:
+            return None
+        return {"sequences": len(self.sequence_index), "bytes": self.sequence_index.nbytes,
+                "params": self.hasher.params}
+
+    async def random_entries(self, n: int) -> list[dict]:
+        """Up to `n` random index rows (key, sequence, length)."""
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self.index.random_entries, n)
+
+    async def evict(self) -> int:
+        if self.index is None:
+            await self.start()
+        return await asyncio.to_thread(self._evict)
+
+
+# Global instance
+structure_cache = StructureCache()
@@ -0,0 +1,120 @@
+"""
+Content-addressed structure delivery for GET /structure/{hash}.
+
+A structure's address is the SHA-256 of its PDB text, so a response never
+changes for a given URL: it carries a strong ETag and a long immutable
+Cache-Control, and a client that already has it gets a 304 without the
+server touching the cache. Bodies are compressed once per encoding (brotli
+when installed and accepted, else gzip) and kept in a small LRU, which
+design responses seed with the structures they reference.
+"""
+import asyncio
+import gzip
+from collections import OrderedDict
+
+from config import STRUCTURE_DELIVERY_CACHE_ENTRIES, STRUCTURE_DELIVERY_MAX_AGE
+from structure_cache import content_hash, structure_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODERS = {"gzip": lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=5)
+# Server preference when the client accepts several equally
+PREFERENCE = ("br", "gzip", "identity")
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str:
+    """Best supported encoding the Accept-Encoding header allows ("identity" if none)."""
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    wildcard = weights.get("*")
+    best, best_q = "identity", 0.0
+    for coding in PREFERENCE:
+        if coding != "identity" and coding not in ENCODERS:
+            continue
+        # An unlisted identity stays the fallback, but never outranks an accepted compression
+        q = weights.get(coding, wildcard if wildcard is not None else 0.0)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, digest: str) -> bool:
+    """If-None-Match (weak comparison, as RFC 9110 requires for it) against this hash."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag(digest) for tag in tags)
+
+
+def cache_headers(digest: str) -> dict:
+    return {
+        "ETag": etag(digest),
+        "Cache-Control": f"public, max-age={STRUCTURE_DELIVERY_MAX_AGE}, immutable",
+        "Vary": "Accept-Encoding",
+    }
+
+
+class StructureBodies:
+    """LRU of PDB bodies by content hash, each with its encodings computed on demand."""
+
+    def __init__(self, max_entries: int = STRUCTURE_DELIVERY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, bytes]] = OrderedDict()
+
+    def remember(self, pdb_text: str) -> str:
+        """Content hash of `pdb_text`, keeping the text at hand for the GET that usually follows."""
+        digest = content_hash(pdb_text)
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+        else:
+            self._store(digest, pdb_text.encode())
+        return digest
+
+    def _store(self, digest: str, data: bytes) -> dict[str, bytes]:
+        entry = self._entries[digest] = {"identity": data}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def body(self, digest: str, encoding: str) -> bytes | None:
+        """The structure with this hash in `encoding`, or None if it is not cached."""
+        entry = self._entries.get(digest)
+        if entry is None:
+            pdb_text = await structure_cache.get_by_content(digest)
+            if pdb_text is None:
+                return None
+            entry = self._store(digest, pdb_text.encode())
+        else:
+            self._entries.move_to_end(digest)
+        if encoding not in entry:
+            entry[encoding] = await asyncio.to_thread(ENCODERS[encoding], entry["identity"])
+        return entry[encoding]
+
+
+def structure_ref(digest: str) -> dict:
+    return {"hash": digest, "url": f"/structure/{digest}"}
+
+
+# Global instance
+structure_bodies = StructureBodies()
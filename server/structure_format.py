@@ -0,0 +1,203 @@
+"""
+Compact binary structure format (.pstb), lossless against the PDB text.
+
+Layout: a 4-byte magic, a 4-byte version, a 4-byte header length, a JSON
+header, then 8-byte aligned little-endian arrays:
+
+- coords (n, 3) float32, occupancy and bfactor (pLDDT) (n,) float32
+- serial and resseq (n,) int32
+- template (n,) uint16: the atom line with its numeric columns blanked
+
+Atom, residue, chain and element fields are decoded once per template
+(a few hundred per structure), so loading needs no text parsing and the
+arrays are zero-copy views of a memory-mapped file. Every other line
+(headers, TER, MODEL/ENDMDL, END) is kept verbatim with its position; an
+atom line that does not re-render byte for byte from its template is
+stored as a verbatim template, so `to_pdb()` always returns the original.
+"""
+import json
+import struct
+
+import numpy as np
+
+from pdb_parser import LINE_WIDTH, PDBStructure, _text, parse_pdb
+
+MAGIC = b"PSTB"
+VERSION = 1
+ALIGN = 8
+PREAMBLE = struct.Struct("<4sII")
+
+# Numeric columns blanked in templates: serial, resseq, and x through bfactor
+_BLANKS = ((6, 11), (22, 26), (30, 66))
+
+ARRAYS = {
+    "coords": (np.float32, 3),
+    "occupancy": (np.float32, 1),
+    "bfactor": (np.float32, 1),
+    "serial": (np.int32, 1),
+    "resseq": (np.int32, 1),
+    "template": (np.uint16, 1),
+}
+
+
+def _blank(line: str) -> str:
+    for start, end in _BLANKS:
+        line = line[:start] + " " * (end - start) + line[end:]
+    return line
+
+
+def _render(template: str, serial: int, resseq: int, x: float, y: float, z: float,
+            occupancy: float, bfactor: float) -> str:
+    return (
+        f"{template[:6]}{serial:5d}{template[11:22]}{resseq:4d}{template[26:30]}"
+        f"{x:8.3f}{y:8.3f}{z:8.3f}{occupancy:6.2f}{bfactor:6.2f}{template[66:]}"
+    )
+
+
+def encode(pdb_text: str) -> bytes:
+    """Binary form of a PDB text (every model; non-atom lines kept verbatim)."""
+    lines = pdb_text.split("\n")
+    atom_lines = []
+    others = []
+    first_model_atoms = None
+    for i, line in enumerate(lines):
+        if line.startswith(("ATOM  ", "HETATM")):
+            atom_lines.append(line)
+            continue
+        if line.startswith("ENDMDL") and first_model_atoms is None:
+            first_model_atoms = len(atom_lines)
+        others.append([i, line])
+
+    parsed = parse_pdb("\n".join(atom_lines))
+    values = zip(parsed.serial.tolist(), parsed.resseq.tolist(), parsed.coords.tolist(),
+                 parsed.occupancy.tolist(), parsed.bfactor.tolist())
+
+    templates: list[str] = []
+    verbatim: list[int] = []
+    index: dict[str, int] = {}
+    template_ids = np.zeros(len(atom_lines), dtype=np.uint16)
+    for i, (line, (serial, resseq, (x, y, z), occupancy, bfactor)) in enumerate(zip(atom_lines, values)):
+        template = _blank(line)
+        if len(line) < 66 or _render(template, serial, resseq, x, y, z, occupancy, bfactor) != line:
+            # Non-standard columns: this line is its own template, rendered as is
+            verbatim.append(len(templates))
+            template_ids[i] = len(templates)
+            templates.append(line)
+            continue
+        if template not in index:
+            index[template] = len(templates)
+            templates.append(template)
+        template_ids[i] = index[template]
+    if len(templates) > np.iinfo(np.uint16).max:
+        raise ValueError("Too many distinct atom templates for the binary format")
+
+    arrays = {
+        "coords": parsed.coords,
+        "occupancy": parsed.occupancy,
+        "bfactor": parsed.bfactor,
+        "serial": parsed.serial,
+        "resseq": parsed.resseq,
+        "template": template_ids,
+    }
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = offset
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({
+        "atoms": len(atom_lines),
+        "first_model_atoms": len(atom_lines) if first_model_atoms is None else first_model_atoms,
+        "lines": len(lines),
+        "templates": templates,
+        "verbatim": verbatim,
+        "others": others,
+        "offsets": layout,
+    }, separators=(",", ":")).encode()
+    header += b" " * (-(PREAMBLE.size + len(header)) % ALIGN)
+
+    body = bytearray(offset)
+    for name, array in arrays.items():
+        data = np.ascontiguousarray(array, dtype=np.dtype(ARRAYS[name][0]).newbyteorder("<")).tobytes()
+        body[layout[name]:layout[name] + len(data)] = data
+    return PREAMBLE.pack(MAGIC, VERSION, len(header)) + header + bytes(body)
+
+
+class BinaryStructure:
+    """A decoded .pstb buffer; arrays are views of the buffer (no copies)."""
+
+    def __init__(self, buffer):
+        magic, version, header_length = PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} binary structure")
+        start = PREAMBLE.size
+        self.header = json.loads(bytes(buffer[start:start + header_length]))
+        base = start + header_length
+        n = self.header["atoms"]
+        self.arrays = {}
+        for name, (dtype, width) in ARRAYS.items():
+            array = np.frombuffer(buffer, dtype=np.dtype(dtype).newbyteorder("<"), count=n * width,
+                                  offset=base + self.header["offsets"][name])
+            self.arrays[name] = array.reshape(n, 3) if width == 3 else array
+
+    @property
+    def atom_count(self) -> int:
+        return self.header["atoms"]
+
+    def to_structure(self) -> PDBStructure:
+        """The first model as a parsed structure (same fields as `parse_pdb`)."""
+        n = self.header["first_model_atoms"]
+        templates = [t[:LINE_WIDTH].ljust(LINE_WIDTH) for t in self.header["templates"]]
+        table = np.frombuffer("".join(templates).encode("ascii", "replace"), dtype=np.uint8)
+        table = table.reshape(len(templates), LINE_WIDTH)
+        ids = self.arrays["template"][:n]
+
+        atom_name = _text(table, 12, 16)
+        element = _text(table, 76, 78)
+        missing = element == ""
+        if missing.any():
+            element[missing] = np.char.lstrip(atom_name[missing], "0123456789").astype("U1")
+
+        return PDBStructure(
+            coords=self.arrays["coords"][:n],
+            hetatm=(table[:, 0] == ord("H"))[ids],
+            serial=self.arrays["serial"][:n],
+            atom_name=atom_name[ids],
+            altloc=_text(table, 16, 17)[ids],
+            resname=_text(table, 17, 20)[ids],
+            chain=_text(table, 21, 22)[ids],
+            resseq=self.arrays["resseq"][:n],
+            icode=_text(table, 26, 27)[ids],
+            occupancy=self.arrays["occupancy"][:n],
+            bfactor=self.arrays["bfactor"][:n],
+            element=element[ids],
+        )
+
+    def to_pdb(self) -> str:
+        """The original PDB text, byte for byte."""
+        header = self.header
+        templates = header["templates"]
+        verbatim = set(header["verbatim"])
+        lines: list[str | None] = [None] * header["lines"]
+        for i, line in header["others"]:
+            lines[i] = line
+
+        a = self.arrays
+        atoms = zip(a["template"].tolist(), a["serial"].tolist(), a["resseq"].tolist(), a["coords"].tolist(),
+                    a["occupancy"].tolist(), a["bfactor"].tolist())
+        slot = 0
+        for template_id, serial, resseq, (x, y, z), occupancy, bfactor in atoms:
+            while lines[slot] is not None:
+                slot += 1
+            template = templates[template_id]
+            lines[slot] = template if template_id in verbatim else _render(
+                template, serial, resseq, x, y, z, occupancy, bfactor)
+        return "\n".join(lines)
+
+
+def decode(data: bytes) -> BinaryStructure:
+    return BinaryStructure(data)
+
+
+def load(path: str) -> BinaryStructure:
+    """Memory-map a .pstb file; arrays are read lazily from the page cache."""
+    return BinaryStructure(np.memmap(path, dtype=np.uint8, mode="r"))
@@ -0,0 +1,68 @@
+import asyncio
+import random
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiohttp")
+
+import design_search
+from config import GEN_MAX_ROUNDS
+from design_search import DesignSearch, SearchBudget, SearchTarget
+
+REFERENCE = "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQ"
+
+
+def test_stops_when_every_sample_is_rejected(monkeypatch):
+    rounds = []
+
+    async def prompt_echo(loader, fold_sequence, num_return_sequences, sampling):
+        rounds.append(num_return_sequences)
+        return [REFERENCE] * num_return_sequences
+
+    async def never_called(*args, **kwargs):
+        raise AssertionError("a rejected sample was folded")
+
+    monkeypatch.setattr(design_search, "generate_biosimilars_async", prompt_echo)
+    monkeypatch.setattr(design_search, "process_candidate", never_called)
+
+    # Only a fold budget: fold calls never increase, so nothing else would stop the search
+    search = DesignSearch(REFERENCE, "PDB", SearchTarget(count=1), SearchBudget(max_fold_calls=8, max_seconds=0))
+    result = asyncio.run(search.run())
+
+    assert result["stop_reason"] == "no_candidates"
+    assert result["rounds"] == len(rounds) == GEN_MAX_ROUNDS
+    assert result["fold_calls"] == 0
+    assert sum(result["rejected"].values()) == result["generated"]
+
+
+def test_reused_and_shared_folds_are_not_fold_calls(monkeypatch):
+    rng = random.Random(0)
+
+    async def mutants(loader, fold_sequence, num_return_sequences, sampling):
+        out = []
+        for _ in range(num_return_sequences):
+            residues = list(REFERENCE)
+            for position in rng.sample(range(len(residues)), 3):
+                residues[position] = "A" if residues[position] != "A" else "G"
+            out.append("".join(residues))
+        return out
+
+    async def reused(i, sequence, original_pdb, original_key):
+        return {"index": i, "sequence": sequence, "pdb_data": "PDB", "structure_key": "relative",
+                "reused_from": "relative", "tm_score": 0.9, "description": ""}
+
+    async def not_cached(key):
+        return False
+
+    monkeypatch.setattr(design_search, "generate_biosimilars_async", mutants)
+    monkeypatch.setattr(design_search, "process_candidate", reused)
+    monkeypatch.setattr(design_search.structure_cache, "contains", not_cached)
+
+    search = DesignSearch(REFERENCE, "PDB", SearchTarget(count=3, min_tm_score=0.5),
+                          SearchBudget(max_fold_calls=1, max_seconds=0))
+    result = asyncio.run(search.run())
+
+    assert result["stop_reason"] == "target_met"
+    assert result["fold_calls"] == 0
+    assert result["cached_folds"] == len(result["candidates"]) >= 3
@@ -0,0 +1,128 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+
+from fold_backends import RemoteESMAtlasBackend
+from http_client import PooledHTTPClient, SingleFlight, http_client
+
+PDB = "ATOM      1  CA  MET A   1      11.104   6.134  -6.504  1.00 90.00           C\nEND\n"
+
+
+@asynccontextmanager
+async def upstream(statuses=(), delay: float = 0.0):
+    """Local stand-in for the fold API: answers with `statuses` in turn, then 200 with a PDB."""
+    calls = []
+    statuses = list(statuses)
+
+    async def fold(request):
+        calls.append(await request.text())
+        await asyncio.sleep(delay)
+        if statuses:
+            return web.Response(status=statuses.pop(0), headers={"Retry-After": "0"})
+        return web.Response(text=PDB)
+
+    app = web.Application()
+    app.router.add_post("/", fold)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}/", calls
+    finally:
+        await runner.cleanup()
+
+
+def _client() -> PooledHTTPClient:
+    return PooledHTTPClient(max_retries=3, backoff_base=0.001, backoff_max=0.01)
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_rate_limited_and_unavailable(status):
+    async def run():
+        client = _client()
+        async with upstream([status, status]) as (url, calls):
+            try:
+                result = await client.post_text(url, "MKT")
+            finally:
+                await client.close()
+        return result, calls
+
+    (status_code, body), calls = asyncio.run(run())
+    assert status_code == 200
+    assert body == PDB
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_retries():
+    async def run():
+        client = _client()
+        async with upstream([503] * 10) as (url, calls):
+            try:
+                result = await client.post_text(url, "MKT")
+            finally:
+                await client.close()
+        return result, calls
+
+    result, calls = asyncio.run(run())
+    assert result == (503, None)
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize("status", [400, 404, 422])
+def test_client_errors_are_not_retried(status):
+    async def run():
+        client = _client()
+        async with upstream([status]) as (url, calls):
+            try:
+                result = await client.post_text(url, "MKT")
+            finally:
+                await client.close()
+        return result, calls
+
+    result, calls = asyncio.run(run())
+    assert result == (status, None)
+    assert len(calls) == 1
+
+
+def test_concurrent_identical_folds_share_one_upstream_call():
+    async def run():
+        flights = SingleFlight()
+        async with upstream(delay=0.05) as (url, calls):
+            backend = RemoteESMAtlasBackend(url=url, rate_limited=False)
+            try:
+                results = await asyncio.gather(*(
+                    flights.do("MKT", lambda: backend.fold("MKT")) for _ in range(10)
+                ))
+            finally:
+                await http_client.close()
+        return results, calls, len(flights)
+
+    results, calls, inflight = asyncio.run(run())
+    assert calls == ["MKT"]
+    assert results == [(True, PDB)] * 10
+    assert inflight == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_fold():
+    async def run():
+        flights = SingleFlight()
+        async with upstream(delay=0.05) as (url, calls):
+            backend = RemoteESMAtlasBackend(url=url, rate_limited=False)
+            try:
+                first = asyncio.ensure_future(flights.do("MKT", lambda: backend.fold("MKT")))
+                second = asyncio.ensure_future(flights.do("MKT", lambda: backend.fold("MKT")))
+                await asyncio.sleep(0.01)
+                first.cancel()
+                result = await second
+            finally:
+                await http_client.close()
+        return first, result, calls
+
+    first, result, calls = asyncio.run(run())
+    assert first.cancelled()
+    assert result == (True, PDB)
+    assert calls == ["MKT"]
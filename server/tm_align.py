@@ -0,0 +1,331 @@
+"""
+Pure NumPy TM-score / TM-align engine working on CA coordinate arrays.
+
+Follows the structure of TM-align (Zhang & Skolnick, 2005):
+initial alignments from gapless threading and secondary-structure DP,
+iterative refinement by superposition + Needleman-Wunsch DP on the
+TM-score matrix, and a final TM-score search over fragment seeds. The
+Kabsch superpositions and the DP recurrences are vectorized, and
+everything runs in-process on (L, 3) float arrays.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pdb_parser import parse_pdb
+
+# Refinement settings, as in TM-align
+GAP_OPENS = (-0.6, 0.0)
+MAX_DP_ITERATIONS = 30
+MAX_SEARCH_ITERATIONS = 20
+SEARCH_STEP = 40  # fragment stride during refinement; the final search uses every start
+
+
+@dataclass
+class TMAlignResult:
+    tm_score_a: float  # normalized by the length of structure a
+    tm_score_b: float  # normalized by the length of structure b
+    rmsd: float
+    n_aligned: int
+    # Aligned (index in a, index in b) pairs
+    alignment: list[tuple[int, int]] = field(default_factory=list)
+
+
+def read_ca_coords(pdb_text: str) -> np.ndarray:
+    """CA coordinates of the first model, one per residue (first altloc wins)."""
+    return parse_pdb(pdb_text).ca_coords().astype(np.float64)
+
+
+def d0_for_length(length: int) -> float:
+    """TM-score distance scale d0(L)."""
+    if length <= 21:
+        return 0.5
+    return max(0.5, 1.24 * np.cbrt(length - 15) - 1.8)
+
+
+def _d0_search(d0: float) -> float:
+    return min(max(d0, 4.5), 8.0)
+
+
+# ---------------------------
+# Superposition
+# ---------------------------
+def kabsch_batch(x: np.ndarray, y: np.ndarray, w: np.ndarray | None = None):
+    """
+    Weighted Kabsch superposition for a batch of point sets.
+
+    x, y: (k, n, 3); w: (k, n) weights or None.
+    Returns rotations (k, 3, 3) and translations (k, 3) with R @ x + t ~= y.
+    """
+    if w is None:
+        w = np.ones(x.shape[:2])
+    w_sum = np.maximum(w.sum(axis=1, keepdims=True), 1e-12)
+    cx = (w[..., None] * x).sum(axis=1) / w_sum
+    cy = (w[..., None] * y).sum(axis=1) / w_sum
+    xc = x - cx[:, None, :]
+    yc = y - cy[:, None, :]
+    h = (w[..., None] * xc).transpose(0, 2, 1) @ yc
+    u, _, vt = np.linalg.svd(h)
+    v = vt.transpose(0, 2, 1)
+    ut = u.transpose(0, 2, 1)
+    d = np.sign(np.linalg.det(v @ ut))
+    d[d == 0] = 1.0
+    v[:, :, 2] *= d[:, None]
+    rot = v @ ut
+    trans = cy - (rot @ cx[..., None])[..., 0]
+    return rot, trans
+
+
+def _apply(rot: np.ndarray, trans: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Apply one transform (3, 3), (3,) to points (n, 3)."""
+    return x @ rot.T + trans
+
+
+# ---------------------------
+# TM-score search on a fixed alignment
+# ---------------------------
+def tm_score_search(x: np.ndarray, y: np.ndarray, l_norm: int, d0: float, step: int = 1):
+    """
+    Best TM-score of aligned pairs x[i] <-> y[i] over superpositions seeded
+    from fragments of decreasing length, each extended iteratively to the
+    pairs within d0_search. All seeds of one length are refined as a batch.
+
+    Returns (tm_score, rotation, translation).
+    """
+    n = len(x)
+    if n == 0:
+        return 0.0, np.eye(3), np.zeros(3)
+    d0_search = _d0_search(d0)
+    min_len = min(4, n)
+    lengths = []
+    length = n
+    while length > min_len and len(lengths) < 6:
+        lengths.append(length)
+        length //= 2
+    lengths.append(min_len)
+
+    best = (-1.0, np.eye(3), np.zeros(3))
+    for length in dict.fromkeys(lengths):
+        starts = list(range(0, n - length + 1, step))
+        if starts[-1] != n - length:
+            starts.append(n - length)
+        starts = np.asarray(starts)
+        k = len(starts)
+
+        # Seed superposition on each fragment
+        weights = np.zeros((k, n))
+        weights[np.arange(k)[:, None], starts[:, None] + np.arange(length)] = 1.0
+
+        for _ in range(MAX_SEARCH_ITERATIONS):
+            k = len(weights)
+            rot, trans = kabsch_batch(np.broadcast_to(x, (k, n, 3)), np.broadcast_to(y, (k, n, 3)), weights)
+            moved = x @ rot.transpose(0, 2, 1) + trans[:, None, :]
+            dist = np.sqrt(((moved - y) ** 2).sum(axis=2))
+            scores = (1.0 / (1.0 + (dist / d0) ** 2)).sum(axis=1) / l_norm
+
+            top = int(np.argmax(scores))
+            if scores[top] > best[0]:
+                best = (float(scores[top]), rot[top], trans[top])
+
+            # Extend to pairs within d0_search, keeping at least 3 pairs per seed
+            third = np.partition(dist, min(2, n - 1), axis=1)[:, min(2, n - 1)]
+            cutoff = np.maximum(d0_search, third)
+            new_weights = (dist <= cutoff[:, None]).astype(float)
+
+            # Only seeds whose pair set changed need another round; merge seeds that converged together
+            active = np.any(new_weights != weights, axis=1)
+            if not active.any():
+                break
+            changed = new_weights[active]
+            packed = np.packbits(changed.astype(bool), axis=1)
+            _, first = np.unique(packed.view(np.dtype((np.void, packed.shape[1]))).ravel(), return_index=True)
+            weights = changed[first]
+    return best
+
+
+# ---------------------------
+# Dynamic programming
+# ---------------------------
+def nw_align(score: np.ndarray, gap_open: float) -> np.ndarray:
+    """
+    TM-align style Needleman-Wunsch on a (La, Lb) score matrix: free end
+    gaps and a gap-open penalty only when leaving a diagonal step. Cells on
+    each anti-diagonal are filled together.
+
+    Returns invmap: for every residue j of b, the aligned residue of a or -1.
+    """
+    la, lb = score.shape
+    val = np.zeros((la + 1, lb + 1))
+    diag = np.zeros((la + 1, lb + 1), dtype=bool)
+    move = np.zeros((la + 1, lb + 1), dtype=np.int8)  # 0 diagonal, 1 up (i-1), 2 left (j-1)
+
+    for s in range(2, la + lb + 1):
+        i = np.arange(max(1, s - lb), min(la, s - 1) + 1)
+        j = s - i
+        d = val[i - 1, j - 1] + score[i - 1, j - 1]
+        h = val[i - 1, j] + np.where(diag[i - 1, j], gap_open, 0.0)
+        v = val[i, j - 1] + np.where(diag[i, j - 1], gap_open, 0.0)
+        take_diag = (d >= h) & (d >= v)
+        val[i, j] = np.where(take_diag, d, np.maximum(h, v))
+        diag[i, j] = take_diag
+        move[i, j] = np.where(take_diag, 0, np.where(v >= h, 2, 1))
+
+    invmap = np.full(lb, -1, dtype=np.int64)
+    i, j = la, lb
+    while i > 0 and j > 0:
+        step = move[i, j]
+        if step == 0:
+            invmap[j - 1] = i - 1
+            i -= 1
+            j -= 1
+        elif step == 2:
+            j -= 1
+        else:
+            i -= 1
+    return invmap
+
+
+def _pairs(invmap: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    jb = np.nonzero(invmap >= 0)[0]
+    return invmap[jb], jb
+
+
+# ---------------------------
+# Initial alignments
+# ---------------------------
+def assign_secondary_structure(ca: np.ndarray) -> np.ndarray:
+    """
+    TM-align's CA-only secondary structure: 1 coil, 2 helix, 3 turn, 4 strand.
+    """
+    n = len(ca)
+    ss = np.ones(n, dtype=np.int8)
+    if n < 5:
+        return ss
+
+    def dist(a, b):
+        return np.sqrt(((ca[a] - ca[b]) ** 2).sum(axis=1))
+
+    i = np.arange(2, n - 2)
+    d13, d14, d15 = dist(i - 2, i), dist(i - 2, i + 1), dist(i - 2, i + 2)
+    d24, d25, d35 = dist(i - 1, i + 1), dist(i - 1, i + 2), dist(i, i + 2)
+    measured = np.stack([d13, d14, d15, d24, d25, d35])
+
+    helix = np.all(np.abs(measured - np.array([5.45, 5.18, 6.37, 5.45, 5.18, 5.45])[:, None]) < 2.1, axis=0)
+    strand = np.all(np.abs(measured - np.array([6.1, 10.4, 13.0, 6.1, 10.4, 6.1])[:, None]) < 1.42, axis=0)
+    turn = d15 < 8.0
+
+    ss[i] = np.where(helix, 2, np.where(strand, 4, np.where(turn, 3, 1)))
+    return ss
+
+
+def _fast_score(x: np.ndarray, y: np.ndarray, l_norm: int, d0: float) -> float:
+    """Quick TM-score estimate: superpose all pairs, then once more on the close ones."""
+    rot, trans = kabsch_batch(x[None], y[None])
+    dist = np.sqrt(((_apply(rot[0], trans[0], x) - y) ** 2).sum(axis=1))
+    close = dist < _d0_search(d0)
+    if close.sum() >= 3:
+        rot, trans = kabsch_batch(x[None], y[None], close[None].astype(float))
+        dist = np.sqrt(((_apply(rot[0], trans[0], x) - y) ** 2).sum(axis=1))
+    return float((1.0 / (1.0 + (dist / d0) ** 2)).sum() / l_norm)
+
+
+def initial_gapless(xa: np.ndarray, ya: np.ndarray, l_norm: int, d0: float) -> np.ndarray:
+    """Best ungapped threading of a along b."""
+    la, lb = len(xa), len(ya)
+    min_overlap = max(5, min(la, lb) // 2)
+    best_score, best_shift = -1.0, 0
+    for shift in range(-(la - min_overlap), lb - min_overlap + 1):
+        jb = np.arange(max(0, shift), min(lb, la + shift))
+        if len(jb) < min_overlap:
+            continue
+        score = _fast_score(xa[jb - shift], ya[jb], l_norm, d0)
+        if score > best_score:
+            best_score, best_shift = score, shift
+    invmap = np.full(lb, -1, dtype=np.int64)
+    jb = np.arange(max(0, best_shift), min(lb, la + best_shift))
+    invmap[jb] = jb - best_shift
+    return invmap
+
+
+def initial_secondary_structure(ss_a: np.ndarray, ss_b: np.ndarray) -> np.ndarray:
+    """Align secondary-structure strings by DP (score 1 for a match)."""
+    score = (ss_a[:, None] == ss_b[None, :]).astype(float)
+    return nw_align(score, gap_open=-1.0)
+
+
+# ---------------------------
+# Refinement and driver
+# ---------------------------
+def _refine(xa: np.ndarray, ya: np.ndarray, invmap: np.ndarray, l_norm: int, d0: float):
+    """Alternate superposition and DP on the TM-score matrix until the alignment is stable."""
+    ia, jb = _pairs(invmap)
+    best_tm, rot, trans = tm_score_search(xa[ia], ya[jb], l_norm, d0, step=SEARCH_STEP)
+    best_map = invmap
+    d02 = d0 * d0
+
+    for gap_open in GAP_OPENS:
+        current = best_map
+        for _ in range(MAX_DP_ITERATIONS):
+            moved = _apply(rot, trans, xa)
+            dist2 = ((moved[:, None, :] - ya[None, :, :]) ** 2).sum(axis=2)
+            new_map = nw_align(1.0 / (1.0 + dist2 / d02), gap_open)
+            ia, jb = _pairs(new_map)
+            if len(ia) < 3:
+                break
+            tm, new_rot, new_trans = tm_score_search(xa[ia], ya[jb], l_norm, d0, step=SEARCH_STEP)
+            if tm > best_tm:
+                best_tm, best_map = tm, new_map
+            rot, trans = new_rot, new_trans
+            if np.array_equal(new_map, current):
+                break
+            current = new_map
+    return best_tm, best_map
+
+
+def tm_align(xa: np.ndarray, ya: np.ndarray) -> TMAlignResult:
+    """
+    Structurally align CA traces `xa` (La, 3) and `ya` (Lb, 3) and return
+    TM-scores normalized by each length.
+    """
+    xa = np.asarray(xa, dtype=np.float64)
+    ya = np.asarray(ya, dtype=np.float64)
+    la, lb = len(xa), len(ya)
+    if la < 3 or lb < 3:
+        raise ValueError("TM-align needs at least 3 residues per structure")
+
+    # Search phase is normalized by the shorter chain, as in TM-align
+    l_min = min(la, lb)
+    d0_min = d0_for_length(l_min)
+
+    candidates = [
+        initial_gapless(xa, ya, l_min, d0_min),
+        initial_secondary_structure(assign_secondary_structure(xa), assign_secondary_structure(ya)),
+    ]
+    best_tm, best_map = -1.0, None
+    for invmap in candidates:
+        if (invmap >= 0).sum() < 3:
+            continue
+        tm, refined = _refine(xa, ya, invmap, l_min, d0_min)
+        if tm > best_tm:
+            best_tm, best_map = tm, refined
+
+    # Drop pairs that are far apart after superposition before the final scores
+    ia, jb = _pairs(best_map)
+    _, rot, trans = tm_score_search(xa[ia], ya[jb], l_min, d0_min, step=SEARCH_STEP)
+    dist = np.sqrt(((_apply(rot, trans, xa[ia]) - ya[jb]) ** 2).sum(axis=1))
+    keep = dist <= 1.5 * l_min ** 0.3 + 3.5
+    if keep.sum() >= 3:
+        ia, jb = ia[keep], jb[keep]
+
+    tm_a, rot, trans = tm_score_search(xa[ia], ya[jb], la, d0_for_length(la))
+    tm_b, _, _ = tm_score_search(xa[ia], ya[jb], lb, d0_for_length(lb))
+    rot_fit, trans_fit = kabsch_batch(xa[ia][None], ya[jb][None])
+    rmsd = float(np.sqrt(((_apply(rot_fit[0], trans_fit[0], xa[ia]) - ya[jb]) ** 2).sum(axis=1).mean()))
+
+    return TMAlignResult(
+        tm_score_a=tm_a,
+        tm_score_b=tm_b,
+        rmsd=rmsd,
+        n_aligned=len(ia),
+        alignment=list(zip(ia.tolist(), jb.tolist())),
+    )
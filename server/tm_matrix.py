@@ -0,0 +1,125 @@
+import asyncio
+import base64
+from collections import OrderedDict
+
+import numpy as np
+
+from config import TM_MATRIX_MEMO_ENTRIES
+from structure_cache import structure_cache
+from pdb_parser import get_structure
+from tm_mech import get_executor, tm_score_pair
+
+
+class TMScoreMatrix:
+    """
+    All-vs-all TM-score matrices over structures in the structure cache.
+
+    Pair scores are memoized by (hash_a, hash_b), so adding structures to a
+    set only aligns the new pairs. Alignments run on the TM-align process pool.
+    """
+
+    def __init__(self, max_memo_entries: int = TM_MATRIX_MEMO_ENTRIES):
+        self.max_memo_entries = max_memo_entries
+        # (hash_a, hash_b) with hash_a < hash_b -> (tm normalized by a, tm normalized by b)
+        self._memo: OrderedDict[tuple[str, str], tuple[float, float]] = OrderedDict()
+
+    def _memo_get(self, key_a: str, key_b: str) -> tuple[float, float] | None:
+        """Scores for (a, b) in that order, or None."""
+        pair = (key_a, key_b) if key_a < key_b else (key_b, key_a)
+        scores = self._memo.get(pair)
+        if scores is None:
+            return None
+        self._memo.move_to_end(pair)
+        return scores if pair[0] == key_a else (scores[1], scores[0])
+
+    def _memo_put(self, key_a: str, key_b: str, scores: tuple[float, float]):
+        if key_a > key_b:
+            key_a, key_b, scores = key_b, key_a, (scores[1], scores[0])
+        self._memo[(key_a, key_b)] = scores
+        self._memo.move_to_end((key_a, key_b))
+        while len(self._memo) > self.max_memo_entries:
+            self._memo.popitem(last=False)
+
+    async def _load_one(self, key: str) -> np.ndarray | None:
+        # Memory-mapped binary file when there is one, else the text parsed in a worker thread
+        structure = await structure_cache.get_structure(key)
+        if structure is None:
+            text = await structure_cache.get(key)
+            if text is None:
+                return None
+            structure = await asyncio.to_thread(get_structure, text, key)
+        return structure.ca_coords()
+
+    async def _load_ca(self, keys: list[str]) -> dict[str, np.ndarray]:
+        coords = await asyncio.gather(*(self._load_one(key) for key in keys))
+        missing = [key for key, ca in zip(keys, coords) if ca is None]
+        if missing:
+            raise KeyError(f"Structures not in cache: {', '.join(missing)}")
+        return dict(zip(keys, coords))
+
+    async def compute(self, keys: list[str]) -> np.ndarray:
+        """
+        Matrix M (float32, n x n) where M[i, j] is the TM-score of structure i
+        aligned to structure j, normalized by the length of j.
+        """
+        n = len(keys)
+        matrix = np.eye(n, dtype=np.float32)
+        todo = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                scores = self._memo_get(keys[i], keys[j])
+                if scores is None:
+                    todo.append((i, j))
+                else:
+                    matrix[j, i], matrix[i, j] = scores
+
+        if todo:
+            print(f"📌 TM-score matrix: {len(todo)} new pairs, {n * (n - 1) // 2 - len(todo)} memoized")
+            needed = sorted({keys[i] for pair in todo for i in pair})
+            coords = await self._load_ca(needed)
+            loop = asyncio.get_running_loop()
+            executor = get_executor()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, tm_score_pair, coords[keys[i]], coords[keys[j]])
+                for i, j in todo
+            ))
+            for (i, j), scores in zip(todo, results):
+                self._memo_put(keys[i], keys[j], scores)
+                matrix[j, i], matrix[i, j] = scores
+        return matrix
+
+
+def cluster_matrix(keys: list[str], matrix: np.ndarray, threshold: float, reference_index: int | None = None) -> list[dict]:
+    """
+    Greedy clustering: members are structures with symmetric TM-score
+    (max of both normalizations) >= threshold to the cluster representative.
+    Candidates are visited best-first by TM-score to the reference when one
+    is given, otherwise in input order. The reference is not clustered.
+    """
+    similarity = np.maximum(matrix, matrix.T)
+    order = [i for i in range(len(keys)) if i != reference_index]
+    if reference_index is not None:
+        order.sort(key=lambda i: -matrix[i, reference_index])
+
+    assigned = set()
+    clusters = []
+    for i in order:
+        if i in assigned:
+            continue
+        members = [j for j in order if j not in assigned and similarity[i, j] >= threshold]
+        assigned.update(members)
+        cluster = {"representative": keys[i], "members": [keys[j] for j in members]}
+        if reference_index is not None:
+            cluster["tm_score_to_reference"] = float(matrix[i, reference_index])
+        clusters.append(cluster)
+    return clusters
+
+
+def encode_matrix(matrix: np.ndarray) -> dict:
+    """Compact wire form: little-endian float32 bytes, base64-encoded."""
+    data = np.ascontiguousarray(matrix, dtype="<f4")
+    return {"dtype": "float32", "shape": list(data.shape), "data": base64.b64encode(data.tobytes()).decode()}
+
+
+# Global instance
+tm_score_matrix = TMScoreMatrix()
@@ -1,49 +1,103 @@
-import subprocess
+import asyncio
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import TM_WORKERS
+from metrics import span
+from pdb_parser import get_structure, text_key
+from result_cache import result_cache
+from tm_align import tm_align
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool for TM-align work, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=TM_WORKERS or os.cpu_count())
+    return _executor
+
+
+def shutdown_executor(wait: bool = False):
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+
+
+def tm_score_arrays(candidate_ca: np.ndarray, reference_ca: np.ndarray) -> float:
+    """
+    TM-score of a candidate CA trace against a reference, normalized by the
+    reference length (TM-align's Chain_1 when run as `TMalign reference candidate`).
+    """
+    return tm_align(reference_ca, candidate_ca).tm_score_a
+
+
+def tm_score_pair(ca_a: np.ndarray, ca_b: np.ndarray) -> tuple[float, float]:
+    """Both normalizations of one alignment: (by length of a, by length of b)."""
+    result = tm_align(ca_a, ca_b)
+    return result.tm_score_a, result.tm_score_b
+
+
+async def tm_score_arrays_async(candidate_ca: np.ndarray, reference_ca: np.ndarray) -> float:
+    """`tm_score_arrays` on the worker pool, so the event loop stays free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), tm_score_arrays, candidate_ca, reference_ca)
+
+
+async def compute_tm_score_pdb(
+    candidate_pdb: str,
+    reference_pdb: str,
+    candidate_key: str | None = None,
+    reference_key: str | None = None,
+) -> float:
+    """
+    TM-score between two PDB texts, normalized by the reference length.
+    Pass the sequence hashes as keys to reuse structures already parsed.
+    Scores are memoized by the content hashes of both structures.
+    """
+    def _load():
+        return (get_structure(candidate_pdb, candidate_key).ca_coords(),
+                get_structure(reference_pdb, reference_key).ca_coords())
+
+    async def _score():
+        # A cold parse takes milliseconds; keep it off the event loop
+        candidate_ca, reference_ca = await asyncio.to_thread(_load)
+        return await tm_score_arrays_async(candidate_ca, reference_ca)
+
+    with span("tm_score"):
+        inputs = (text_key(candidate_pdb), text_key(reference_pdb))
+        tm_score = await result_cache.get_or_compute("tm_score", inputs, _score)
+    print(f"✅ Computed TM-score: {tm_score:.4f}")
+    return tm_score
+
 
 async def compute_tm_score(pdb1_filename: str, pdb2_filename: str, pdb_dir: str = "pdb_data") -> float:
     """
-    Computes TM-score between two PDB files using TM-align, with debug prints.
+    Computes TM-score between two PDB files, normalized by the length of pdb2
+    (the reference), with debug prints.
     """
     try:
         print(f"📌 Starting TM-score computation between {pdb1_filename} and {pdb2_filename}")
         pdb1_path = os.path.join(pdb_dir, pdb1_filename)
         pdb2_path = os.path.join(pdb_dir, pdb2_filename)
-        print(f"Using paths:\n  pdb1: {pdb1_path}\n  pdb2: {pdb2_path}")
 
         # Check if files exist
         if not os.path.exists(pdb1_path):
             raise FileNotFoundError(f"PDB file not found: {pdb1_path}")
         if not os.path.exists(pdb2_path):
             raise FileNotFoundError(f"PDB file not found: {pdb2_path}")
-        if not os.path.exists(".\\TMalign.exe"):
-            raise FileNotFoundError("TMalign.exe not found in current directory")
-
-        # Use subprocess.run instead of asyncio for simplicity
-        cmd = [".\\TMalign.exe", pdb2_path, pdb1_path]
-        print(f"Running command: {' '.join(cmd)}")
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=os.getcwd()  # Explicitly set working directory
-        )
-
-        if result.returncode != 0:
-            raise RuntimeError(f"TM-align failed with return code {result.returncode}:\n{result.stderr}")
-
-        print("📄 TM-align output:\n", result.stdout)
 
-        match = re.search(r"TM-score=\s*([0-9.]+)\s*\(if normalized by length of Chain_1", result.stdout)
-        if not match:
-            raise ValueError(f"Could not parse TM-score from TM-align output")
+        def _read(path):
+            with open(path, "r") as f:
+                return f.read()
 
-        tm_score = float(match.group(1))
-        print(f"✅ Computed TM-score: {tm_score}")
-        return tm_score
+        pdb1, pdb2 = await asyncio.gather(asyncio.to_thread(_read, pdb1_path), asyncio.to_thread(_read, pdb2_path))
+        return await compute_tm_score_pdb(pdb1, pdb2)
 
     except Exception as e:
         print(f"❌ Error in compute_tm_score: {e}")
-        raise
\ No newline at end of file
+        raise